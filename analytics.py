@@ -0,0 +1,192 @@
+"""Analítica de ventas vectorizada con NumPy.
+
+Las columnas de `ventas` se traen en bloque como tuplas (sin objetos ORM) y
+se convierten a arrays; los tickets se identifican por `(id_terminal,
+id_venta)` y todo el cálculo (heatmap hora × día, canasta promedio y
+co-ocurrencia de productos) se hace con `bincount`/`unique` sobre índices
+enteros.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+import archive
+from models import db
+
+DIAS_SEMANA = ['Lun', 'Mar', 'Mié', 'Jue', 'Vie', 'Sáb', 'Dom']
+
+
+@dataclass
+class ColumnasVentas:
+    ticket: np.ndarray
+    terminal: np.ndarray
+    producto: np.ndarray
+    dia_semana: np.ndarray
+    hora: np.ndarray
+    cantidad: np.ndarray
+    total: np.ndarray
+    terminales: np.ndarray
+    productos: np.ndarray
+    n_tickets: int
+
+    @property
+    def vacio(self):
+        return self.n_tickets == 0
+
+
+def cargar_columnas(desde=None, hasta=None, terminal=None):
+    v = archive.ventas_rango(desde, hasta, terminal)
+    stmt = db.select(
+        v.c.id_terminal,
+        v.c.id_venta,
+        v.c.producto_nombre,
+        v.c.fecha,
+        v.c.hora,
+        v.c.cantidad,
+        v.c.total_venta,
+    )
+    filas = db.session.execute(stmt).all()
+    return columnas_desde_filas(filas)
+
+
+def columnas_desde_filas(filas):
+    n = len(filas)
+    if not n:
+        vacio_i = np.zeros(0, dtype=np.int64)
+        return ColumnasVentas(
+            vacio_i, vacio_i, vacio_i, vacio_i, vacio_i,
+            np.zeros(0), np.zeros(0), np.zeros(0, dtype=object), np.zeros(0, dtype=object), 0
+        )
+    terminales_raw, ids_venta, productos_raw, fechas, horas, cantidades, totales = zip(*filas)
+
+    terminales, terminal_idx = np.unique(
+        np.array([t or '' for t in terminales_raw], dtype=object), return_inverse=True
+    )
+    productos, producto_idx = np.unique(
+        np.array([p or '' for p in productos_raw], dtype=object), return_inverse=True
+    )
+    ids = np.fromiter((v or 0 for v in ids_venta), dtype=np.int64, count=n)
+    clave_ticket = terminal_idx.astype(np.int64) * (int(ids.max()) + 1) + ids
+    _, ticket_idx = np.unique(clave_ticket, return_inverse=True)
+
+    dias = np.array(fechas, dtype='datetime64[D]')
+    # 1970-01-01 fue jueves: desplazar para que lunes = 0
+    dia_semana = np.where(np.isnat(dias), -1, (dias.astype(np.int64) + 3) % 7)
+    hora = np.fromiter((h.hour if h is not None else -1 for h in horas), dtype=np.int64, count=n)
+
+    return ColumnasVentas(
+        ticket=ticket_idx,
+        terminal=terminal_idx,
+        producto=producto_idx,
+        dia_semana=dia_semana,
+        hora=hora,
+        cantidad=np.fromiter((c or 0 for c in cantidades), dtype=np.float64, count=n),
+        total=np.fromiter((t or 0 for t in totales), dtype=np.float64, count=n),
+        terminales=terminales,
+        productos=productos,
+        n_tickets=int(ticket_idx.max()) + 1,
+    )
+
+
+def _primera_linea_por_ticket(cols):
+    orden = np.argsort(cols.ticket, kind='stable')
+    primeros = np.ones(len(orden), dtype=bool)
+    primeros[1:] = cols.ticket[orden][1:] != cols.ticket[orden][:-1]
+    return orden[primeros]
+
+
+def heatmap_horario(cols):
+    """Matrices 7×24 (lunes..domingo × hora) de tickets e ingresos."""
+    tickets = np.zeros((7, 24), dtype=np.int64)
+    ingresos = np.zeros((7, 24))
+    if not cols.vacio:
+        con_hora = (cols.hora >= 0) & (cols.dia_semana >= 0)
+        celda = cols.dia_semana * 24 + np.where(con_hora, cols.hora, 0)
+        ingresos = np.bincount(celda[con_hora], weights=cols.total[con_hora], minlength=168).reshape(7, 24)
+        primeras = _primera_linea_por_ticket(cols)
+        primeras = primeras[con_hora[primeras]]
+        tickets = np.bincount(celda[primeras], minlength=168).reshape(7, 24)
+    return {
+        'dias': DIAS_SEMANA,
+        'horas': list(range(24)),
+        'tickets': tickets.tolist(),
+        'ingresos': np.round(ingresos, 2).tolist(),
+    }
+
+
+def canastas_por_terminal(cols):
+    """Tamaño (unidades y líneas) y valor promedio de ticket por terminal."""
+    if cols.vacio:
+        return []
+    valor = np.bincount(cols.ticket, weights=cols.total, minlength=cols.n_tickets)
+    unidades = np.bincount(cols.ticket, weights=cols.cantidad, minlength=cols.n_tickets)
+    lineas = np.bincount(cols.ticket, minlength=cols.n_tickets)
+    terminal_ticket = np.empty(cols.n_tickets, dtype=np.int64)
+    terminal_ticket[cols.ticket] = cols.terminal
+
+    n_term = len(cols.terminales)
+    tickets = np.bincount(terminal_ticket, minlength=n_term)
+    suma_valor = np.bincount(terminal_ticket, weights=valor, minlength=n_term)
+    suma_unidades = np.bincount(terminal_ticket, weights=unidades, minlength=n_term)
+    suma_lineas = np.bincount(terminal_ticket, weights=lineas, minlength=n_term)
+    divisor = np.maximum(tickets, 1)
+    return [
+        {
+            'terminal': str(cols.terminales[i]),
+            'tickets': int(tickets[i]),
+            'valor_promedio': round(float(suma_valor[i] / divisor[i]), 2),
+            'unidades_promedio': round(float(suma_unidades[i] / divisor[i]), 2),
+            'lineas_promedio': round(float(suma_lineas[i] / divisor[i]), 2),
+            'ingresos': round(float(suma_valor[i]), 2),
+        }
+        for i in range(n_term) if tickets[i]
+    ]
+
+
+def co_ocurrencia(cols, limite=20, min_tickets=2):
+    """Pares de productos comprados en el mismo ticket, con soporte y lift.
+
+    Se cuentan en formato disperso: se deduplican los pares (ticket,
+    producto), se ordenan por ticket y se generan los pares desplazando el
+    array dentro de cada ticket, sin construir la matriz productos × productos.
+    """
+    if cols.vacio:
+        return []
+    n_prod = len(cols.productos)
+    pares_tp = np.unique(cols.ticket.astype(np.int64) * n_prod + cols.producto)
+    ticket = pares_tp // n_prod
+    producto = pares_tp % n_prod
+    frecuencia = np.bincount(producto, minlength=n_prod)
+
+    inicio_ticket = np.searchsorted(ticket, ticket, side='left')
+    fin_ticket = np.searchsorted(ticket, ticket, side='right')
+    tam_max = int((fin_ticket - inicio_ticket).max())
+
+    claves = []
+    posiciones = np.arange(len(ticket))
+    for desplazamiento in range(1, tam_max):
+        validos = posiciones + desplazamiento < fin_ticket
+        a = producto[validos]
+        b = producto[posiciones[validos] + desplazamiento]
+        claves.append(a * n_prod + b)
+    if not claves:
+        return []
+    conteo_claves, conteos = np.unique(np.concatenate(claves), return_counts=True)
+
+    seleccion = conteos >= min_tickets
+    conteo_claves = conteo_claves[seleccion]
+    conteos = conteos[seleccion]
+    orden = np.lexsort((conteo_claves, -conteos))[:limite]
+
+    resultado = []
+    for clave, cantidad in zip(conteo_claves[orden], conteos[orden]):
+        a, b = divmod(int(clave), n_prod)
+        esperado = frecuencia[a] * frecuencia[b] / cols.n_tickets
+        resultado.append({
+            'producto_a': str(cols.productos[a]),
+            'producto_b': str(cols.productos[b]),
+            'tickets': int(cantidad),
+            'soporte': round(float(cantidad) / cols.n_tickets, 4),
+            'lift': round(float(cantidad) / esperado, 3) if esperado else None,
+        })
+    return resultado
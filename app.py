@@ -1,27 +1,56 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
-from datetime import datetime, date, time
-import json
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, Response, stream_with_context, send_file
+from datetime import datetime, date, time, timedelta
+import importlib
 import os
 import re
-import math
+import tempfile
 from urllib.parse import unquote
 from functools import wraps
 import logging
+import queue
 from collections import Counter
+from time import perf_counter
 from dotenv import load_dotenv
 
+from sqlalchemy import Integer, bindparam, inspect, select, text, update
+from werkzeug.http import is_resource_modified
+
 load_dotenv()
 
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 CATALOGO_XLSX = os.path.join(BASE_DIR, 'catalogo.xlsx')
 VENTAS_XLSX = os.path.join(BASE_DIR, 'ventas.xlsx')
 
-from models import db, Producto, Venta, Contador
+from models import db, Producto, Venta, Contador, CatalogoCambio, MovimientoStock, Trabajo, Migracion
+from exports import stream_ventas, FormatoNoDisponible
+import reports
+import analytics
+import archive
+import cache
+import events
+import catalogo
+import dinero
+import lecturas
+import serializacion
+import plantillas
+import readers
+import respuestas
+import stock
+import trabajos
+import ingest
+from normalize import clean_string, safe_float, safe_int, parse_date, normalizar_venta, secuencia_cliente
+import health
+import logs
 
-logging.basicConfig(level=logging.INFO)
+logs.configurar_logging(
+    formato=os.getenv('LOG_FORMATO', 'texto'),
+    nivel=os.getenv('LOG_NIVEL', 'INFO').upper(),
+    muestreo_debug=float(os.getenv('LOG_MUESTREO_DEBUG', 1.0))
+)
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__, template_folder='templates', static_folder='static')
+app.json = serializacion.ProveedorJSON(app)
 app.secret_key = os.getenv('SECRET_KEY', 'pocopan_secure_key_2024_v2_con_db')
 
 DATABASE_URL = os.getenv('DATABASE_URL')
@@ -38,10 +67,65 @@ app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
         'application_name': 'pocopan_app'
     } if 'postgresql' in DATABASE_URL else {}
 }
-app.config['TEMPLATES_AUTO_RELOAD'] = True
+PERFILES = {
+    'development': {
+        'TEMPLATES_AUTO_RELOAD': True,
+        'PLANTILLAS_CACHE_DIR': '',
+        'PLANTILLAS_PRECOMPILAR': False,
+    },
+    'production': {
+        'TEMPLATES_AUTO_RELOAD': False,
+        'PLANTILLAS_CACHE_DIR': os.path.join(tempfile.gettempdir(), 'pocopan_jinja'),
+        'PLANTILLAS_PRECOMPILAR': True,
+    },
+}
+ENTORNO = os.getenv('APP_ENTORNO') or ('development' if os.getenv('FLASK_ENV') == 'development' else 'production')
+if ENTORNO not in PERFILES:
+    logger.warning("⚠️ APP_ENTORNO desconocido '%s', usando production", ENTORNO)
+    ENTORNO = 'production'
+app.config['ENTORNO'] = ENTORNO
+app.config.update(PERFILES[ENTORNO])
+app.config['PLANTILLAS_CACHE_DIR'] = os.getenv('PLANTILLAS_CACHE_DIR', app.config['PLANTILLAS_CACHE_DIR'])
 app.config['PERMANENT_SESSION_LIFETIME'] = 3600
+app.config['DASHBOARD_CACHE_TTL'] = int(os.getenv('DASHBOARD_CACHE_TTL', 30))
+app.config['DASHBOARD_CACHE_BACKEND'] = os.getenv('DASHBOARD_CACHE_BACKEND', 'memoria')
+app.config['DASHBOARD_CACHE_PATH'] = os.getenv(
+    'DASHBOARD_CACHE_PATH', os.path.join(BASE_DIR, 'instance', 'dashboard_cache.sqlite')
+)
+app.config['ANALITICA_DIAS'] = int(os.getenv('ANALITICA_DIAS', 90))
+app.config['ANALITICA_CACHE_TTL'] = int(os.getenv('ANALITICA_CACHE_TTL', 300))
+
+app.config['EVENTOS_BACKEND'] = os.getenv('EVENTOS_BACKEND', 'memoria')
+app.config['EVENTOS_POLL_INTERVAL'] = float(os.getenv('EVENTOS_POLL_INTERVAL', 2))
+app.config['EVENTOS_MAX_STREAMS'] = int(os.getenv('EVENTOS_MAX_STREAMS', 0))
+app.config['DIAGNOSTICO_CACHE_TTL'] = int(os.getenv('DIAGNOSTICO_CACHE_TTL', 15))
+app.config['IMPORTACION_LOTE'] = int(os.getenv('IMPORTACION_LOTE', 1000))
+app.config['COMPRESION_MINIMO'] = int(os.getenv('COMPRESION_MINIMO', 1024))
+app.config['COMPRESION_NIVEL'] = int(os.getenv('COMPRESION_NIVEL', 6))
+app.config['TRABAJOS_WORKERS'] = int(os.getenv('TRABAJOS_WORKERS', 2))
+app.config['TRABAJOS_DIR'] = os.getenv('TRABAJOS_DIR', os.path.join(tempfile.gettempdir(), 'pocopan_trabajos'))
+app.config['TRABAJOS_VENCIMIENTO_MIN'] = int(os.getenv('TRABAJOS_VENCIMIENTO_MIN', 60))
 
 db.init_app(app)
+plantillas.configurar_cache(app, app.config['PLANTILLAS_CACHE_DIR'])
+logs.registrar_requests(app, lento_ms=int(os.getenv('LOG_LENTO_MS', 500)))
+huella_estatico = respuestas.registrar_estaticos(app)
+respuestas.registrar_compresion(
+    app, minimo=app.config['COMPRESION_MINIMO'], nivel=app.config['COMPRESION_NIVEL']
+)
+
+dashboard_cache = cache.crear_cache(
+    app.config['DASHBOARD_CACHE_BACKEND'],
+    path=app.config['DASHBOARD_CACHE_PATH']
+)
+diagnostico_cache = cache.MemoryCache(max_items=8)
+events.bus.configure(
+    app,
+    backend=app.config['EVENTOS_BACKEND'],
+    poll_interval=app.config['EVENTOS_POLL_INTERVAL'],
+    max_streams=app.config['EVENTOS_MAX_STREAMS']
+)
+trabajos.runner.init_app(app, workers=app.config['TRABAJOS_WORKERS'])
 
 CONFIG = {
     "iva": 21.0,
@@ -58,13 +142,47 @@ CONFIG = {
 def init_db():
     """Inicializa la base con los datos de catálogo y ventas"""
     with app.app_context():
+        etapas = {}
+        inicio = perf_counter()
         db.create_all()
-        catalog_result = seed_catalog_from_excel()
+        columnas_nuevas = _migrar_esquema()
+        if columnas_nuevas:
+            logger.info(f"✅ Columnas agregadas: {', '.join(columnas_nuevas)}")
+        if 'ventas.producto_id' in columnas_nuevas:
+            _completar_producto_id_ventas()
+        convertidas = _migrar_centavos()
+        if convertidas:
+            logger.info("✅ Importes convertidos a centavos: %s", ', '.join(convertidas))
+        clientes = _migrar_secuencia_clientes()
+        if clientes:
+            logger.info("✅ Secuencia de cliente completada para %s clientes", clientes)
+        interrumpidos = trabajos.marcar_interrumpidos(
+            timedelta(minutes=app.config['TRABAJOS_VENCIMIENTO_MIN'])
+        )
+        if interrumpidos:
+            logger.warning("⚠️ Trabajos interrumpidos por reinicio: %s", interrumpidos)
+        etapas['esquema'], inicio = perf_counter() - inicio, perf_counter()
+        catalog_result = seed_catalog_from_excel(
+            retirar_faltantes=os.getenv('CATALOGO_RETIRAR_FALTANTES', 'false').lower() == 'true'
+        )
+        etapas['catalogo'], inicio = perf_counter() - inicio, perf_counter()
         ventas_result = seed_sales_from_excel()
+        etapas['ventas'], inicio = perf_counter() - inicio, perf_counter()
         refresh_contadores()
-        if catalog_result['created'] or catalog_result['updated']:
+        etapas['contadores'], inicio = perf_counter() - inicio, perf_counter()
+        if app.config['PLANTILLAS_PRECOMPILAR']:
+            cantidad = plantillas.precompilar(app)
+            etapas['plantillas'] = perf_counter() - inicio
+            logger.info("✅ Plantillas precompiladas: %s", cantidad)
+        health.registrar_arranque(etapas)
+        logger.info(
+            "⏱️ Arranque (%s): %s", app.config['ENTORNO'],
+            ', '.join(f"{etapa} {duracion * 1000:.0f} ms" for etapa, duracion in etapas.items())
+        )
+        if catalog_result['created'] or catalog_result['updated'] or catalog_result['retired']:
             logger.info(
-                f"✅ Catálogo: {catalog_result['created']} nuevos, {catalog_result['updated']} actualizados"
+                f"✅ Catálogo: {catalog_result['created']} nuevos, {catalog_result['updated']} actualizados, "
+                f"{catalog_result['unchanged']} sin cambios, {catalog_result['retired']} retirados"
             )
         if ventas_result['created'] or ventas_result['updated']:
             logger.info(
@@ -72,229 +190,357 @@ def init_db():
             )
 
 
-def seed_catalog_from_excel():
-    result = {'created': 0, 'updated': 0}
-    if not os.path.exists(CATALOGO_XLSX):
+def calentar_caches():
+    """Carga lo que conviene compartir entre workers antes del fork (copy-on-write).
+
+    Pensado para el master de gunicorn con `preload_app` (ver gunicorn.conf.py):
+    plantillas compiladas, huellas de los estáticos, las consultas del catálogo
+    compiladas en el cache de SQLAlchemy y los módulos de importación/exportación.
+    """
+    with app.app_context():
+        inicio = perf_counter()
+        if not app.config['PLANTILLAS_PRECOMPILAR']:
+            plantillas.precompilar(app)
+        estaticos = 0
+        for carpeta, _, archivos in os.walk(app.static_folder):
+            for archivo in archivos:
+                huella_estatico(os.path.relpath(os.path.join(carpeta, archivo), app.static_folder).replace(os.sep, '/'))
+                estaticos += 1
+        productos = lecturas.productos_pos()
+        lecturas.categorias(productos)
+        lecturas.productos_editor()
+        lecturas.nombres_disponibles('a')
+        _estado_catalogo()
+        db.session.remove()
+        importlib.import_module('openpyxl')  # lo usan importación y exportación xlsx
+        logger.info(
+            "🔥 Caches precalentados: %s productos, %s estáticos (%.0f ms)",
+            len(productos), estaticos, (perf_counter() - inicio) * 1000
+        )
+        return {'productos': len(productos), 'estaticos': estaticos}
+
+
+def _migrar_esquema():
+    """Agrega a tablas existentes las columnas nullables e índices nuevos del modelo.
+
+    `create_all` sólo crea tablas faltantes; esto cubre bases ya desplegadas.
+    """
+    inspector = inspect(db.engine)
+    agregadas = []
+    with db.engine.begin() as conn:
+        for tabla in db.metadata.sorted_tables:
+            if not inspector.has_table(tabla.name):
+                continue
+            existentes = {c['name'] for c in inspector.get_columns(tabla.name)}
+            for columna in tabla.columns:
+                if columna.name in existentes or not columna.nullable:
+                    continue
+                tipo = columna.type.compile(dialect=db.engine.dialect)
+                conn.execute(text(f'ALTER TABLE {tabla.name} ADD COLUMN {columna.name} {tipo}'))
+                agregadas.append(f'{tabla.name}.{columna.name}')
+            for indice in tabla.indexes:
+                indice.create(conn, checkfirst=True)
+    return agregadas
+
+
+def _completar_producto_id_ventas():
+    """Asocia las ventas históricas a su producto por nombre (una sola vez, al migrar)."""
+    producto_id = select(Producto.id).where(
+        db.func.lower(Producto.nombre) == db.func.lower(Venta.producto_nombre)
+    ).limit(1).scalar_subquery()
+    db.session.execute(
+        update(Venta).where(Venta.producto_id.is_(None)).values(producto_id=producto_id)
+    )
+    db.session.commit()
+
+
+COLUMNAS_DINERO = {
+    'productos': ('precio_venta',),
+    'ventas': ('precio_unitario', 'total_venta'),
+    'ventas_archivo': ('precio_unitario', 'total_venta'),
+    'ventas_resumen': ('ingresos',),
+}
+
+
+def _migrar_centavos():
+    """Convierte una sola vez los importes guardados como pesos (REAL/DOUBLE) a centavos enteros.
+
+    En PostgreSQL cambia el tipo de columna a BIGINT; en SQLite, que no
+    altera tipos, reescribe los valores. La migración queda registrada en
+    `migraciones` para no volver a multiplicar por 100.
+    """
+    if db.session.get(Migracion, 'dinero_centavos'):
+        return []
+    inspector = inspect(db.engine)
+    postgres = db.engine.dialect.name == 'postgresql'
+    convertidas = []
+    for tabla, columnas in COLUMNAS_DINERO.items():
+        if not inspector.has_table(tabla):
+            continue
+        tipos = {c['name']: c['type'] for c in inspector.get_columns(tabla)}
+        for columna in columnas:
+            tipo = tipos.get(columna)
+            if tipo is None or isinstance(tipo, Integer):
+                continue
+            if postgres:
+                db.session.execute(text(
+                    f'ALTER TABLE {tabla} ALTER COLUMN {columna} TYPE BIGINT USING ROUND({columna} * 100)'
+                ))
+            else:
+                db.session.execute(text(
+                    f'UPDATE {tabla} SET {columna} = CAST(ROUND({columna} * 100) AS INTEGER)'
+                ))
+            convertidas.append(f'{tabla}.{columna}')
+    db.session.add(Migracion(nombre='dinero_centavos'))
+    db.session.commit()
+    return convertidas
+
+
+def _migrar_secuencia_clientes():
+    """Completa una sola vez `cliente_seq` en ventas (y archivo) ya cargadas.
+
+    Agrega la columna e índices al archivo si existe (no está en `db.metadata`)
+    y escribe la secuencia una vez por `id_cliente` distinto.
+    """
+    if db.session.get(Migracion, 'cliente_seq'):
+        return 0
+    inspector = inspect(db.engine)
+    tablas = [Venta.__table__]
+    if inspector.has_table(archive.ventas_archivo.name):
+        tabla = archive.ventas_archivo
+        if 'cliente_seq' not in {c['name'] for c in inspector.get_columns(tabla.name)}:
+            db.session.execute(text(f'ALTER TABLE {tabla.name} ADD COLUMN cliente_seq INTEGER'))
+        for indice in tabla.indexes:
+            indice.create(db.session.connection(), checkfirst=True)
+        tablas.append(tabla)
+    completadas = 0
+    for tabla in tablas:
+        clientes = db.session.execute(
+            select(tabla.c.id_cliente).where(tabla.c.cliente_seq.is_(None), tabla.c.id_cliente.isnot(None)).distinct()
+        ).scalars().all()
+        if clientes:
+            db.session.execute(
+                update(tabla).where(tabla.c.id_cliente == bindparam('cliente')).values(cliente_seq=bindparam('seq')),
+                [{'cliente': cliente, 'seq': secuencia_cliente(cliente)} for cliente in clientes]
+            )
+        completadas += len(clientes)
+    db.session.add(Migracion(nombre='cliente_seq'))
+    db.session.commit()
+    return completadas
+
+
+CAMPOS_HUELLA = ('nombre', 'categoria', 'subcategoria', 'precio_venta')
+
+
+def _huella_producto(nombre, categoria, subcategoria, precio_venta):
+    """Huella comparable de una fila del catálogo (Excel o BD).
+
+    El precio se redondea a centavos igual que al guardarlo (half-up), así un
+    1.005 de la planilla coincide con el 1.01 de la BD.
+    """
+    return (
+        nombre or '',
+        categoria or 'Sin Categoría',
+        subcategoria or '',
+        dinero.a_pesos(dinero.a_centavos(precio_venta or 0))
+    )
+
+
+@health.medir_importacion('catalogo')
+def seed_catalog_from_excel(retirar_faltantes=False, dry_run=False, ruta=None):
+    """Importa el catálogo aplicando sólo las diferencias con la BD.
+
+    Las filas cuya huella (nombre, categoría, subcategoría, precio) coincide
+    con la del producto existente no se tocan. Con `retirar_faltantes` los
+    productos del catálogo ('Catálogo' como proveedor) que ya no están en la
+    planilla pasan a 'No Disponible'. Con `dry_run` sólo se arma el reporte.
+    """
+    result = {'created': 0, 'updated': 0, 'unchanged': 0, 'retired': 0, 'dry_run': dry_run,
+              'detalle': {'altas': [], 'modificados': [], 'retirados': []}}
+    ruta = readers.ruta_existente(ruta or CATALOGO_XLSX)
+    if ruta is None:
         logger.warning("catalogo.xlsx no encontrado, omitiendo carga inicial")
         return result
-    try:
-        import pandas as pd
-    except ImportError as exc:
-        logger.error(f"Pandas no disponible para cargar catálogo: {exc}")
-        return result
-    df = pd.read_excel(CATALOGO_XLSX)
-    if df.empty:
-        logger.warning("catalogo.xlsx está vacío")
-        return result
+    existentes = {p.nombre.lower(): p for p in Producto.query.all()}
+    proveedor = 'Catálogo'
     nombres_vistos = set()
-    for _, row in df.iterrows():
-        nombre = _clean_string(row.get('Nombre'))
-        if not nombre or nombre in nombres_vistos:
+    cambios = []
+    filas = 0
+    for row in readers.iter_filas(ruta):
+        filas += 1
+        nombre = clean_string(row.get('Nombre'))
+        if not nombre or nombre.lower() in nombres_vistos:
             continue
-        precio_col = 'Precio Venta' if 'Precio Venta' in row.index else 'Precio_Venta'
-        precio = _safe_float(row.get(precio_col))
+        precio_col = 'Precio Venta' if 'Precio Venta' in row else 'Precio_Venta'
+        precio = safe_float(row.get(precio_col))
         if precio is None:
             continue
-        categoria = _clean_string(row.get('Categoria'), 'Sin Categoría')
-        subcategoria = _clean_string(row.get('SubCAT'))
-        proveedor = 'Catálogo'
-        producto = Producto.query.filter(
-            db.func.lower(Producto.nombre) == nombre.lower()
-        ).first()
-        if producto:
-            producto.categoria = categoria or producto.categoria or 'Sin Categoría'
-            producto.subcategoria = subcategoria
+        nombres_vistos.add(nombre.lower())
+        nueva = _huella_producto(
+            nombre, clean_string(row.get('Categoria'), 'Sin Categoría'), clean_string(row.get('SubCAT')), precio
+        )
+        producto = existentes.get(nombre.lower())
+        if producto is None:
+            result['created'] += 1
+            result['detalle']['altas'].append(nombre)
+            if not dry_run:
+                producto = Producto(
+                    nombre=nueva[0], categoria=nueva[1], subcategoria=nueva[2],
+                    precio_venta=precio, proveedor=proveedor, estado='Disponible'
+                )
+                db.session.add(producto)
+                cambios.append(('alta', producto))
+            continue
+        actual = _huella_producto(producto.nombre, producto.categoria, producto.subcategoria, producto.precio_venta)
+        # Sólo vuelven los retirados; lo agotado por stock sigue fuera de venta hasta reponerse
+        reactivar = (
+            retirar_faltantes and producto.estado not in ('Disponible', stock.AGOTADO)
+            and (producto.stock is None or producto.stock > 0)
+        )
+        if nueva == actual and not reactivar:
+            result['unchanged'] += 1
+            continue
+        diferencias = {
+            campo: [antes, despues]
+            for campo, antes, despues in zip(CAMPOS_HUELLA, actual, nueva)
+            if antes != despues
+        }
+        if reactivar:
+            diferencias['estado'] = [producto.estado, 'Disponible']
+        result['updated'] += 1
+        result['detalle']['modificados'].append({'nombre': nombre, 'cambios': diferencias})
+        if not dry_run:
+            producto.nombre, producto.categoria, producto.subcategoria = nueva[:3]
             producto.precio_venta = precio
             producto.proveedor = proveedor
-            result['updated'] += 1
-        else:
-            producto = Producto(
-                nombre=nombre,
-                categoria=categoria or 'Sin Categoría',
-                subcategoria=subcategoria,
-                precio_venta=precio,
-                proveedor=proveedor,
-                estado='Disponible'
-            )
-            db.session.add(producto)
-            result['created'] += 1
-        nombres_vistos.add(nombre)
-    if result['created'] or result['updated']:
+            if reactivar:
+                producto.estado = 'Disponible'
+            cambios.append(('modificacion', producto))
+    if not filas:
+        logger.warning("catalogo.xlsx está vacío")
+        return result
+    if retirar_faltantes:
+        for clave, producto in existentes.items():
+            if clave in nombres_vistos or producto.proveedor != proveedor or producto.estado != 'Disponible':
+                continue
+            result['retired'] += 1
+            result['detalle']['retirados'].append(producto.nombre)
+            if not dry_run:
+                producto.estado = 'No Disponible'
+                cambios.append(('modificacion', producto))
+    if cambios:
+        eventos = _registrar_cambios_catalogo(cambios)
         db.session.commit()
+        reports.invalidar_cache()
+        dashboard_cache.bump_version()
+        _publicar_cambios_catalogo(eventos)
     return result
 
 
-def seed_sales_from_excel():
+@health.medir_importacion('ventas')
+def seed_sales_from_excel(ruta=None, progreso=None):
+    """Importa ventas.xlsx (o ventas.csv) en lotes de `IMPORTACION_LOTE` filas.
+
+    `progreso(fraccion, mensaje)`, si se pasa, se llama después de cada lote.
+    """
     result = {'created': 0, 'updated': 0}
-    if not os.path.exists(VENTAS_XLSX):
-        return result
-    try:
-        import pandas as pd
-    except ImportError as exc:
-        logger.error(f"Pandas no disponible para cargar ventas: {exc}")
-        return result
-    df = pd.read_excel(VENTAS_XLSX)
-    if df.empty:
+    ruta = readers.ruta_existente(ruta or VENTAS_XLSX)
+    if ruta is None:
         return result
-    next_id = (db.session.query(db.func.max(Venta.id_venta)).scalar() or 0) + 1
-    for _, row in df.iterrows():
-        id_venta = _safe_int(row.get('ID_Venta'))
-        fecha = _parse_date(row.get('Fecha')) or date.today()
-        hora = _parse_time(row.get('Hora'))
-        id_cliente = _clean_string(row.get('ID_Cliente'))
-        producto_nombre = _clean_string(row.get('Producto'))
-        cantidad = _safe_int(row.get('Cantidad')) or 0
-        precio_unitario = _safe_float(row.get('Precio_Unitario')) or 0
-        total_venta = _safe_float(row.get('Total_Venta')) or (cantidad * precio_unitario)
-        vendedor = _clean_string(row.get('Vendedor'), 'POS')
-        terminal = _clean_string(row.get('ID_Terminal'), 'TODAS') or 'TODAS'
-        if not producto_nombre or not cantidad:
-            continue
-        venta = None
-        if id_venta is not None:
-            venta = Venta.query.filter_by(id_venta=id_venta, id_terminal=terminal).first()
-        if venta:
-            venta.fecha = fecha
-            venta.hora = hora
-            venta.id_cliente = id_cliente or venta.id_cliente
-            venta.producto_nombre = producto_nombre
-            venta.cantidad = cantidad
-            venta.precio_unitario = precio_unitario
-            venta.total_venta = total_venta
-            venta.vendedor = vendedor
-            result['updated'] += 1
-        else:
-            assigned_id = id_venta or next_id
-            if id_venta is None:
-                next_id += 1
-            venta = Venta(
-                id_venta=assigned_id,
-                fecha=fecha,
-                hora=hora,
-                id_cliente=id_cliente or f"CLIENTE-{terminal}-{assigned_id:04d}",
-                producto_nombre=producto_nombre,
-                cantidad=cantidad,
-                precio_unitario=precio_unitario,
-                total_venta=total_venta,
-                vendedor=vendedor,
-                id_terminal=terminal
-            )
-            db.session.add(venta)
-            result['created'] += 1
+    escritor = ingest.EscritorVentas()
+    filas = 0
+    for lote in readers.iter_lotes(ruta, app.config['IMPORTACION_LOTE']):
+        escritor.escribir([venta for venta in map(normalizar_venta, lote) if venta is not None])
+        filas += len(lote)
+        if progreso:
+            progreso(None, f'{filas} filas leídas')
+    result['created'], result['updated'] = escritor.created, escritor.updated
     if result['created'] or result['updated']:
         db.session.commit()
+        reports.invalidar_cache()
+        dashboard_cache.bump_version()
     return result
 
 
-def refresh_contadores():
-    terminales = ['POS1', 'POS2', 'POS3', 'TODAS']
-    for terminal in terminales:
-        contador = Contador.query.filter_by(terminal=terminal).first()
-        if not contador:
-            contador = Contador(terminal=terminal)
-            db.session.add(contador)
-        query = Venta.query if terminal == 'TODAS' else Venta.query.filter_by(id_terminal=terminal)
-        contador.total_ventas = query.count()
-        contador.ultima_venta = query.with_entities(db.func.max(Venta.id_venta)).scalar() or 0
-        contador.ultimo_cliente = _max_cliente_sequence(query.with_entities(Venta.id_cliente).all())
-    db.session.commit()
+def _registrar_cambios_catalogo(cambios):
+    """Agrega al ledger de catálogo los cambios (accion, producto) de la transacción actual."""
+    if not cambios:
+        return []
+    db.session.flush()
+    vigentes = iter(serializacion.productos([producto for accion, producto in cambios if accion != 'baja']))
+    registros = [
+        CatalogoCambio(
+            producto_id=producto.id,
+            accion=accion,
+            datos=serializacion.dumps(
+                next(vigentes) if accion != 'baja' else {'id': producto.id, 'nombre': producto.nombre}
+            )
+        )
+        for accion, producto in cambios
+    ]
+    db.session.add_all(registros)
+    db.session.flush()
+    eventos = [registro.to_dict() for registro in registros]
+    for evento in eventos:
+        events.bus.notify_in_transaction(db.session, 'catalogo', evento, f"catalogo:{evento['version']}")
+    return eventos
 
 
-def _clean_string(value, default=''):
-    if value is None:
-        return default
-    if isinstance(value, str):
-        cleaned = re.sub(r'\s+', ' ', value).strip()
-        return cleaned if cleaned else default
-    if isinstance(value, (int, float)):
-        if isinstance(value, float) and math.isnan(value):
-            return default
-        return str(value).strip()
-    return default
+def _publicar_cambios_catalogo(eventos):
+    """Publica los diffs; un lote que no entra en la cola de un suscriptor va como un único 'recargar'."""
+    if len(eventos) > events.MAX_COLA:
+        version = eventos[-1]['version']
+        eventos = [{'tipo': 'catalogo', 'accion': 'recargar', 'version': version, 'producto_id': None}]
+    for evento in eventos:
+        events.bus.publish('catalogo', evento, f"catalogo:{evento['version']}")
 
 
-def _safe_float(value):
-    if value is None:
-        return None
-    if isinstance(value, str):
-        cleaned = value.replace('$', '').replace(',', '.').strip()
-        cleaned = cleaned.replace(' ', '')
-        if not cleaned:
-            return None
-        value = cleaned
-    try:
-        result = float(value)
-        if math.isnan(result):
-            return None
-        return result
-    except (TypeError, ValueError):
-        return None
+def _catalogo_version():
+    return db.session.query(db.func.max(CatalogoCambio.id)).scalar() or 0
 
 
-def _safe_int(value):
-    if value is None:
-        return None
-    try:
-        if isinstance(value, str):
-            value = value.strip()
-            if not value:
-                return None
-        return int(float(value))
-    except (TypeError, ValueError):
-        return None
+def _cambios_catalogo_desde(version, limite=1000):
+    """Cambios posteriores a `version`; si son más de `limite`, un único evento 'recargar'."""
+    registros = CatalogoCambio.query.filter(
+        CatalogoCambio.id > version
+    ).order_by(CatalogoCambio.id).limit(limite + 1).all()
+    if len(registros) > limite:
+        return [{'tipo': 'catalogo', 'accion': 'recargar', 'version': _catalogo_version(), 'producto_id': None}]
+    return [registro.to_dict() for registro in registros]
 
 
-def _parse_date(value):
-    if isinstance(value, datetime):
-        return value.date()
-    if isinstance(value, date):
-        return value
-    if isinstance(value, str):
-        value = value.strip()
-        if not value:
-            return None
-        for fmt in ('%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y'):
-            try:
-                return datetime.strptime(value, fmt).date()
-            except ValueError:
-                continue
-    return None
-
-
-def _parse_time(value):
-    if isinstance(value, time):
-        return value
-    if isinstance(value, datetime):
-        return value.time()
-    if isinstance(value, str):
-        value = value.strip()
-        if not value:
-            return None
-        for fmt in ('%H:%M:%S', '%H:%M'):
-            try:
-                return datetime.strptime(value, fmt).time()
-            except ValueError:
-                continue
-    return None
+def _cambios_catalogo_aparte(version):
+    """`_cambios_catalogo_desde` en un contexto de app propio: la conexión vuelve al pool enseguida."""
+    with app.app_context():
+        return _cambios_catalogo_desde(version)
 
 
-def _extract_cliente_sequence(value):
-    if not value:
-        return 0
-    match = re.search(r'(\d+)$', value)
-    return int(match.group(1)) if match else 0
+def _poll_catalogo(ultima_version):
+    if ultima_version is None:
+        return _catalogo_version(), []
+    eventos = _cambios_catalogo_desde(ultima_version, limite=events.MAX_COLA)
+    if not eventos:
+        return ultima_version, []
+    return eventos[-1]['version'], [(e, f"catalogo:{e['version']}") for e in eventos]
 
 
-def _max_cliente_sequence(rows):
-    max_seq = 0
-    for item in rows:
-        value = item
-        if isinstance(item, (list, tuple)):
-            value = item[0]
-        elif hasattr(item, '_mapping'):
-            value = next(iter(item._mapping.values()), None)
-        max_seq = max(max_seq, _extract_cliente_sequence(value))
-    return max_seq
+def refresh_contadores():
+    terminales = ['POS1', 'POS2', 'POS3', 'TODAS']
+    for terminal in terminales:
+        contador = Contador.query.filter_by(terminal=terminal).first()
+        if not contador:
+            contador = Contador(terminal=terminal)
+            db.session.add(contador)
+        query = Venta.query if terminal == 'TODAS' else Venta.query.filter_by(id_terminal=terminal)
+        archivado = archive.totales_archivados(terminal)
+        contador.total_ventas = query.count() + archivado['lineas']
+        contador.ultima_venta = max(
+            query.with_entities(db.func.max(Venta.id_venta)).scalar() or 0, archivado['ultima_venta']
+        )
+        contador.ultimo_cliente = max(
+            query.with_entities(db.func.max(Venta.cliente_seq)).scalar() or 0, archivado['ultimo_cliente']
+        )
+    db.session.commit()
 
 def login_required(f):
     @wraps(f)
@@ -359,21 +605,21 @@ def get_carrito():
     return session[f'carrito_{usuario}']
 
 def calculate_totals(carrito):
+    """Subtotal, IVA y total del carrito, calculados en centavos."""
     carrito = carrito or []
     subtotal = 0
     for item in carrito:
         if not isinstance(item, dict):
             continue
         if item.get('subtotal') is not None:
-            subtotal += item.get('subtotal', 0)
+            subtotal += dinero.a_centavos(item.get('subtotal', 0)) or 0
         else:
-            subtotal += (item.get('precio', 0) or 0) * (item.get('cantidad', 0) or 0)
-    iva = subtotal * (CONFIG['iva'] / 100)
-    total = subtotal + iva
+            subtotal += (dinero.a_centavos(item.get('precio', 0)) or 0) * (item.get('cantidad', 0) or 0)
+    iva = dinero.porcentaje(subtotal, CONFIG['iva'])
     return {
-        'subtotal': round(subtotal, 2),
-        'iva': round(iva, 2),
-        'total': round(total, 2),
+        'subtotal': dinero.a_pesos(subtotal),
+        'iva': dinero.a_pesos(iva),
+        'total': dinero.a_pesos(subtotal + iva),
         'porcentaje_iva': CONFIG['iva']
     }
 
@@ -390,10 +636,12 @@ def punto_venta():
     contador = Contador.query.filter_by(terminal=terminal).first()
     id_cliente_proximo = (contador.ultimo_cliente + 1) if contador else 1
     
-    productos = Producto.query.filter_by(estado='Disponible').all()
+    productos = lecturas.productos_pos()
     
     return render_template('pos.html',
                          productos=productos,
+                         categorias=lecturas.categorias(productos),
+                         catalogo_version=_catalogo_version(),
                          carrito=carrito_actual,
                          usuario_actual=usuario,
                          rol_actual=rol,
@@ -401,51 +649,98 @@ def punto_venta():
                          totales=totales,
                          id_cliente_actual=f"CLIENTE-{terminal}-{id_cliente_proximo:04d}")
 
-@app.route('/dashboard')
-@app.route('/dashboard/<terminal_id>')
-@login_required
-def dashboard(terminal_id=None):
-    rol = session.get('rol')
-    terminal = session.get('terminal')
-    
-    if terminal_id is None:
-        terminal_id = terminal if rol != 'admin' else 'TODAS'
-    
-    if rol == 'pos' and terminal_id != terminal:
-        return redirect(url_for('dashboard'))
-    
+def _estadisticas_avanzadas(ventas, archivado):
+    hoy = date.today()
+    ventas_hoy = [v for v in ventas if v.fecha == hoy]
+    dias_con_ventas = len(set(v.fecha for v in ventas if v.fecha)) + archivado['dias']
+    monto_historico = dinero.sumar([*(v.total_venta for v in ventas), archivado['ingresos']])
+    vendidos_hoy = Counter()
+    for v in ventas_hoy:
+        vendidos_hoy[v.producto_nombre] += v.cantidad or 0
+    transacciones_hoy = [
+        {
+            'Producto': v.producto_nombre,
+            'ID_Terminal': v.id_terminal,
+            'ID_Cliente': v.id_cliente,
+            'Hora': v.hora.strftime('%H:%M') if v.hora else '',
+            'Total_Venta': v.total_venta or 0,
+            'Cantidad': v.cantidad or 0
+        }
+        for v in sorted(ventas_hoy, key=lambda v: (v.hora or time.min), reverse=True)
+    ]
+    return {
+        'ingresos_hoy': dinero.sumar(v.total_venta for v in ventas_hoy),
+        'productos_vendidos_hoy': sum(vendidos_hoy.values()),
+        'monto_historico': monto_historico,
+        'promedio_diario': monto_historico / dias_con_ventas if dias_con_ventas else 0,
+        'transacciones_hoy_count': len(transacciones_hoy),
+        'transacciones_hoy': transacciones_hoy,
+        'productos_mas_vendidos': [
+            {'producto': nombre, 'cantidad': cantidad}
+            for nombre, cantidad in vendidos_hoy.most_common(10)
+        ]
+    }
+
+def _calcular_dashboard(terminal_id):
     if terminal_id == 'TODAS':
         ventas = Venta.query.all()
         terminal_nombre = "General (Todas las Terminales)"
     else:
         ventas = Venta.query.filter_by(id_terminal=terminal_id).all()
         terminal_nombre = f"Terminal {terminal_id}"
+    archivado = archive.totales_archivados(terminal_id)
     
     if ventas:
         ids_venta_unicos = len(set(v.id_venta for v in ventas))
-        ingresos_totales = sum(v.total_venta for v in ventas)
+        ingresos_totales = dinero.sumar(v.total_venta for v in ventas)
         ventas_hoy = [v for v in ventas if v.fecha == date.today()]
         ventas_hoy_count = len(set(v.id_venta for v in ventas_hoy))
     else:
         ids_venta_unicos = 0
         ingresos_totales = 0
         ventas_hoy_count = 0
+    ids_venta_unicos += archivado['tickets']
+    ingresos_totales = dinero.sumar([ingresos_totales, archivado['ingresos']])
     
     productos_disponibles = Producto.query.filter_by(estado='Disponible').count()
     
     stats = {
         'ventas_totales': ids_venta_unicos,
         'ingresos_totales': f"{CONFIG['moneda']}{ingresos_totales:,.2f}",
+        'ingresos_totales_valor': ingresos_totales,
         'productos_catalogo': productos_disponibles,
         'usuarios_activos': 1,
         'ventas_hoy_count': ventas_hoy_count,
         'dashboard_nombre': f"Dashboard - {terminal_nombre}",
         'terminal_actual': terminal_id
     }
+    return {'stats': stats, 'stats_avanzadas': _estadisticas_avanzadas(ventas, archivado)}
+
+@app.route('/dashboard')
+@app.route('/dashboard/<terminal_id>', endpoint='dashboard_terminal')
+@login_required
+def dashboard(terminal_id=None):
+    rol = session.get('rol')
+    terminal = session.get('terminal')
+    
+    if terminal_id is None:
+        terminal_id = terminal if rol != 'admin' else 'TODAS'
+    
+    if rol == 'pos' and terminal_id != terminal:
+        return redirect(url_for('dashboard'))
+    
+    datos = cache.cached(
+        dashboard_cache,
+        f"dashboard:{terminal_id}:{dashboard_cache.version()}:{date.today()}",
+        app.config['DASHBOARD_CACHE_TTL'],
+        lambda: _calcular_dashboard(terminal_id)
+    )
     
     return render_template('dashboard.html',
-                         stats=stats,
+                         stats=datos['stats'],
+                         stats_avanzadas=datos['stats_avanzadas'],
                          empresa=CONFIG['empresa'],
+                         moneda=CONFIG['moneda'],
                          rol_actual=rol,
                          terminal_actual=terminal,
                          now=datetime.now())
@@ -453,9 +748,11 @@ def dashboard(terminal_id=None):
 @app.route('/editor-catalogo')
 @admin_required
 def editor_catalogo():
-    productos = Producto.query.all()
+    productos = lecturas.productos_editor()
     return render_template('editor_catalogo.html',
                          productos=productos,
+                         categorias=lecturas.categorias(productos),
+                         disponibles=sum(1 for p in productos if p.estado == 'Disponible'),
                          usuario_actual=session.get('usuario'),
                          rol_actual=session.get('rol'),
                          terminal_actual=session.get('terminal'))
@@ -463,21 +760,17 @@ def editor_catalogo():
 @app.route('/obtener-producto/<path:producto_nombre>')
 @login_required
 def obtener_producto(producto_nombre):
+    """Compatibilidad: usar /productos/<id>."""
     try:
-        producto_decodificado = unquote(producto_nombre)
-        producto_limpio = re.sub(r'\s+', ' ', producto_decodificado).strip()
-        
-        logger.info(f"🔍 Buscando producto: '{producto_limpio}'")
+        logger.debug("🔍 Buscando producto: '%s'", producto_nombre)
         
-        producto = Producto.query.filter(
-            db.func.lower(Producto.nombre) == producto_limpio.lower()
-        ).first()
+        producto = _producto_por_nombre(producto_nombre)
         
         if producto:
-            logger.info(f"✅ Producto encontrado: {producto.nombre}")
+            logger.debug("✅ Producto encontrado: %s", producto.nombre)
             return jsonify(producto.to_dict())
         
-        logger.warning(f"❌ Producto no encontrado: {producto_limpio}")
+        logger.warning("❌ Producto no encontrado: %s", unquote(producto_nombre))
         return jsonify({'error': 'Producto no encontrado'}), 404
             
     except Exception as e:
@@ -495,7 +788,7 @@ def actualizar_producto():
         if not data:
             return jsonify({'success': False, 'message': 'No se recibieron datos JSON'}), 400
         
-        logger.info(f"📝 Datos recibidos para actualizar: {data}")
+        logger.debug("📝 Datos recibidos para actualizar: %s", data)
         
         producto_original = data.get('producto_original', '').strip()
         nuevo_nombre = data.get('nombre', '').strip()
@@ -527,8 +820,12 @@ def actualizar_producto():
         producto.precio_venta = precio_float
         producto.proveedor = nuevo_proveedor
         
+        eventos = _registrar_cambios_catalogo([('modificacion', producto)])
         db.session.commit()
-        logger.info(f"✅ Producto actualizado en BD: {nuevo_nombre}")
+        reports.invalidar_cache()
+        dashboard_cache.bump_version()
+        _publicar_cambios_catalogo(eventos)
+        logger.info("✅ Producto actualizado en BD: %s", nuevo_nombre)
         
         return jsonify({
             'success': True,
@@ -551,7 +848,7 @@ def agregar_producto():
         if not data:
             return jsonify({'success': False, 'message': 'No se recibieron datos JSON'}), 400
         
-        logger.info(f"📝 Datos recibidos para agregar: {data}")
+        logger.debug("📝 Datos recibidos para agregar: %s", data)
         
         nombre = re.sub(r'\s+', ' ', data.get('nombre', '')).strip()
         categoria = data.get('categoria', '').strip() or 'Sin Categoría'
@@ -586,8 +883,12 @@ def agregar_producto():
         )
         
         db.session.add(nuevo_producto)
+        eventos = _registrar_cambios_catalogo([('alta', nuevo_producto)])
         db.session.commit()
-        logger.info(f"✅ Producto agregado a BD: {nombre}")
+        reports.invalidar_cache()
+        dashboard_cache.bump_version()
+        _publicar_cambios_catalogo(eventos)
+        logger.info("✅ Producto agregado a BD: %s", nombre)
         
         return jsonify({
             'success': True,
@@ -615,7 +916,7 @@ def eliminar_producto():
         if not producto_nombre:
             return jsonify({'success': False, 'message': 'Nombre del producto requerido'}), 400
         
-        logger.info(f"🗑️ Intentando eliminar producto: {producto_nombre}")
+        logger.debug("🗑️ Intentando eliminar producto: %s", producto_nombre)
         
         producto = Producto.query.filter(
             db.func.lower(Producto.nombre) == producto_nombre.lower()
@@ -624,9 +925,13 @@ def eliminar_producto():
         if not producto:
             return jsonify({'success': False, 'message': f'Producto no encontrado: {producto_nombre}'}), 404
         
+        eventos = _registrar_cambios_catalogo([('baja', producto)])
         db.session.delete(producto)
         db.session.commit()
-        logger.info(f"✅ Producto eliminado de BD: {producto_nombre}")
+        reports.invalidar_cache()
+        dashboard_cache.bump_version()
+        _publicar_cambios_catalogo(eventos)
+        logger.info("✅ Producto eliminado de BD: %s", producto_nombre)
         
         return jsonify({
             'success': True,
@@ -638,29 +943,228 @@ def eliminar_producto():
         logger.error(f"❌ Error eliminando producto: {str(e)}")
         return jsonify({'success': False, 'message': f'Error interno: {str(e)}'}), 500
 
+@app.route('/catalogo/lote', methods=['POST'])
+@admin_required
+def catalogo_lote():
+    """Aplica altas, modificaciones, bajas y ajustes de precio en una sola transacción."""
+    data = request.get_json(silent=True) or {}
+    try:
+        resultados, cambios = catalogo.aplicar_lote(data.get('operaciones'))
+        if not all(r['success'] for r in resultados):
+            db.session.rollback()
+            return jsonify({
+                'success': False,
+                'message': 'Ninguna operación aplicada: hay operaciones inválidas',
+                'resultados': resultados
+            }), 400
+        eventos = _registrar_cambios_catalogo(cambios)
+        db.session.commit()
+    except catalogo.LoteInvalido as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"❌ Error en lote de catálogo: {str(e)}")
+        return jsonify({'success': False, 'message': f'Error interno: {str(e)}'}), 500
+    reports.invalidar_cache()
+    dashboard_cache.bump_version()
+    _publicar_cambios_catalogo(eventos)
+    logger.info(f"✅ Lote de catálogo: {len(resultados)} operaciones, {len(cambios)} productos")
+    return jsonify({
+        'success': True,
+        'message': f'{len(resultados)} operaciones aplicadas',
+        'version': eventos[-1]['version'] if eventos else _catalogo_version(),
+        'resultados': resultados
+    })
+
+def _flag(valor):
+    return str(valor).lower() in ('1', 'true', 'si', 'sí', 'on')
+
+@app.route('/importar-catalogo', methods=['POST'])
+@admin_required
+def importar_catalogo():
+    """Importa catalogo.xlsx (o el .xlsx/.csv subido) por diferencias; `dry_run` sólo reporta.
+
+    Con `segundo_plano` encola un trabajo y responde 202 con su id.
+    """
+    opciones = request.get_json(silent=True) or request.form
+    dry_run = _flag(opciones.get('dry_run', False))
+    retirar_faltantes = _flag(opciones.get('retirar_faltantes', False))
+    segundo_plano = _flag(opciones.get('segundo_plano', False))
+    archivo = request.files.get('archivo')
+    ruta_temporal = None
+    try:
+        if archivo:
+            ruta_temporal, error = _guardar_subida(
+                archivo, 'pocopan_catalogo_', app.config['TRABAJOS_DIR'] if segundo_plano else None
+            )
+            if error:
+                return jsonify({'success': False, 'message': error}), 400
+        if segundo_plano:
+            trabajo = trabajos.runner.encolar('importar_catalogo', {
+                'archivo': os.path.basename(ruta_temporal) if ruta_temporal else None,
+                'retirar_faltantes': retirar_faltantes,
+                'dry_run': dry_run
+            }, usuario=session.get('usuario'))
+            ruta_temporal = None  # la borra el trabajo al terminar
+            return jsonify({'success': True, 'trabajo': trabajo.to_dict()}), 202
+        resultado = seed_catalog_from_excel(
+            retirar_faltantes=retirar_faltantes, dry_run=dry_run, ruta=ruta_temporal
+        )
+        logger.info(
+            f"📥 Importación de catálogo{' (simulada)' if dry_run else ''}: "
+            f"{resultado['created']} nuevos, {resultado['updated']} modificados, "
+            f"{resultado['unchanged']} sin cambios, {resultado['retired']} retirados"
+        )
+        return jsonify({'success': True, 'resultado': resultado})
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"❌ Error importando catálogo: {str(e)}")
+        return jsonify({'success': False, 'message': f'Error interno: {str(e)}'}), 500
+    finally:
+        if ruta_temporal and os.path.exists(ruta_temporal):
+            os.remove(ruta_temporal)
+
+def _guardar_subida(archivo, prefijo, directorio=None):
+    """Guarda un .xlsx/.csv subido; devuelve (ruta, error)."""
+    extension = os.path.splitext(archivo.filename or '')[1].lower() or '.xlsx'
+    if extension not in readers.EXTENSIONES:
+        return None, f"Formato no soportado, usar: {', '.join(readers.EXTENSIONES)}"
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+    fd, ruta = tempfile.mkstemp(suffix=extension, prefix=prefijo, dir=directorio)
+    os.close(fd)
+    archivo.save(ruta)
+    return ruta, None
+
 @app.route('/buscar-productos')
 def buscar_productos():
     query = request.args.get('q', '').strip()
     if len(query) < 2:
         return jsonify([])
     
-    productos = Producto.query.filter(
-        Producto.nombre.ilike(f'%{query}%'),
-        Producto.estado == 'Disponible'
-    ).limit(10).all()
-    
-    return jsonify([p.nombre for p in productos])
+    return _respuesta_catalogo('buscar', lambda version: jsonify(lecturas.nombres_disponibles(query)))
+
+def _producto_por_nombre(producto_nombre):
+    """Búsqueda por nombre visible; sólo la usan los endpoints de compatibilidad."""
+    nombre = re.sub(r'\s+', ' ', unquote(producto_nombre)).strip()
+    return Producto.query.filter(db.func.lower(Producto.nombre) == nombre.lower()).first()
+
+def _estado_catalogo():
+    """(versión, fecha del último cambio) del ledger de catálogo, en una consulta."""
+    version, modificado = db.session.query(
+        db.func.max(CatalogoCambio.id), db.func.max(CatalogoCambio.fecha)
+    ).one()
+    return version or 0, modificado
+
+def _estado_stock(producto_id=None):
+    """(último movimiento, su fecha) de stock: las ventas lo bajan sin pasar por el ledger de catálogo."""
+    consulta = db.session.query(db.func.max(MovimientoStock.id), db.func.max(MovimientoStock.fecha))
+    if producto_id is not None:
+        consulta = consulta.filter(MovimientoStock.producto_id == producto_id)
+    movimiento, modificado = consulta.one()
+    return movimiento or 0, modificado
+
+def _respuesta_catalogo(etag, construir, stock_de=False):
+    """Respuesta derivada del catálogo con ETag/Last-Modified; 304 sin construir el cuerpo.
+
+    Si el cuerpo incluye stock, `stock_de` (True para todo el catálogo o un
+    id de producto) suma a la validación el último movimiento de stock.
+    """
+    version, modificado = _estado_catalogo()
+    etag = f"{etag}-{version}"
+    if stock_de is not False:
+        movimiento, movido = _estado_stock(None if stock_de is True else stock_de)
+        etag = f"{etag}-s{movimiento}"
+        modificado = max(filter(None, (modificado, movido)), default=None)
+    if not is_resource_modified(request.environ, etag=etag, last_modified=modificado):
+        response = app.response_class(status=304)
+    else:
+        response = construir(version)
+    response.set_etag(etag)
+    if modificado:
+        response.last_modified = modificado
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def _respuesta_producto(producto):
+    """Detalle de un producto con ETag por id, versión de catálogo y último movimiento de stock."""
+    return _respuesta_catalogo(
+        f"producto-{producto.id}",
+        lambda version: jsonify({'success': True, 'producto': producto.to_dict()}),
+        stock_de=producto.id
+    )
+
+@app.route('/productos')
+@login_required
+def listar_productos():
+    """Listado liviano: los disponibles del POS o, con `vista=editor` (admin), todos."""
+    if request.args.get('vista') == 'editor':
+        if session.get('rol') != 'admin':
+            return jsonify({'success': False, 'message': 'Acceso denegado'}), 403
+        vista, leer = 'editor', lecturas.productos_editor
+    else:
+        vista, leer = 'pos', lecturas.productos_pos
+    return _respuesta_catalogo(f"productos-{vista}", lambda version: jsonify({
+        'success': True,
+        'version': version,
+        'productos': lecturas.como_dicts(leer())
+    }), stock_de=vista == 'editor')
+
+@app.route('/productos/<int:producto_id>')
+@login_required
+def producto_por_id(producto_id):
+    producto = db.session.get(Producto, producto_id)
+    if not producto:
+        return jsonify({'success': False, 'message': 'Producto no encontrado'}), 404
+    return _respuesta_producto(producto)
+
+@app.route('/productos/<int:producto_id>/stock', methods=['GET', 'POST'])
+@admin_required
+def stock_producto(producto_id):
+    """GET: stock y últimos movimientos. POST: `cantidad` (ingreso/ajuste) o `stock` (inventario)."""
+    producto = db.session.get(Producto, producto_id)
+    if not producto:
+        return jsonify({'success': False, 'message': 'Producto no encontrado'}), 404
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        cantidad = safe_int(data.get('cantidad'))
+        nuevo_stock = safe_int(data.get('stock'))
+        motivo = data.get('motivo') or ('inventario' if nuevo_stock is not None else 'ajuste')
+        try:
+            stock.ajustar(producto_id, cantidad=cantidad, stock=nuevo_stock, motivo=motivo,
+                          referencia=session.get('usuario'))
+            db.session.refresh(producto)
+            eventos = _registrar_cambios_catalogo([('modificacion', producto)])
+            db.session.commit()
+        except stock.AjusteInvalido as e:
+            db.session.rollback()
+            return jsonify({'success': False, 'message': str(e)}), 400
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"❌ Error ajustando stock: {str(e)}")
+            return jsonify({'success': False, 'message': f'Error interno: {str(e)}'}), 500
+        _publicar_cambios_catalogo(eventos)
+        logger.info(f"📦 Stock de {producto.nombre}: {producto.stock} ({motivo})")
+    movimientos = MovimientoStock.query.filter_by(producto_id=producto_id).order_by(
+        MovimientoStock.id.desc()
+    ).limit(50).all()
+    return jsonify({
+        'success': True,
+        'producto_id': producto.id,
+        'stock': producto.stock,
+        'estado': producto.estado,
+        'movimientos': [m.to_dict() for m in movimientos]
+    })
 
 @app.route('/detalles-producto/<path:producto_nombre>')
 @login_required
 def detalles_producto(producto_nombre):
+    """Compatibilidad: usar /productos/<id>."""
     try:
-        producto = Producto.query.filter(
-            db.func.lower(Producto.nombre) == unquote(producto_nombre).lower()
-        ).first()
+        producto = _producto_por_nombre(producto_nombre)
         if not producto:
             return jsonify({'success': False, 'message': 'Producto no encontrado'}), 404
-        return jsonify({'success': True, 'producto': producto.to_dict()})
+        return _respuesta_producto(producto)
     except Exception as e:
         logger.error(f"Error en detalles-producto: {str(e)}")
         return jsonify({'success': False, 'message': 'Error interno'}), 500
@@ -670,26 +1174,38 @@ def detalles_producto(producto_nombre):
 def agregar_carrito():
     try:
         data = request.get_json()
-        producto_nombre = data.get('producto', '').strip()
+        producto_id = safe_int(data.get('producto_id'))
+        producto_nombre = str(data.get('producto') or '').strip()
         cantidad = int(data.get('cantidad', 1))
         
-        if not producto_nombre or cantidad <= 0:
+        if (producto_id is None and not producto_nombre) or cantidad <= 0:
             return jsonify({'success': False, 'message': 'Datos inválidos'}), 400
         
-        producto = Producto.query.filter(
-            db.func.lower(Producto.nombre) == producto_nombre.lower()
-        ).first()
+        if producto_id is not None:
+            producto = db.session.get(Producto, producto_id)
+        else:
+            # Compatibilidad con clientes que todavía envían el nombre
+            producto = _producto_por_nombre(producto_nombre)
         
         if not producto:
             return jsonify({'success': False, 'message': 'Producto no encontrado'}), 404
         
         carrito = get_carrito()
         
+        if producto.stock is not None:
+            en_carrito = sum(i['cantidad'] for i in carrito if i.get('producto_id') == producto.id)
+            if producto.stock < en_carrito + cantidad:
+                return jsonify({
+                    'success': False,
+                    'message': f'Stock insuficiente de {producto.nombre} (disponible: {producto.stock - en_carrito})'
+                }), 409
+        
         item = {
+            'producto_id': producto.id,
             'producto': producto.nombre,
             'cantidad': cantidad,
             'precio': producto.precio_venta,
-            'subtotal': cantidad * producto.precio_venta,
+            'subtotal': dinero.a_pesos(cantidad * dinero.a_centavos(producto.precio_venta)),
             'proveedor': producto.proveedor,
             'categoria': producto.categoria,
             'timestamp': datetime.now().isoformat()
@@ -719,7 +1235,7 @@ def eliminar_carrito(index):
         if index < 0 or index >= len(carrito):
             return jsonify({'success': False, 'message': 'Ítem no encontrado en el carrito'}), 404
         item_eliminado = carrito.pop(index)
-        session[f'carrito_{session.get('""usuario""')}] = carrito
+        session[f'carrito_{session.get("usuario")}'] = carrito
         totales = calculate_totals(carrito)
         return jsonify({
             'success': True,
@@ -748,6 +1264,123 @@ def limpiar_carrito():
         logger.error(f"Error en limpiar-carrito: {str(e)}")
         return jsonify({'success': False, 'message': f'Error: {str(e)}'}), 500
 
+def _totales_hoy():
+    filas = db.session.query(
+        Venta.id_terminal,
+        db.func.count(db.distinct(Venta.id_venta)),
+        db.func.sum(Venta.total_venta)
+    ).filter(Venta.fecha == date.today()).group_by(Venta.id_terminal).all()
+    totales = {
+        terminal: {'tickets': tickets, 'ingresos': ingresos or 0}
+        for terminal, tickets, ingresos in filas
+    }
+    totales['TODAS'] = {
+        'tickets': sum(t['tickets'] for t in totales.values()),
+        'ingresos': dinero.sumar(t['ingresos'] for t in totales.values())
+    }
+    return totales
+
+def _evento_venta(terminal_id, id_venta, id_cliente, hora, lineas, totales_hoy=None):
+    """Evento de un ticket; `totales_hoy` permite compartir una sola consulta entre varios tickets."""
+    return {
+        'tipo': 'venta',
+        'id_venta': id_venta,
+        'terminal': terminal_id,
+        'id_cliente': id_cliente,
+        'hora': hora.strftime('%H:%M') if hora else '',
+        'monto': dinero.sumar(total for _, _, total in lineas),
+        'productos': [
+            {'producto': producto, 'cantidad': cantidad, 'total': round(total or 0, 2)}
+            for producto, cantidad, total in lineas
+        ],
+        'totales_hoy': totales_hoy if totales_hoy is not None else _totales_hoy()
+    }
+
+def _poll_ventas(ultimo_id):
+    """Fallback de eventos entre workers: publica los tickets con id > ultimo_id."""
+    if ultimo_id is None:
+        return db.session.query(db.func.max(Venta.id)).scalar() or 0, []
+    filas = Venta.query.filter(Venta.id > ultimo_id).order_by(Venta.id).limit(5000).all()
+    if not filas:
+        return ultimo_id, []
+    tickets = {}
+    for v in filas:
+        tickets.setdefault((v.id_terminal, v.id_venta), []).append(v)
+    eventos = []
+    totales = _totales_hoy()
+    for (terminal_id, id_venta), lineas in tickets.items():
+        evento = _evento_venta(
+            terminal_id, id_venta, lineas[0].id_cliente, lineas[0].hora,
+            [(v.producto_nombre, v.cantidad, v.total_venta) for v in lineas], totales
+        )
+        eventos.append((evento, f"venta:{terminal_id}:{id_venta}"))
+    return filas[-1].id, eventos
+
+def _cargar_evento_venta(clave):
+    """Reconstruye el evento de un ticket ('venta:POS1:42') desde la BD."""
+    _, terminal_id, id_venta = clave.split(':')
+    lineas = Venta.query.filter_by(id_terminal=terminal_id, id_venta=int(id_venta)).order_by(Venta.id).all()
+    if not lineas:
+        return None
+    return _evento_venta(
+        terminal_id, lineas[0].id_venta, lineas[0].id_cliente, lineas[0].hora,
+        [(v.producto_nombre, v.cantidad, v.total_venta) for v in lineas]
+    )
+
+events.bus.add_poller('ventas', _poll_ventas)
+events.bus.add_poller('catalogo', _poll_catalogo)
+events.bus.add_loader('ventas', _cargar_evento_venta)
+
+@app.route('/eventos/ventas')
+@login_required
+def eventos_ventas():
+    terminal_id = request.args.get('terminal', 'TODAS')
+    if session.get('rol') != 'admin':
+        terminal_id = session.get('terminal')
+    filtro = None if terminal_id == 'TODAS' else (lambda e: e.get('terminal') == terminal_id)
+    return Response(
+        events.sse_stream(events.bus, 'ventas', filtro),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/eventos/catalogo')
+@login_required
+def eventos_catalogo():
+    desde = safe_int(request.headers.get('Last-Event-ID') or request.args.get('desde'))
+    # Los perdidos se leen en su propio contexto (después de suscribirse, sin
+    # huecos); el stream no retiene la sesión ni una conexión mientras dura.
+    previos = (lambda: _cambios_catalogo_aparte(desde)) if desde is not None else None
+    db.session.remove()
+    return Response(
+        events.sse_stream(events.bus, 'catalogo', previos=previos),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/catalogo/cambios')
+@login_required
+def catalogo_cambios():
+    """Long-poll para terminales sin EventSource: espera hasta `espera` segundos."""
+    desde = safe_int(request.args.get('desde')) or 0
+    espera = min(max(safe_float(request.args.get('espera')) or 0, 0), 30)
+    cambios = _cambios_catalogo_desde(desde)
+    if not cambios and espera:
+        cola = events.bus.subscribe('catalogo')
+        db.session.remove()
+        try:
+            cola.get(timeout=espera)
+        except queue.Empty:
+            pass
+        finally:
+            events.bus.unsubscribe('catalogo', cola)
+        cambios = _cambios_catalogo_desde(desde)
+    return jsonify({
+        'success': True,
+        'version': cambios[-1]['version'] if cambios else _catalogo_version(),
+        'cambios': cambios
+    })
+
 @app.route('/finalizar-venta', methods=['POST'])
 @login_required
 def finalizar_venta():
@@ -774,6 +1407,7 @@ def finalizar_venta():
                 fecha=fecha,
                 hora=hora,
                 id_cliente=f"CLIENTE-{terminal_id}-{id_cliente:04d}",
+                producto_id=item.get('producto_id'),
                 producto_nombre=item['producto'],
                 cantidad=item['cantidad'],
                 precio_unitario=item['precio'],
@@ -783,19 +1417,38 @@ def finalizar_venta():
             )
             db.session.add(venta)
         
+        clave_evento = f"venta:{terminal_id}:{id_venta_actual}"
+        try:
+            agotados = stock.descontar(
+                [(item.get('producto_id'), item['cantidad']) for item in carrito], referencia=clave_evento
+            )
+        except stock.StockInsuficiente as e:
+            db.session.rollback()
+            return jsonify({'success': False, 'message': str(e), 'faltantes': e.faltantes}), 409
+        
         contador.ultimo_cliente = id_cliente
         contador.ultima_venta = id_venta_actual
         contador.total_ventas += 1
         
+        db.session.flush()
+        eventos_catalogo = _registrar_cambios_catalogo(
+            [('modificacion', p) for p in Producto.query.filter(Producto.id.in_(agotados))] if agotados else []
+        )
+        evento = _evento_venta(
+            terminal_id, id_venta_actual, f"CLIENTE-{terminal_id}-{id_cliente:04d}", hora,
+            [(i['producto'], i['cantidad'], i['subtotal']) for i in carrito]
+        )
+        events.bus.notify_in_transaction(db.session, 'ventas', evento, clave_evento)
         db.session.commit()
+        dashboard_cache.bump_version()
+        events.bus.publish('ventas', evento, clave_evento)
+        _publicar_cambios_catalogo(eventos_catalogo)
         
-        subtotal = sum(i['subtotal'] for i in carrito)
-        iva = subtotal * 0.21
-        total = subtotal + iva
+        totales = calculate_totals(carrito)
         
         session[f'carrito_{usuario}'] = []
         
-        logger.info(f"✅ Venta finalizada: {id_venta_actual} - Terminal {terminal_id} - ${total:,.2f}")
+        logger.info("✅ Venta finalizada: %s - Terminal %s - $%.2f", id_venta_actual, terminal_id, totales['total'])
         
         return jsonify({
             'success': True,
@@ -805,9 +1458,9 @@ def finalizar_venta():
                 'id_cliente': f"CLIENTE-{terminal_id}-{id_cliente:04d}",
                 'total_productos': len(carrito),
                 'totales': {
-                    'subtotal': round(subtotal, 2),
-                    'iva': round(iva, 2),
-                    'total': round(total, 2)
+                    'subtotal': totales['subtotal'],
+                    'iva': totales['iva'],
+                    'total': totales['total']
                 },
                 'fecha': str(fecha),
                 'hora': str(hora)
@@ -819,22 +1472,355 @@ def finalizar_venta():
         logger.error(f"Error en finalizar-venta: {str(e)}")
         return jsonify({'success': False, 'message': f'Error: {str(e)}'}), 500
 
+def _agrupar_tickets(lineas):
+    """Renglones ordenados -> tickets con sus líneas y total."""
+    tickets = {}
+    for linea in serializacion.ventas(lineas):
+        ticket = tickets.get((linea['id_terminal'], linea['id_venta']))
+        if ticket is None:
+            ticket = tickets[(linea['id_terminal'], linea['id_venta'])] = {
+                campo: linea[campo] for campo in ('id_venta', 'id_terminal', 'id_cliente', 'fecha', 'hora', 'vendedor')
+            }
+            ticket['lineas'] = []
+        ticket['lineas'].append(linea)
+    for ticket in tickets.values():
+        ticket['total'] = dinero.sumar(linea['total_venta'] for linea in ticket['lineas'])
+        ticket['unidades'] = sum(linea['cantidad'] or 0 for linea in ticket['lineas'])
+    return list(tickets.values())
+
+def _terminal_permitida(terminal_id):
+    return session.get('rol') == 'admin' or terminal_id == session.get('terminal')
+
+@app.route('/tickets/<terminal_id>/<int:id_venta>')
+@login_required
+def obtener_ticket(terminal_id, id_venta):
+    """Ticket completo para reimprimir o anular, incluidas ventas ya archivadas."""
+    if not _terminal_permitida(terminal_id):
+        return jsonify({'success': False, 'message': 'Acceso denegado'}), 403
+    tickets = _agrupar_tickets(archive.buscar_lineas(id_terminal=terminal_id, id_venta=id_venta))
+    if not tickets:
+        return jsonify({'success': False, 'message': 'Ticket no encontrado'}), 404
+    return jsonify({'success': True, 'ticket': tickets[0]})
+
+@app.route('/clientes/<id_cliente>/ventas')
+@login_required
+def ventas_cliente(id_cliente):
+    filtros = {'id_cliente': id_cliente}
+    if session.get('rol') != 'admin':
+        filtros['id_terminal'] = session.get('terminal')
+    tickets = _agrupar_tickets(archive.buscar_lineas(**filtros))
+    return jsonify({
+        'success': True,
+        'id_cliente': id_cliente,
+        'tickets': tickets,
+        'total': dinero.sumar(ticket['total'] for ticket in tickets)
+    })
+
+def _rango_fechas_args():
+    desde_raw = request.args.get('desde', '')
+    hasta_raw = request.args.get('hasta', '')
+    desde = parse_date(desde_raw)
+    hasta = parse_date(hasta_raw)
+    if (desde_raw and not desde) or (hasta_raw and not hasta):
+        return None, None, 'Fecha inválida (usar AAAA-MM-DD)'
+    if desde and hasta and desde > hasta:
+        return None, None, 'El rango de fechas es inválido'
+    return desde, hasta, None
+
+@app.route('/exportar-ventas')
+@admin_required
+def exportar_ventas():
+    formato = request.args.get('formato', 'csv').strip().lower()
+    terminal = request.args.get('terminal', 'TODAS').strip() or 'TODAS'
+    desde, hasta, error = _rango_fechas_args()
+    if error:
+        return jsonify({'success': False, 'message': error}), 400
+    try:
+        generador, mimetype, extension = stream_ventas(formato, desde, hasta, terminal)
+    except FormatoNoDisponible as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    nombre = f"ventas_{terminal}_{desde or 'inicio'}_{hasta or 'hoy'}.{extension}"
+    logger.info(f"📤 Exportando ventas: {nombre}")
+    return Response(
+        stream_with_context(generador),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{nombre}"'}
+    )
+
+def _ruta_trabajo(nombre):
+    return os.path.join(app.config['TRABAJOS_DIR'], os.path.basename(nombre))
+
+
+def _trabajo_importar_catalogo(parametros, progreso):
+    ruta = _ruta_trabajo(parametros['archivo']) if parametros.get('archivo') else None
+    try:
+        progreso(0, 'Importando catálogo')
+        return seed_catalog_from_excel(
+            retirar_faltantes=bool(parametros.get('retirar_faltantes')),
+            dry_run=bool(parametros.get('dry_run')),
+            ruta=ruta
+        )
+    finally:
+        if ruta and os.path.exists(ruta):
+            os.remove(ruta)
+
+
+def _trabajo_importar_ventas(parametros, progreso):
+    ruta = _ruta_trabajo(parametros['archivo']) if parametros.get('archivo') else None
+    try:
+        resultado = seed_sales_from_excel(ruta=ruta, progreso=progreso)
+    finally:
+        if ruta and os.path.exists(ruta):
+            os.remove(ruta)
+    progreso(0.9, 'Recalculando contadores')
+    refresh_contadores()
+    return resultado
+
+
+def _trabajo_recalcular_contadores(parametros, progreso):
+    refresh_contadores()
+    return {c.terminal: c.total_ventas for c in Contador.query.order_by(Contador.terminal)}
+
+
+def _trabajo_exportar_ventas(parametros, progreso):
+    """Escribe la exportación en `TRABAJOS_DIR`; se descarga desde `/trabajos/<id>/archivo`."""
+    terminal = str(parametros.get('terminal') or 'TODAS').strip() or 'TODAS'
+    desde = parse_date(parametros.get('desde') or '')
+    hasta = parse_date(parametros.get('hasta') or '')
+    if (parametros.get('desde') and not desde) or (parametros.get('hasta') and not hasta):
+        raise ValueError('Fecha inválida (usar AAAA-MM-DD)')
+    generador, mimetype, extension = stream_ventas(
+        str(parametros.get('formato') or 'csv').strip().lower(), desde, hasta, terminal
+    )
+    os.makedirs(app.config['TRABAJOS_DIR'], exist_ok=True)
+    fd, ruta = tempfile.mkstemp(suffix=f'.{extension}', prefix='pocopan_ventas_', dir=app.config['TRABAJOS_DIR'])
+    escritos = 0
+    with os.fdopen(fd, 'wb') as destino:
+        for trozo in generador:
+            datos = trozo.encode('utf-8') if isinstance(trozo, str) else trozo
+            destino.write(datos)
+            escritos += len(datos)
+            progreso(None, f'{escritos} bytes escritos')
+    return {
+        'archivo': os.path.basename(ruta),
+        'nombre': f"ventas_{terminal}_{desde or 'inicio'}_{hasta or 'hoy'}.{extension}",
+        'mimetype': mimetype,
+        'bytes': escritos
+    }
+
+
+trabajos.runner.registrar('importar_catalogo', _trabajo_importar_catalogo)
+trabajos.runner.registrar('importar_ventas', _trabajo_importar_ventas)
+trabajos.runner.registrar('recalcular_contadores', _trabajo_recalcular_contadores)
+trabajos.runner.registrar('exportar_ventas', _trabajo_exportar_ventas)
+
+
+@app.route('/trabajos', methods=['GET', 'POST'])
+@admin_required
+def trabajos_admin():
+    """GET: últimos trabajos. POST: encola `tipo` con `parametros` (JSON) o un `archivo` (multipart)."""
+    if request.method == 'GET':
+        consulta = Trabajo.query
+        estado = request.args.get('estado', '').strip()
+        if estado:
+            consulta = consulta.filter_by(estado=estado)
+        return jsonify({
+            'success': True,
+            'tipos': trabajos.runner.tipos(),
+            'trabajos': [t.to_dict() for t in consulta.order_by(Trabajo.id.desc()).limit(50)]
+        })
+
+    if request.is_json:
+        datos = request.get_json(silent=True) or {}
+        parametros = datos.get('parametros') or {}
+        if not isinstance(parametros, dict):
+            return jsonify({'success': False, 'message': 'parametros debe ser un objeto'}), 400
+    else:
+        datos = request.form
+        parametros = {clave: valor for clave, valor in request.form.items() if clave != 'tipo'}
+    tipo = str(datos.get('tipo') or '').strip()
+    parametros.pop('archivo', None)  # sólo se aceptan archivos subidos en este request
+    ruta = None
+    archivo = request.files.get('archivo')
+    try:
+        if archivo:
+            ruta, error = _guardar_subida(archivo, f'pocopan_{tipo}_', app.config['TRABAJOS_DIR'])
+            if error:
+                return jsonify({'success': False, 'message': error}), 400
+            parametros['archivo'] = os.path.basename(ruta)
+        trabajo = trabajos.runner.encolar(tipo, parametros, usuario=session.get('usuario'))
+    except trabajos.TipoDesconocido as e:
+        if ruta and os.path.exists(ruta):
+            os.remove(ruta)
+        return jsonify({'success': False, 'message': str(e)}), 400
+    return jsonify({'success': True, 'trabajo': trabajo.to_dict()}), 202
+
+
+@app.route('/trabajos/<int:trabajo_id>')
+@admin_required
+def trabajo_estado(trabajo_id):
+    trabajo = db.session.get(Trabajo, trabajo_id)
+    if not trabajo:
+        return jsonify({'success': False, 'message': 'Trabajo no encontrado'}), 404
+    return jsonify({'success': True, 'trabajo': trabajo.to_dict()})
+
+
+@app.route('/trabajos/<int:trabajo_id>/archivo')
+@admin_required
+def trabajo_archivo(trabajo_id):
+    """Descarga el archivo generado por un trabajo de exportación."""
+    trabajo = db.session.get(Trabajo, trabajo_id)
+    resultado = trabajo.to_dict()['resultado'] if trabajo and trabajo.estado == trabajos.COMPLETADO else None
+    if not isinstance(resultado, dict) or 'archivo' not in resultado:
+        return jsonify({'success': False, 'message': 'El trabajo no generó un archivo'}), 404
+    ruta = _ruta_trabajo(resultado['archivo'])
+    if not os.path.exists(ruta):
+        return jsonify({'success': False, 'message': 'El archivo ya no está disponible'}), 410
+    return send_file(ruta, mimetype=resultado['mimetype'], as_attachment=True, download_name=resultado['nombre'])
+
+@app.route('/reportes/<reporte>')
+@admin_required
+def reporte_ventas(reporte):
+    desde, hasta, error = _rango_fechas_args()
+    if error:
+        return jsonify({'success': False, 'message': error}), 400
+    terminal = request.args.get('terminal', 'TODAS').strip() or 'TODAS'
+    try:
+        if reporte == 'ingresos':
+            datos = reports.ingresos_por_periodo(
+                desde=desde, hasta=hasta, terminal=terminal,
+                agrupacion=request.args.get('agrupacion', 'dia')
+            )
+        elif reporte == 'terminales':
+            datos = reports.ingresos_por_terminal(desde=desde, hasta=hasta)
+        elif reporte == 'categorias':
+            datos = reports.ingresos_por_categoria(desde=desde, hasta=hasta, terminal=terminal)
+        elif reporte == 'top-productos':
+            limite = min(max(safe_int(request.args.get('limite')) or 10, 1), 100)
+            pagina = max(safe_int(request.args.get('pagina')) or 1, 1)
+            datos = reports.top_productos(
+                desde=desde, hasta=hasta, terminal=terminal,
+                orden=request.args.get('orden', 'ingresos'), limite=limite, pagina=pagina
+            )
+        else:
+            return jsonify({'success': False, 'message': f'Reporte desconocido: {reporte}'}), 404
+    except reports.ReporteInvalido as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    return jsonify({
+        'success': True,
+        'reporte': reporte,
+        'desde': str(desde) if desde else None,
+        'hasta': str(hasta) if hasta else None,
+        'terminal': terminal,
+        'datos': datos
+    })
+
+@app.route('/analitica/<analisis>')
+@admin_required
+def analitica_ventas(analisis):
+    desde, hasta, error = _rango_fechas_args()
+    if error:
+        return jsonify({'success': False, 'message': error}), 400
+    terminal = request.args.get('terminal', 'TODAS').strip() or 'TODAS'
+    if analisis not in ('heatmap', 'canastas', 'co-ocurrencia'):
+        return jsonify({'success': False, 'message': f'Análisis desconocido: {analisis}'}), 404
+    # Sin `desde` se analizan los últimos ANALITICA_DIAS días, no toda la historia
+    if desde is None:
+        desde = (hasta or date.today()) - timedelta(days=app.config['ANALITICA_DIAS'] - 1)
+    limite = min(max(safe_int(request.args.get('limite')) or 20, 1), 200)
+    min_tickets = max(safe_int(request.args.get('min_tickets')) or 2, 1)
+
+    def calcular():
+        columnas = analytics.cargar_columnas(desde, hasta, terminal)
+        if analisis == 'heatmap':
+            datos = analytics.heatmap_horario(columnas)
+        elif analisis == 'canastas':
+            datos = analytics.canastas_por_terminal(columnas)
+        else:
+            datos = analytics.co_ocurrencia(columnas, limite=limite, min_tickets=min_tickets)
+        return {'tickets': columnas.n_tickets, 'datos': datos}
+
+    clave = f"analitica:{analisis}:{terminal}:{desde}:{hasta}:{dashboard_cache.version()}"
+    if analisis == 'co-ocurrencia':
+        clave += f":{limite}:{min_tickets}"
+    resultado = cache.cached(dashboard_cache, clave, app.config['ANALITICA_CACHE_TTL'], calcular)
+    
+    return jsonify({
+        'success': True,
+        'analisis': analisis,
+        'desde': desde.isoformat(),
+        'hasta': hasta.isoformat() if hasta else None,
+        'tickets': resultado['tickets'],
+        'datos': resultado['datos']
+    })
+
 @app.route('/diagnostico')
 def diagnostico():
+    """Sonda de vida: ping a la BD y conteos estimados, de costo constante."""
     try:
-        productos_count = Producto.query.count()
-        ventas_count = Venta.query.count()
-        
+        latencia_ms = health.ping()
+        conteos = cache.cached(
+            diagnostico_cache, 'conteos', app.config['DIAGNOSTICO_CACHE_TTL'],
+            lambda: {
+                'productos': health.conteo_estimado(Producto),
+                'ventas_registradas': health.conteo_estimado(Venta),
+                'tickets': int(db.session.query(db.func.coalesce(db.func.sum(Contador.total_ventas), 0))
+                               .filter(Contador.terminal != 'TODAS').scalar())
+            }
+        )
         return jsonify({
             'status': 'OK',
             'mensaje': 'Sistema POCOPAN operativo con BD',
-            'productos': productos_count,
-            'ventas_registradas': ventas_count,
-            'database': 'PostgreSQL' if 'postgresql' in DATABASE_URL else 'SQLite'
+            'database': 'PostgreSQL' if 'postgresql' in DATABASE_URL else 'SQLite',
+            'latencia_ms': latencia_ms,
+            'estimado': True,
+            **conteos
         })
     except Exception as e:
         return jsonify({'status': 'ERROR', 'mensaje': str(e)}), 500
 
+
+def _diagnostico_detallado():
+    esquema = health.esquema(db.metadata.tables.keys())
+    return {
+        'status': 'OK' if esquema['ok'] else 'DEGRADADO',
+        'generado': datetime.now().isoformat(timespec='seconds'),
+        'database': 'PostgreSQL' if 'postgresql' in DATABASE_URL else 'SQLite',
+        'pool': health.pool_stats(),
+        'esquema': esquema,
+        'versiones': {
+            'catalogo': _catalogo_version(),
+            'datos': dashboard_cache.version()
+        },
+        'cache': {
+            'dashboard': health.tasa_aciertos(dashboard_cache.hits, dashboard_cache.misses),
+            'reportes': reports.estadisticas_cache()
+        },
+        'eventos': {
+            'backend': events.bus.backend,
+            'suscriptores': events.bus.subscriber_count(),
+            'streams': events.bus.streams_abiertos()
+        },
+        'importaciones': health.ultimas_importaciones(),
+        'arranque_ms': health.arranque()
+    }
+
+
+@app.route('/diagnostico/detalle')
+@admin_required
+def diagnostico_detalle():
+    """Reporte de preparación: pool, cache, esquema e importaciones (cacheado)."""
+    try:
+        health.ping()
+        reporte = cache.cached(
+            diagnostico_cache, 'detalle', app.config['DIAGNOSTICO_CACHE_TTL'], _diagnostico_detallado
+        )
+        return jsonify(reporte), 200 if reporte['status'] == 'OK' else 503
+    except Exception as e:
+        return jsonify({'status': 'ERROR', 'mensaje': str(e)}), 503
+
 @app.errorhandler(404)
 def not_found(error):
     return render_template('error.html', mensaje="Página no encontrada"), 404
@@ -849,5 +1835,7 @@ if __name__ == '__main__':
         init_db()
     
     port = int(os.getenv('PORT', 5000))
-    debug = os.getenv('FLASK_ENV') == 'development'
+    debug = app.config['ENTORNO'] == 'development'
+    if not debug:
+        logger.warning("⚠️ Servidor de desarrollo; en producción usar: gunicorn -c gunicorn.conf.py")
     app.run(debug=debug, host='0.0.0.0', port=port)
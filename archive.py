@@ -0,0 +1,264 @@
+"""Archivo de ventas: tabla caliente (`ventas`) y tabla fría (`ventas_archivo`).
+
+Los meses cerrados se mueven fuera de `ventas` para que el POS, el dashboard
+y los índices trabajen sobre pocos meses. Antes de moverlos se acumulan en
+`ventas_resumen` (una fila por día y terminal), que alcanza para los totales
+históricos y los contadores sin leer el archivo.
+
+    - PostgreSQL: `ventas_archivo` está particionada por RANGE(fecha), una
+      partición por mes (`ventas_archivo_2024_01`, ...) creada al archivar.
+    - SQLite: tabla común con índice por fecha.
+
+`ventas_rango` devuelve las ventas de un rango como subconsulta con las
+columnas de `Venta` y sólo agrega el UNION ALL con el archivo cuando el rango
+empieza en o antes del último día archivado.
+
+Uso:
+    python archive.py --meses-calientes 3
+    python archive.py --hasta 2024-01-01 --dry-run
+"""
+import argparse
+import os
+import sys
+from datetime import date
+
+from sqlalchemy import delete, insert, text
+
+import dinero
+from models import db, ResumenVentas, Venta
+
+MESES_CALIENTES = 3
+
+_metadata = db.MetaData()
+ventas_archivo = db.Table(
+    'ventas_archivo', _metadata,
+    *[db.Column(columna.name, columna.type) for columna in Venta.__table__.columns],
+    db.Index('ix_ventas_archivo_fecha', 'fecha'),
+    db.Index('ix_ventas_archivo_terminal_venta', 'id_terminal', 'id_venta'),
+    db.Index('ix_ventas_archivo_cliente', 'id_cliente'),
+)
+COLUMNAS = [columna.name for columna in Venta.__table__.columns]
+
+
+def _inicio_mes(dia):
+    return dia.replace(day=1)
+
+
+def _mes_siguiente(dia):
+    return date(dia.year + dia.month // 12, dia.month % 12 + 1, 1)
+
+
+def corte(meses_calientes=MESES_CALIENTES, hoy=None):
+    """Primer día del mes más viejo que queda en caliente (el mes actual cuenta como uno)."""
+    hoy = hoy or date.today()
+    meses = max(int(meses_calientes), 1) - 1
+    indice = hoy.year * 12 + hoy.month - 1 - meses
+    return date(indice // 12, indice % 12 + 1, 1)
+
+
+def frontera():
+    """Último día con ventas archivadas, o None si no se archivó nada."""
+    return db.session.query(db.func.max(ResumenVentas.fecha)).scalar()
+
+
+def asegurar_archivo(meses=()):
+    """Crea la tabla de archivo y, en PostgreSQL, las particiones de `meses`."""
+    conexion = db.session.connection()
+    if conexion.dialect.name != 'postgresql':
+        ventas_archivo.create(conexion, checkfirst=True)
+        return
+    conexion.execute(text(
+        'CREATE TABLE IF NOT EXISTS ventas_archivo (LIKE ventas INCLUDING DEFAULTS) PARTITION BY RANGE (fecha)'
+    ))
+    for inicio in meses:
+        conexion.execute(text(
+            f'CREATE TABLE IF NOT EXISTS ventas_archivo_{inicio:%Y_%m} PARTITION OF ventas_archivo '
+            f"FOR VALUES FROM ('{inicio:%Y-%m-%d}') TO ('{_mes_siguiente(inicio):%Y-%m-%d}')"
+        ))
+    for indice in ventas_archivo.indexes:
+        columnas = ', '.join(columna.name for columna in indice.columns)
+        conexion.execute(text(f'CREATE INDEX IF NOT EXISTS {indice.name} ON ventas_archivo ({columnas})'))
+
+
+def _filtrar(stmt, tabla, desde, hasta, terminal):
+    if desde is not None:
+        stmt = stmt.where(tabla.c.fecha >= desde)
+    if hasta is not None:
+        stmt = stmt.where(tabla.c.fecha <= hasta)
+    if terminal and terminal != 'TODAS':
+        stmt = stmt.where(tabla.c.id_terminal == terminal)
+    return stmt
+
+
+def necesita_archivo(desde):
+    limite = frontera()
+    return limite is not None and (desde is None or desde <= limite)
+
+
+def ventas_rango(desde=None, hasta=None, terminal=None):
+    """Subconsulta `ventas_rango` con las ventas del rango, caliente + archivo si hace falta."""
+    caliente = Venta.__table__
+    stmt = _filtrar(db.select(*[caliente.c[n] for n in COLUMNAS]), caliente, desde, hasta, terminal)
+    if necesita_archivo(desde):
+        archivo = _filtrar(
+            db.select(*[ventas_archivo.c[n] for n in COLUMNAS]), ventas_archivo, desde, hasta, terminal
+        )
+        stmt = db.union_all(stmt, archivo)
+    return stmt.subquery('ventas_rango')
+
+
+def buscar_lineas(**filtros):
+    """Renglones con columnas iguales a `filtros`, de `ventas` y del archivo si hay algo archivado.
+
+    Una sola consulta (UNION ALL) que resuelven los índices por terminal y
+    venta o por cliente de cada tabla, ordenada por fecha, hora y renglón.
+    """
+    def consulta(tabla):
+        return db.select(*[tabla.c[n] for n in COLUMNAS]).where(
+            *[tabla.c[columna] == valor for columna, valor in filtros.items()]
+        )
+
+    stmt = consulta(Venta.__table__)
+    if frontera() is not None:
+        stmt = db.union_all(stmt, consulta(ventas_archivo))
+    lineas = stmt.subquery('lineas')
+    return db.session.execute(
+        db.select(lineas).order_by(lineas.c.fecha, lineas.c.hora, lineas.c.id_terminal, lineas.c.id_venta, lineas.c.id)
+    ).all()
+
+
+def totales_archivados(terminal=None):
+    """Totales de `ventas_resumen`: tickets, lineas, unidades, ingresos, dias, ultima_venta, ultimo_cliente."""
+    stmt = db.select(
+        db.func.sum(ResumenVentas.tickets),
+        db.func.sum(ResumenVentas.lineas),
+        db.func.sum(ResumenVentas.unidades),
+        db.func.sum(ResumenVentas.ingresos),
+        db.func.count(db.distinct(ResumenVentas.fecha)),
+        db.func.max(ResumenVentas.ultima_venta),
+        db.func.max(ResumenVentas.ultimo_cliente),
+    )
+    if terminal and terminal != 'TODAS':
+        stmt = stmt.where(ResumenVentas.id_terminal == terminal)
+    tickets, lineas, unidades, ingresos, dias, ultima_venta, ultimo_cliente = db.session.execute(stmt).one()
+    return {
+        'tickets': int(tickets or 0),
+        'lineas': int(lineas or 0),
+        'unidades': int(unidades or 0),
+        'ingresos': float(ingresos or 0),
+        'dias': int(dias or 0),
+        'ultima_venta': int(ultima_venta or 0),
+        'ultimo_cliente': int(ultimo_cliente or 0),
+    }
+
+
+def _resumir(desde, hasta):
+    """Acumula en `ventas_resumen` las ventas calientes de [desde, hasta); devuelve los días."""
+    en_rango = (Venta.fecha >= desde, Venta.fecha < hasta)
+    grupos = db.session.execute(
+        db.select(
+            Venta.fecha,
+            Venta.id_terminal,
+            db.func.count(db.distinct(Venta.id_venta)),
+            db.func.count(),
+            db.func.sum(Venta.cantidad),
+            db.func.sum(Venta.total_venta),
+            db.func.max(Venta.id_venta),
+        ).where(*en_rango).group_by(Venta.fecha, Venta.id_terminal)
+    ).all()
+    clientes = {
+        (fecha, terminal): ultimo or 0
+        for fecha, terminal, ultimo in db.session.execute(
+            db.select(Venta.fecha, Venta.id_terminal, db.func.max(Venta.cliente_seq))
+            .where(*en_rango).group_by(Venta.fecha, Venta.id_terminal)
+        )
+    }
+
+    existentes = {
+        (r.fecha, r.id_terminal): r
+        for r in ResumenVentas.query.filter(ResumenVentas.fecha >= desde, ResumenVentas.fecha < hasta)
+    }
+    for fecha, terminal, tickets, lineas, unidades, ingresos, ultima_venta in grupos:
+        ultimo_cliente = clientes.get((fecha, terminal), 0)
+        terminal = terminal or 'TODAS'
+        resumen = existentes.get((fecha, terminal))
+        if resumen is None:
+            resumen = ResumenVentas(
+                fecha=fecha, id_terminal=terminal, tickets=0, lineas=0, unidades=0,
+                ingresos=0, ultima_venta=0, ultimo_cliente=0
+            )
+            db.session.add(resumen)
+            existentes[(fecha, terminal)] = resumen
+        resumen.tickets += tickets
+        resumen.lineas += lineas
+        resumen.unidades += int(unidades or 0)
+        resumen.ingresos = dinero.sumar([resumen.ingresos, ingresos])
+        resumen.ultima_venta = max(resumen.ultima_venta, ultima_venta or 0)
+        resumen.ultimo_cliente = max(resumen.ultimo_cliente, ultimo_cliente)
+    return len({fecha for fecha, *_ in grupos})
+
+
+def archivar(hasta, dry_run=False):
+    """Mueve a `ventas_archivo` las ventas con fecha anterior a `hasta`, un mes por transacción.
+
+    Devuelve {'meses': [{'mes', 'filas', 'dias'}], 'filas': total, 'dry_run'}.
+    """
+    primera = db.session.query(db.func.min(Venta.fecha)).filter(Venta.fecha < hasta).scalar()
+    reporte = {'meses': [], 'filas': 0, 'dry_run': dry_run}
+    if primera is None:
+        return reporte
+    inicio = _inicio_mes(primera)
+    while inicio < hasta:
+        fin = min(_mes_siguiente(inicio), hasta)
+        filtro = (Venta.fecha >= inicio, Venta.fecha < fin)
+        filas = db.session.query(db.func.count(Venta.id)).filter(*filtro).scalar()
+        if filas:
+            mes = {'mes': f'{inicio:%Y-%m}', 'filas': filas}
+            if dry_run:
+                mes['dias'] = db.session.query(db.func.count(db.distinct(Venta.fecha))).filter(*filtro).scalar()
+            else:
+                asegurar_archivo([inicio])
+                mes['dias'] = _resumir(inicio, fin)
+                columnas = [Venta.__table__.c[n] for n in COLUMNAS]
+                db.session.execute(
+                    insert(ventas_archivo).from_select(COLUMNAS, db.select(*columnas).where(*filtro))
+                )
+                db.session.execute(delete(Venta).where(*filtro).execution_options(synchronize_session=False))
+                db.session.commit()
+            reporte['meses'].append(mes)
+            reporte['filas'] += filas
+        inicio = fin
+    return reporte
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Archiva los meses cerrados de ventas de POCOPAN')
+    grupo = parser.add_mutually_exclusive_group()
+    grupo.add_argument('--meses-calientes', type=int,
+                       default=int(os.getenv('ARCHIVO_MESES_CALIENTES', MESES_CALIENTES)),
+                       help='Meses (incluido el actual) que quedan en la tabla caliente')
+    grupo.add_argument('--hasta', type=date.fromisoformat, help='Archivar ventas anteriores a esta fecha')
+    parser.add_argument('--dry-run', action='store_true', help='Sólo informar qué se movería')
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import reports
+    from app import app, dashboard_cache, refresh_contadores
+
+    hasta = args.hasta or corte(args.meses_calientes)
+    with app.app_context():
+        db.create_all()
+        reporte = archivar(hasta, dry_run=args.dry_run)
+        if reporte['filas'] and not args.dry_run:
+            refresh_contadores()
+            reports.invalidar_cache()
+            dashboard_cache.bump_version()
+    accion = 'se moverían' if args.dry_run else 'movidas'
+    for mes in reporte['meses']:
+        print(f"  {mes['mes']}: {mes['filas']} filas, {mes['dias']} días")
+    print(f"✅ {reporte['filas']} ventas anteriores a {hasta} {accion} al archivo")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
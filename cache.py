@@ -0,0 +1,149 @@
+"""Cache de corta duración para estadísticas del dashboard.
+
+Las entradas se guardan con un TTL y la clave incluye un contador de versión
+de datos que se incrementa cada vez que cambian las ventas o el catálogo
+(`finalizar_venta`, seeders, editor de catálogo), así que una venta nueva
+invalida todo sin tener que recorrer claves.
+
+Backends:
+    - `MemoryCache`: LRU en el proceso (por defecto). Con varios workers cada
+      uno tiene su propia versión, por lo que otro worker puede servir datos
+      viejos hasta que venza el TTL.
+    - `SQLiteCache`: archivo SQLite compartido por todos los workers de la
+      misma máquina, incluida la versión de datos.
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import serializacion
+
+
+class MemoryCache:
+    def __init__(self, max_items=256):
+        self.max_items = max_items
+        self._items = OrderedDict()
+        self._version = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or item[0] < time.monotonic():
+                if item is not None:
+                    del self._items[key]
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._items[key] = (time.monotonic() + ttl, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def version(self):
+        return self._version
+
+    def bump_version(self):
+        with self._lock:
+            self._version += 1
+            return self._version
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+class SQLiteCache:
+    def __init__(self, path, max_items=1024):
+        self.path = path
+        self.max_items = max_items
+        self.hits = 0
+        self.misses = 0
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'clave TEXT PRIMARY KEY, valor TEXT NOT NULL, expira REAL NOT NULL)'
+            )
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS version_datos ('
+                'id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL)'
+            )
+            conn.execute('INSERT OR IGNORE INTO version_datos (id, version) VALUES (1, 0)')
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def get(self, key):
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT valor FROM cache WHERE clave = ? AND expira >= ?', (key, time.time())
+            ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return serializacion.loads(row[0])
+
+    def set(self, key, value, ttl):
+        ahora = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO cache (clave, valor, expira) VALUES (?, ?, ?)',
+                (key, serializacion.dumps(value), ahora + ttl)
+            )
+            conn.execute('DELETE FROM cache WHERE expira < ?', (ahora,))
+            conn.execute(
+                'DELETE FROM cache WHERE clave NOT IN '
+                '(SELECT clave FROM cache ORDER BY expira DESC LIMIT ?)', (self.max_items,)
+            )
+
+    def version(self):
+        with self._connect() as conn:
+            return conn.execute('SELECT version FROM version_datos WHERE id = 1').fetchone()[0]
+
+    def bump_version(self):
+        with self._connect() as conn:
+            conn.execute('UPDATE version_datos SET version = version + 1 WHERE id = 1')
+            return conn.execute('SELECT version FROM version_datos WHERE id = 1').fetchone()[0]
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM cache')
+
+
+def crear_cache(backend='memoria', path=None, max_items=256):
+    if backend == 'memoria':
+        return MemoryCache(max_items=max_items)
+    if backend == 'sqlite':
+        if not path:
+            raise ValueError('El backend sqlite requiere una ruta de archivo')
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        return SQLiteCache(path, max_items=max_items)
+    raise ValueError(f'Backend de cache desconocido: {backend}')
+
+
+def cached(backend, key, ttl, compute):
+    """Devuelve el valor cacheado para `key` o lo calcula y lo guarda."""
+    if ttl <= 0:
+        return compute()
+    value = backend.get(key)
+    if value is None:
+        value = compute()
+        backend.set(key, value, ttl)
+    return value
@@ -0,0 +1,210 @@
+"""Edición de catálogo en lote para el editor.
+
+`aplicar_lote` ejecuta una lista de operaciones dentro de la transacción de la
+sesión actual, sin commit: la ruta decide si confirma o revierte según los
+resultados. Los productos referenciados se cargan con una sola consulta y los
+ajustes de precio porcentuales se hacen con un único UPDATE por operación.
+
+Operaciones (`accion`):
+    - 'alta': nombre, precio_venta y opcionalmente categoria, subcategoria, proveedor.
+    - 'modificacion': id (o nombre) y los campos a cambiar.
+    - 'baja': id (o nombre).
+    - 'ajuste_precio': porcentaje y filtros opcionales categoria, proveedor, ids.
+"""
+import re
+
+from sqlalchemy import BigInteger, case, type_coerce, update
+
+from models import db, Producto
+
+ACCIONES = ('alta', 'modificacion', 'baja', 'ajuste_precio')
+CAMPOS_EDITABLES = ('nombre', 'categoria', 'subcategoria', 'precio_venta', 'proveedor', 'estado')
+MAX_OPERACIONES = 1000
+
+
+class LoteInvalido(ValueError):
+    pass
+
+
+class OperacionInvalida(ValueError):
+    pass
+
+
+def _normalizar_nombre(valor):
+    return re.sub(r'\s+', ' ', str(valor or '')).strip()
+
+
+def _precio(valor):
+    try:
+        precio = float(valor)
+    except (TypeError, ValueError):
+        raise OperacionInvalida('Precio inválido')
+    if precio <= 0:
+        raise OperacionInvalida('El precio debe ser mayor a 0')
+    return round(precio, 2)
+
+
+def _precargar(operaciones):
+    """Carga en dos consultas los productos referenciados por id o por nombre."""
+    ids, nombres = set(), set()
+    for op in operaciones:
+        if not isinstance(op, dict):
+            continue
+        if op.get('id') is not None:
+            try:
+                ids.add(int(op['id']))
+            except (TypeError, ValueError):
+                pass
+        for clave in ('nombre', 'producto_original'):
+            if op.get(clave):
+                nombres.add(_normalizar_nombre(op[clave]).lower())
+    por_id, por_nombre = {}, {}
+    if ids:
+        por_id = {p.id: p for p in Producto.query.filter(Producto.id.in_(ids))}
+    if nombres:
+        por_nombre = {
+            p.nombre.lower(): p
+            for p in Producto.query.filter(db.func.lower(Producto.nombre).in_(nombres))
+        }
+    return por_id, por_nombre
+
+
+def aplicar_lote(operaciones):
+    """Aplica las operaciones sin commit; devuelve (resultados, [(accion, producto), ...])."""
+    if not isinstance(operaciones, list) or not operaciones:
+        raise LoteInvalido('Se requiere una lista de operaciones')
+    if len(operaciones) > MAX_OPERACIONES:
+        raise LoteInvalido(f'Máximo {MAX_OPERACIONES} operaciones por lote')
+
+    por_id, por_nombre = _precargar(operaciones)
+    resultados, cambios = [], []
+    eliminados = set()
+    altas = []
+
+    def buscar(op):
+        if op.get('id') is not None:
+            try:
+                producto = por_id.get(int(op['id']))
+            except (TypeError, ValueError):
+                raise OperacionInvalida('id inválido')
+        else:
+            clave = op.get('producto_original') or op.get('nombre')
+            producto = por_nombre.get(_normalizar_nombre(clave).lower())
+        if producto is None or producto in eliminados:
+            raise OperacionInvalida('Producto no encontrado')
+        return producto
+
+    for indice, op in enumerate(operaciones):
+        accion = op.get('accion') if isinstance(op, dict) else None
+        resultado = {'indice': indice, 'accion': accion}
+        try:
+            if accion not in ACCIONES:
+                raise OperacionInvalida(f"Acción inválida, usar: {', '.join(ACCIONES)}")
+            if accion == 'alta':
+                producto = _alta(op, por_nombre)
+                cambios.append(('alta', producto))
+                altas.append((resultado, producto))
+                resultado['nombre'] = producto.nombre
+            elif accion == 'modificacion':
+                producto = buscar(op)
+                _modificar(producto, op, por_nombre)
+                cambios.append(('modificacion', producto))
+                resultado['id'] = producto.id
+            elif accion == 'baja':
+                producto = buscar(op)
+                cambios.append(('baja', producto))
+                db.session.delete(producto)
+                eliminados.add(producto)
+                por_nombre.pop(producto.nombre.lower(), None)
+                resultado['id'] = producto.id
+            else:
+                productos = _ajustar_precio(op)
+                cambios.extend(('modificacion', p) for p in productos)
+                resultado['ids'] = [p.id for p in productos]
+                resultado['afectados'] = len(productos)
+            resultado['success'] = True
+        except OperacionInvalida as exc:
+            resultado.update(success=False, message=str(exc))
+        resultados.append(resultado)
+    if all(r['success'] for r in resultados):
+        db.session.flush()
+        for resultado, producto in altas:
+            resultado['id'] = producto.id
+    return resultados, cambios
+
+
+def _alta(op, por_nombre):
+    nombre = _normalizar_nombre(op.get('nombre'))
+    if not nombre:
+        raise OperacionInvalida('Nombre del producto requerido')
+    if nombre.lower() in por_nombre:
+        raise OperacionInvalida(f'El producto "{nombre}" ya existe')
+    producto = Producto(
+        nombre=nombre,
+        categoria=_normalizar_nombre(op.get('categoria')) or 'Sin Categoría',
+        subcategoria=_normalizar_nombre(op.get('subcategoria')),
+        precio_venta=_precio(op.get('precio_venta')),
+        proveedor=_normalizar_nombre(op.get('proveedor')) or 'Sin Proveedor',
+        estado='Disponible'
+    )
+    db.session.add(producto)
+    por_nombre[nombre.lower()] = producto
+    return producto
+
+
+def _modificar(producto, op, por_nombre):
+    valores = {campo: op[campo] for campo in CAMPOS_EDITABLES if campo in op}
+    if not valores:
+        raise OperacionInvalida('No hay campos para modificar')
+    if 'precio_venta' in valores:
+        valores['precio_venta'] = _precio(valores['precio_venta'])
+    if 'nombre' in valores:
+        nombre = _normalizar_nombre(valores['nombre'])
+        if not nombre:
+            raise OperacionInvalida('Nombre del producto requerido')
+        otro = por_nombre.get(nombre.lower())
+        if otro is not None and otro is not producto:
+            raise OperacionInvalida(f'El producto "{nombre}" ya existe')
+        por_nombre.pop(producto.nombre.lower(), None)
+        por_nombre[nombre.lower()] = producto
+        valores['nombre'] = nombre
+    for campo in ('categoria', 'subcategoria', 'proveedor', 'estado'):
+        if campo in valores:
+            valores[campo] = _normalizar_nombre(valores[campo])
+    for campo, valor in valores.items():
+        setattr(producto, campo, valor)
+
+
+def _ajustar_precio(op):
+    try:
+        porcentaje = float(op.get('porcentaje'))
+    except (TypeError, ValueError):
+        raise OperacionInvalida('Porcentaje inválido')
+    if porcentaje <= -100:
+        raise OperacionInvalida('El porcentaje debe ser mayor a -100')
+    filtros = []
+    if op.get('categoria'):
+        filtros.append(Producto.categoria == op['categoria'])
+    if op.get('proveedor'):
+        filtros.append(Producto.proveedor == op['proveedor'])
+    if op.get('ids'):
+        try:
+            filtros.append(Producto.id.in_([int(i) for i in op['ids']]))
+        except (TypeError, ValueError):
+            raise OperacionInvalida('ids inválidos')
+    if not filtros:
+        raise OperacionInvalida('El ajuste de precio requiere categoria, proveedor o ids')
+    factor = 1 + porcentaje / 100
+    centavos = type_coerce(Producto.precio_venta, BigInteger)
+    nuevo = db.func.round(centavos * factor)
+    # Como en `_precio`, ningún ajuste deja un producto en 0: el mínimo es un centavo
+    ids = db.session.execute(
+        update(Producto)
+        .where(*filtros)
+        .values(precio_venta=type_coerce(case((nuevo < 1, 1), else_=nuevo), BigInteger))
+        .returning(Producto.id)
+        .execution_options(synchronize_session='fetch')
+    ).scalars().all()
+    if not ids:
+        return []
+    return Producto.query.filter(Producto.id.in_(ids)).order_by(Producto.id).all()
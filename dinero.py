@@ -0,0 +1,62 @@
+"""Importes guardados como centavos enteros.
+
+Las columnas de dinero (`precio_venta`, `precio_unitario`, `total_venta`,
+`ingresos`) usan el tipo `Centavos`: en la base son BIGINT con centavos, así
+que `SUM()` en reportes y tableros es una suma entera, exacta y más barata
+que sobre REAL/DOUBLE. Del lado de Python el modelo sigue exponiendo pesos
+con dos decimales (float), de modo que JSON, plantillas y carrito no cambian.
+
+Las cuentas en Python (carrito, IVA, acumulados) se hacen en centavos con
+redondeo half-up (`a_centavos`, `porcentaje`, `sumar`) y se pasan a pesos
+sólo al final.
+
+Ojo con la aritmética en SQL sobre estas columnas: un literal se bindea con
+el mismo tipo (se multiplica por 100). Para escalar por un factor usar
+`type_coerce(columna, BigInteger)` y operar sobre los centavos.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+from sqlalchemy import BigInteger
+from sqlalchemy.types import TypeDecorator
+
+CENTAVO = Decimal('1')
+
+
+def a_centavos(valor):
+    """Pesos (float, int, Decimal o str) a centavos enteros, redondeando half-up."""
+    if valor is None or valor == '':
+        return None
+    return int((Decimal(str(valor)) * 100).quantize(CENTAVO, rounding=ROUND_HALF_UP))
+
+
+def a_pesos(centavos):
+    if centavos is None:
+        return None
+    return round(centavos) / 100
+
+
+def porcentaje(centavos, tasa):
+    """`tasa`% de `centavos`, en centavos enteros (half-up)."""
+    return int((Decimal(centavos) * Decimal(str(tasa)) / 100).quantize(CENTAVO, rounding=ROUND_HALF_UP))
+
+
+def sumar(valores):
+    """Suma exacta de importes en pesos; devuelve pesos."""
+    return a_pesos(sum(a_centavos(valor) or 0 for valor in valores))
+
+
+class Centavos(TypeDecorator):
+    """BIGINT de centavos en la base, pesos (float) en Python."""
+
+    impl = BigInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return a_centavos(value)
+
+    def process_result_value(self, value, dialect):
+        return a_pesos(value)
+
+    @property
+    def python_type(self):
+        return float
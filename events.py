@@ -0,0 +1,261 @@
+"""Pub/sub de eventos en el proceso para los streams SSE.
+
+`EventBus` reparte eventos por canal ('ventas', 'catalogo') a colas de
+suscriptores acotadas. Para que los eventos crucen workers hay dos backends
+además del local:
+
+    - 'postgres': el evento viaja con `pg_notify` dentro de la misma
+      transacción que lo origina (sólo se entrega si hay commit) y un hilo
+      por proceso hace LISTEN y lo republica localmente. PostgreSQL rechaza
+      payloads de 8000 bytes o más: si el evento no entra se notifica sólo
+      su clave y el listener lo reconstruye con el cargador del canal
+      (`add_loader`).
+    - 'polling': un hilo por proceso consulta `ventas` y `catalogo_cambios`
+      cada `poll_interval` segundos y publica las filas nuevas.
+
+Los eventos llevan una clave (p.ej. `venta:POS1:42`) y el bus descarta
+duplicados recientes, así que publicar localmente y recibir el mismo evento
+por LISTEN o polling no lo entrega dos veces.
+
+Cada stream SSE ocupa un hilo del worker mientras está abierto. Con
+`max_streams` el bus limita los streams en vivo por proceso: los que exceden
+el cupo envían sólo la puesta al día (`previos`) y se cierran, y el navegador
+se reconecta a los `retry` ms desde su Last-Event-ID. Así los hilos que quedan
+atienden checkouts en lugar de esperar detrás de streams.
+
+El hilo de LISTEN/polling arranca con el primer suscriptor de cada proceso;
+después de un `fork` el bus del hijo se reinicia sin hilo ni suscriptores.
+"""
+import logging
+import os
+import queue
+import select
+import threading
+import time
+from collections import OrderedDict
+
+import serializacion
+
+logger = logging.getLogger(__name__)
+
+CANAL_PG = 'pocopan_eventos'
+MAX_COLA = 100
+MAX_CLAVES_RECIENTES = 2048
+MAX_PAYLOAD_PG = 7900
+
+
+class EventBus:
+    def __init__(self):
+        self.backend = 'memoria'
+        self.poll_interval = 2.0
+        self._app = None
+        self._suscriptores = {}
+        self._recientes = OrderedDict()
+        self._lock = threading.Lock()
+        self._listener = None
+        self._pollers = {}
+        self._cargadores = {}
+        self.max_streams = 0
+        self._streams = 0
+
+    def configure(self, app, backend='memoria', poll_interval=2.0, max_streams=0):
+        if backend not in ('memoria', 'postgres', 'polling'):
+            raise ValueError(f'Backend de eventos desconocido: {backend}')
+        self._app = app
+        self.backend = backend
+        self.poll_interval = poll_interval
+        self.max_streams = max_streams
+
+    def reiniciar_tras_fork(self):
+        self._lock = threading.Lock()
+        self._suscriptores = {}
+        self._listener = None
+        self._streams = 0
+
+    def reservar_stream(self):
+        """Ocupa un lugar de stream en vivo; False si el proceso ya tiene `max_streams` (0 = sin límite)."""
+        with self._lock:
+            if self.max_streams and self._streams >= self.max_streams:
+                return False
+            self._streams += 1
+            return True
+
+    def liberar_stream(self):
+        with self._lock:
+            self._streams -= 1
+
+    def streams_abiertos(self):
+        with self._lock:
+            return self._streams
+
+    def subscribe(self, canal):
+        cola = queue.Queue(maxsize=MAX_COLA)
+        with self._lock:
+            self._suscriptores.setdefault(canal, set()).add(cola)
+        self._ensure_listener(canal)
+        return cola
+
+    def unsubscribe(self, canal, cola):
+        with self._lock:
+            self._suscriptores.get(canal, set()).discard(cola)
+
+    def subscriber_count(self, canal=None):
+        with self._lock:
+            if canal is not None:
+                return len(self._suscriptores.get(canal, ()))
+            return sum(len(colas) for colas in self._suscriptores.values())
+
+    def publish(self, canal, evento, clave=None):
+        with self._lock:
+            if clave is not None:
+                if clave in self._recientes:
+                    return False
+                self._recientes[clave] = True
+                while len(self._recientes) > MAX_CLAVES_RECIENTES:
+                    self._recientes.popitem(last=False)
+            colas = list(self._suscriptores.get(canal, ()))
+        for cola in colas:
+            try:
+                cola.put_nowait(evento)
+            except queue.Full:
+                # Cliente lento: se descarta el evento más viejo para no bloquear
+                try:
+                    cola.get_nowait()
+                    cola.put_nowait(evento)
+                except (queue.Empty, queue.Full):
+                    pass
+        return True
+
+    def notify_in_transaction(self, session, canal, evento, clave=None):
+        """Encola el evento en la transacción actual cuando el backend es postgres."""
+        if self.backend != 'postgres':
+            return False
+        from sqlalchemy import text
+        payload = serializacion.dumps({'canal': canal, 'clave': clave, 'evento': evento})
+        if len(payload.encode('utf-8')) > MAX_PAYLOAD_PG:
+            if clave is None or canal not in self._cargadores:
+                logger.warning("⚠️ Evento '%s' demasiado grande para pg_notify, sólo se publica localmente", canal)
+                return False
+            payload = serializacion.dumps({'canal': canal, 'clave': clave})
+        session.execute(text('SELECT pg_notify(:canal, :payload)'), {'canal': CANAL_PG, 'payload': payload})
+        return True
+
+    def add_loader(self, canal, cargar_fn):
+        """Registra `cargar_fn(clave) -> evento | None` para avisos de postgres que sólo traen la clave."""
+        self._cargadores[canal] = cargar_fn
+
+    def _recibir(self, payload):
+        """Publica localmente un aviso de LISTEN (completo o sólo con la clave)."""
+        datos = serializacion.loads(payload)
+        evento = datos.get('evento')
+        if evento is None:
+            with self._app.app_context():
+                evento = self._cargadores[datos['canal']](datos['clave'])
+            if evento is None:
+                return False
+        return self.publish(datos['canal'], evento, datos.get('clave'))
+
+    def add_poller(self, canal, poll_fn):
+        """Registra `poll_fn(estado) -> (estado, [(evento, clave), ...])` para el backend polling."""
+        self._pollers[canal] = poll_fn
+
+    def _ensure_listener(self, canal):
+        if self.backend == 'memoria' or self._app is None:
+            return
+        with self._lock:
+            if self._listener is not None and self._listener.is_alive():
+                return
+            objetivo = self._listen_postgres if self.backend == 'postgres' else self._poll
+            self._listener = threading.Thread(target=objetivo, name='pocopan-eventos', daemon=True)
+            self._listener.start()
+
+    def _listen_postgres(self):
+        from models import db
+
+        while True:
+            try:
+                with self._app.app_context():
+                    raw = db.engine.raw_connection()
+                try:
+                    conn = raw.driver_connection
+                    conn.autocommit = True
+                    with conn.cursor() as cur:
+                        cur.execute(f'LISTEN {CANAL_PG}')
+                    while True:
+                        if select.select([conn], [], [], 5) == ([], [], []):
+                            continue
+                        conn.poll()
+                        while conn.notifies:
+                            aviso = conn.notifies.pop(0)
+                            try:
+                                self._recibir(aviso.payload)
+                            except Exception as exc:
+                                logger.warning(f"⚠️ Evento recibido por LISTEN descartado: {exc}")
+                finally:
+                    raw.close()
+            except Exception as exc:
+                logger.warning(f"⚠️ LISTEN de eventos interrumpido, reintentando: {exc}")
+                time.sleep(self.poll_interval)
+
+    def _poll(self):
+        estados = {}
+        while True:
+            for canal, poll_fn in list(self._pollers.items()):
+                try:
+                    with self._app.app_context():
+                        estados[canal], eventos = poll_fn(estados.get(canal))
+                    for evento, clave in eventos:
+                        self.publish(canal, evento, clave)
+                except Exception as exc:
+                    logger.warning(f"⚠️ Polling de eventos '{canal}' falló: {exc}")
+            time.sleep(self.poll_interval)
+
+
+def _formatear_sse(evento):
+    lineas = []
+    if evento.get('version') is not None:
+        lineas.append(f"id: {evento['version']}")
+    lineas.append(f"event: {evento.get('tipo', 'mensaje')}")
+    lineas.append(f"data: {serializacion.dumps(evento)}")
+    return '\n'.join(lineas) + '\n\n'
+
+
+def sse_stream(bus, canal, filtro=None, keepalive=15.0, previos=None):
+    """Generador SSE: emite los eventos del canal que pasen `filtro`.
+
+    `previos` es una función que devuelve los eventos perdidos (p.ej. desde
+    el Last-Event-ID); se llama después de suscribirse para no perder nada
+    entre la consulta y el stream, y los eventos en vivo con una `version`
+    ya enviada se descartan. Si el bus no tiene cupo de streams en vivo el
+    generador termina después de los perdidos y el cliente se reconecta.
+    """
+    cola = bus.subscribe(canal)
+    en_vivo = bus.reservar_stream()
+    try:
+        yield 'retry: 5000\n\n'
+        ultima_version = None
+        for evento in (previos() if previos is not None else ()):
+            ultima_version = evento.get('version', ultima_version)
+            yield _formatear_sse(evento)
+        if not en_vivo:
+            return
+        while True:
+            try:
+                evento = cola.get(timeout=keepalive)
+            except queue.Empty:
+                yield ': keepalive\n\n'
+                continue
+            if filtro is not None and not filtro(evento):
+                continue
+            version = evento.get('version')
+            if version is not None and ultima_version is not None and version <= ultima_version:
+                continue
+            yield _formatear_sse(evento)
+    finally:
+        if en_vivo:
+            bus.liberar_stream()
+        bus.unsubscribe(canal, cola)
+
+
+bus = EventBus()
+os.register_at_fork(after_in_child=bus.reiniciar_tras_fork)
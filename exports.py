@@ -0,0 +1,163 @@
+"""Exportación de ventas en streaming (CSV, NDJSON, XLSX y Parquet).
+
+Las filas se leen con un cursor del lado del servidor (`yield_per`) como
+tuplas de columnas, sin hidratar objetos ORM, y se emiten por bloques para
+que la memoria quede acotada sin importar el tamaño de la tabla `ventas`.
+"""
+import csv
+import io
+import os
+import tempfile
+
+import archive
+import serializacion
+from models import db
+
+COLUMNAS_VENTAS = [
+    'ID_Venta', 'Fecha', 'Hora', 'ID_Cliente', 'Producto',
+    'Cantidad', 'Precio_Unitario', 'Total_Venta', 'Vendedor', 'ID_Terminal'
+]
+
+FORMATOS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+CHUNK_FILAS = 1000
+CHUNK_BYTES = 64 * 1024
+
+
+class FormatoNoDisponible(Exception):
+    pass
+
+
+def ventas_select(desde=None, hasta=None, terminal=None):
+    v = archive.ventas_rango(desde, hasta, terminal)
+    stmt = db.select(
+        v.c.id_venta,
+        v.c.fecha,
+        v.c.hora,
+        v.c.id_cliente,
+        v.c.producto_nombre,
+        v.c.cantidad,
+        v.c.precio_unitario,
+        v.c.total_venta,
+        v.c.vendedor,
+        v.c.id_terminal,
+    )
+    return stmt.order_by(v.c.fecha, v.c.hora, v.c.id)
+
+
+def iter_filas(stmt, chunk=CHUNK_FILAS):
+    """Genera bloques de tuplas usando un cursor de servidor."""
+    result = db.session.execute(stmt.execution_options(yield_per=chunk))
+    try:
+        for particion in result.partitions():
+            yield [tuple(row) for row in particion]
+    finally:
+        result.close()
+
+
+def iter_csv(stmt, chunk=CHUNK_FILAS):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNAS_VENTAS)
+    for filas in iter_filas(stmt, chunk):
+        writer.writerows(
+            tuple('' if valor is None else valor for valor in fila) for fila in filas
+        )
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def iter_ndjson(stmt, chunk=CHUNK_FILAS):
+    """Una venta por línea, con fechas y horas en ISO 8601."""
+    for filas in iter_filas(stmt, chunk):
+        yield b''.join(serializacion.dumps_bytes(dict(zip(COLUMNAS_VENTAS, fila))) + b'\n' for fila in filas)
+
+
+def _stream_archivo(path):
+    try:
+        with open(path, 'rb') as f:
+            while True:
+                bloque = f.read(CHUNK_BYTES)
+                if not bloque:
+                    break
+                yield bloque
+    finally:
+        os.remove(path)
+
+
+def _archivo_temporal(sufijo):
+    fd, path = tempfile.mkstemp(suffix=sufijo, prefix='pocopan_export_')
+    os.close(fd)
+    return path
+
+
+def iter_xlsx(stmt, chunk=CHUNK_FILAS):
+    from openpyxl import Workbook
+
+    path = _archivo_temporal('.xlsx')
+    try:
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet('Ventas')
+        ws.append(COLUMNAS_VENTAS)
+        for filas in iter_filas(stmt, chunk):
+            for fila in filas:
+                ws.append(fila)
+        wb.save(path)
+    except Exception:
+        os.remove(path)
+        raise
+    yield from _stream_archivo(path)
+
+
+def iter_parquet(stmt, chunk=CHUNK_FILAS):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ('ID_Venta', pa.int64()),
+        ('Fecha', pa.date32()),
+        ('Hora', pa.time64('us')),
+        ('ID_Cliente', pa.string()),
+        ('Producto', pa.string()),
+        ('Cantidad', pa.int64()),
+        ('Precio_Unitario', pa.float64()),
+        ('Total_Venta', pa.float64()),
+        ('Vendedor', pa.string()),
+        ('ID_Terminal', pa.string()),
+    ])
+    path = _archivo_temporal('.parquet')
+    try:
+        with pq.ParquetWriter(path, schema) as writer:
+            for filas in iter_filas(stmt, chunk):
+                columnas = list(zip(*filas))
+                writer.write_batch(pa.record_batch(
+                    [pa.array(col, type=campo.type) for col, campo in zip(columnas, schema)],
+                    schema=schema
+                ))
+    except Exception:
+        os.remove(path)
+        raise
+    yield from _stream_archivo(path)
+
+
+def stream_ventas(formato, desde=None, hasta=None, terminal=None):
+    """Devuelve (generador, mimetype, extensión) para el formato pedido."""
+    if formato not in FORMATOS:
+        raise FormatoNoDisponible(f'Formato no soportado: {formato}')
+    if formato == 'parquet':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise FormatoNoDisponible('El formato parquet requiere pyarrow instalado')
+    stmt = ventas_select(desde, hasta, terminal)
+    generadores = {'csv': iter_csv, 'ndjson': iter_ndjson, 'xlsx': iter_xlsx, 'parquet': iter_parquet}
+    mimetype, extension = FORMATOS[formato]
+    return generadores[formato](stmt), mimetype, extension
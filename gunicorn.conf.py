@@ -0,0 +1,76 @@
+"""Configuración de gunicorn para el despliegue on-prem de POCOPAN.
+
+    gunicorn -c gunicorn.conf.py
+
+El master precarga la app (`preload_app`), corre `init_db` una sola vez y
+precalienta plantillas, estáticos y consultas del catálogo antes de forkear,
+así que los workers arrancan listos y comparten esas páginas de memoria
+(copy-on-write). `gc.freeze()` deja lo precargado fuera del recolector para
+que el GC de cada worker no lo toque y no fuerce copias.
+
+Workers e hilos salen de la cantidad de CPUs salvo que se fijen por entorno:
+    GUNICORN_WORKERS  (por defecto 2 × CPUs + 1)
+    GUNICORN_STREAMS  (streams SSE abiertos a la vez; por defecto 8)
+    GUNICORN_THREADS  (por defecto 4 + GUNICORN_STREAMS)
+    GUNICORN_TIMEOUT, GUNICORN_MAX_REQUESTS
+
+Cada página del POS mantiene abierto `/eventos/catalogo` y cada tablero
+`/eventos/ventas`, y con gthread cada stream ocupa un hilo. Un worker puede
+recibir todos los streams, así que GUNICORN_STREAMS debe cubrir terminales más
+tableros abiertos. Los hilos que sobran (`HILOS_REQUESTS`) quedan para
+checkout y demás requests: EVENTOS_MAX_STREAMS se fija en la diferencia y los
+streams que excedan el cupo se cierran tras ponerse al día y el navegador se
+reconecta (ver `events`).
+
+Con más de un worker los eventos y el cache del dashboard en 'memoria' quedan
+por proceso: usar EVENTOS_BACKEND=postgres (o polling) y
+DASHBOARD_CACHE_BACKEND=sqlite.
+"""
+import gc
+import multiprocessing
+import os
+
+wsgi_app = 'app:app'
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '5000')}"
+HILOS_REQUESTS = 4
+
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+streams = int(os.getenv('GUNICORN_STREAMS', 8))
+threads = int(os.getenv('GUNICORN_THREADS', HILOS_REQUESTS + streams))
+# Se lee al precargar la app, que ocurre después de este archivo
+os.environ.setdefault('EVENTOS_MAX_STREAMS', str(max(threads - HILOS_REQUESTS, 1)))
+worker_class = 'gthread'
+preload_app = True
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 60))
+graceful_timeout = 30
+keepalive = 5
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+# Los requests ya se loguean desde la app (logs.registrar_requests)
+accesslog = None
+
+
+def on_starting(server):
+    """Master, con la app ya precargada y antes de crear los workers."""
+    import app as pocopan
+
+    pocopan.init_db()
+    pocopan.calentar_caches()
+    with pocopan.app.app_context():
+        pocopan.db.engine.dispose()
+    if server.cfg.workers > 1:
+        for clave in ('EVENTOS_BACKEND', 'DASHBOARD_CACHE_BACKEND'):
+            if pocopan.app.config[clave] == 'memoria':
+                server.log.warning("%s=memoria con %s workers: el estado queda por proceso",
+                                   clave, server.cfg.workers)
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # El pool del master no se comparte: cada worker abre sus propias conexiones.
+    # El listener de logs, el bus de eventos y el pool de trabajos se reinician
+    # solos en el hijo (os.register_at_fork en logs, events y trabajos).
+    from app import app, db
+
+    with app.app_context():
+        db.engine.dispose(close=False)
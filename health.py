@@ -0,0 +1,102 @@
+"""Chequeos de salud baratos para /diagnostico.
+
+La sonda de vida sólo hace un `SELECT 1` y usa conteos estimados (estadísticas
+de PostgreSQL o `max(id)` en SQLite) en lugar de `COUNT(*)`, así que su costo
+no crece con la tabla `ventas`. El reporte detallado junta estadísticas del
+pool, del cache y de las últimas importaciones.
+"""
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+
+from models import db
+
+_importaciones = {}
+_importaciones_lock = threading.Lock()
+_arranque = {}
+
+
+def registrar_importacion(nombre, duracion, resultado):
+    with _importaciones_lock:
+        _importaciones[nombre] = {
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'duracion_ms': round(duracion * 1000, 1),
+            'resultado': {
+                clave: valor for clave, valor in resultado.items()
+                if isinstance(valor, (int, float, str, bool))
+            },
+        }
+
+
+def ultimas_importaciones():
+    with _importaciones_lock:
+        return {nombre: dict(datos) for nombre, datos in _importaciones.items()}
+
+
+def registrar_arranque(etapas):
+    """Guarda la duración de cada etapa de `init_db` (recibe segundos, guarda milisegundos)."""
+    with _importaciones_lock:
+        _arranque.clear()
+        _arranque.update({etapa: round(duracion * 1000, 1) for etapa, duracion in etapas.items()})
+        _arranque['total'] = round(sum(etapas.values()) * 1000, 1)
+
+
+def arranque():
+    with _importaciones_lock:
+        return dict(_arranque)
+
+
+def medir_importacion(nombre):
+    """Decorador: registra duración y resultado de un seeder/importador."""
+    def decorator(fn):
+        def wrapper(*args, **kwargs):
+            inicio = time.perf_counter()
+            resultado = fn(*args, **kwargs)
+            if isinstance(resultado, dict):
+                registrar_importacion(nombre, time.perf_counter() - inicio, resultado)
+            return resultado
+        wrapper.__name__ = fn.__name__
+        wrapper.__doc__ = fn.__doc__
+        wrapper.__wrapped__ = fn
+        return wrapper
+    return decorator
+
+
+def ping():
+    inicio = time.perf_counter()
+    db.session.execute(text('SELECT 1'))
+    return round((time.perf_counter() - inicio) * 1000, 2)
+
+
+def conteo_estimado(model):
+    tabla = model.__tablename__
+    if db.engine.dialect.name == 'postgresql':
+        estimado = db.session.execute(
+            text('SELECT reltuples::bigint FROM pg_class WHERE relname = :tabla'), {'tabla': tabla}
+        ).scalar()
+        if estimado is not None and estimado >= 0:
+            return int(estimado)
+    return db.session.query(db.func.max(model.id)).scalar() or 0
+
+
+def pool_stats():
+    pool = db.engine.pool
+    stats = {'clase': type(pool).__name__, 'estado': pool.status()}
+    for nombre in ('size', 'checkedin', 'checkedout', 'overflow'):
+        metodo = getattr(pool, nombre, None)
+        if callable(metodo):
+            stats[nombre] = metodo()
+    return stats
+
+
+def esquema(tablas_esperadas):
+    presentes = set(inspect(db.engine).get_table_names())
+    faltantes = sorted(set(tablas_esperadas) - presentes)
+    return {'tablas': len(presentes), 'faltantes': faltantes, 'ok': not faltantes}
+
+
+def tasa_aciertos(hits, misses):
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'tasa': round(hits / total, 4) if total else None}
@@ -0,0 +1,232 @@
+"""Ingesta de ventas desde varios archivos (uno por terminal y mes, p.ej.).
+
+Los archivos se parsean y normalizan en paralelo en un pool de procesos
+(la conversión de fechas, horas y montos es lo que consume CPU) y los lotes
+normalizados llegan por una cola a un único escritor en el proceso
+principal, que es el único que toca la BD. El escritor respeta la misma
+semántica que `seed_sales_from_excel`: una fila con un `(ID_Venta,
+ID_Terminal)` existente actualiza esa venta y las filas sin ID reciben el
+siguiente número libre. Las filas con fecha en o antes de la frontera del
+archivo (`archive.frontera()`) se descartan: esos días ya están en
+`ventas_archivo` y `ventas_resumen`, y volver a insertarlos en `ventas` los
+contaría dos veces. Los lotes de distintos archivos se escriben en el
+orden en que terminan de parsearse, así que si dos archivos repiten la misma
+venta queda la del último lote escrito.
+
+Uso:
+    python ingest.py datos/ventas/ --procesos 4
+    python ingest.py 'datos/ventas_POS*_2024-*.xlsx' --lote 2000 --json reporte.json
+"""
+import argparse
+import glob
+import json
+import os
+import queue
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import Manager
+
+from sqlalchemy import insert, tuple_, update
+
+import archive
+import readers
+from models import db, Producto, ResumenVentas, Venta
+from normalize import normalizar_venta, secuencia_cliente
+
+CAMPOS_ACTUALIZABLES = (
+    'fecha', 'hora', 'id_cliente', 'cliente_seq', 'producto_id', 'producto_nombre',
+    'cantidad', 'precio_unitario', 'total_venta', 'vendedor'
+)
+
+
+class EscritorVentas:
+    """Aplica lotes de ventas normalizadas con INSERT/UPDATE masivos (sin commit)."""
+
+    def __init__(self):
+        self.next_id = max(
+            db.session.query(db.func.max(Venta.id_venta)).scalar() or 0,
+            db.session.query(db.func.max(ResumenVentas.ultima_venta)).scalar() or 0,
+        ) + 1
+        self.ids_productos = {
+            nombre.lower(): producto_id
+            for producto_id, nombre in db.session.query(Producto.id, Producto.nombre)
+        }
+        self.frontera = archive.frontera()
+        self.created = 0
+        self.updated = 0
+        self.archivadas = 0
+
+    def escribir(self, filas):
+        """Escribe un lote; devuelve (creadas, actualizadas).
+
+        Las filas de días ya archivados se cuentan en `archivadas` y no se escriben.
+        """
+        if self.frontera is not None:
+            vigentes = [f for f in filas if f['fecha'] > self.frontera]
+            self.archivadas += len(filas) - len(vigentes)
+            filas = vigentes
+        claves = {(f['id_venta'], f['id_terminal']) for f in filas if f['id_venta'] is not None}
+        existentes = {}
+        if claves:
+            consulta = db.session.query(Venta.id, Venta.id_venta, Venta.id_terminal, Venta.id_cliente).filter(
+                tuple_(Venta.id_venta, Venta.id_terminal).in_(claves)
+            ).order_by(Venta.id)
+            for pk, id_venta, terminal, id_cliente in consulta:
+                existentes.setdefault((id_venta, terminal), {'id': pk, 'id_cliente': id_cliente})
+
+        nuevas, actualizaciones = {}, {}
+        creadas = actualizadas = 0
+        for fila in filas:
+            fila = dict(fila, producto_id=self.ids_productos.get(fila['producto_nombre'].lower()))
+            clave = (fila['id_venta'], fila['id_terminal'])
+            destino = (existentes.get(clave) or nuevas.get(clave)) if fila['id_venta'] is not None else None
+            if destino is not None:
+                fila['id_cliente'] = fila['id_cliente'] or destino['id_cliente']
+                fila['cliente_seq'] = secuencia_cliente(fila['id_cliente'])
+                destino.update({campo: fila[campo] for campo in CAMPOS_ACTUALIZABLES})
+                if 'id' in destino:
+                    actualizaciones[destino['id']] = destino
+                actualizadas += 1
+                continue
+            asignado = fila['id_venta'] or self.next_id
+            if fila['id_venta'] is None:
+                self.next_id += 1
+            fila['id_venta'] = asignado
+            fila['id_cliente'] = fila['id_cliente'] or f"CLIENTE-{fila['id_terminal']}-{asignado:04d}"
+            fila['cliente_seq'] = secuencia_cliente(fila['id_cliente'])
+            nuevas[(asignado, fila['id_terminal'])] = fila
+            creadas += 1
+
+        if nuevas:
+            db.session.execute(insert(Venta), list(nuevas.values()))
+        if actualizaciones:
+            db.session.execute(update(Venta), list(actualizaciones.values()))
+        self.created += creadas
+        self.updated += actualizadas
+        return creadas, actualizadas
+
+
+def expandir_rutas(patrones):
+    """Acepta archivos, directorios y globs; devuelve las planillas soportadas, ordenadas."""
+    rutas = []
+    for patron in patrones:
+        if os.path.isdir(patron):
+            candidatos = [os.path.join(patron, nombre) for nombre in os.listdir(patron)]
+        else:
+            candidatos = glob.glob(patron)
+        rutas.extend(
+            ruta for ruta in candidatos
+            if os.path.isfile(ruta) and os.path.splitext(ruta)[1].lower() in readers.EXTENSIONES
+        )
+    return sorted(set(rutas))
+
+
+def parsear_archivo(ruta, tamano, entregar):
+    """Lee y normaliza `ruta`, pasando cada lote `(ruta, filas)` a `entregar` apenas está listo.
+
+    En paralelo `entregar` es el `put` de la cola acotada del escritor; en
+    serie escribe el lote directamente, así nunca hay más de un lote en memoria.
+    """
+    inicio = time.perf_counter()
+    filas = validas = 0
+    for lote in readers.iter_lotes(ruta, tamano):
+        normalizadas = [venta for venta in map(normalizar_venta, lote) if venta is not None]
+        filas += len(lote)
+        validas += len(normalizadas)
+        if normalizadas:
+            entregar((ruta, normalizadas))
+    return {'archivo': ruta, 'filas': filas, 'validas': validas, 'parseo_s': time.perf_counter() - inicio}
+
+
+def ingerir(rutas, procesos=None, tamano=readers.TAMANO_LOTE):
+    """Ingiere `rutas` y devuelve el reporte por archivo. Requiere contexto de app."""
+    escritor = EscritorVentas()
+    escritura = {ruta: {'creadas': 0, 'actualizadas': 0, 'escritura_s': 0.0} for ruta in rutas}
+
+    def escribir(ruta, filas):
+        inicio = time.perf_counter()
+        creadas, actualizadas = escritor.escribir(filas)
+        db.session.commit()
+        datos = escritura[ruta]
+        datos['creadas'] += creadas
+        datos['actualizadas'] += actualizadas
+        datos['escritura_s'] += time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    if procesos == 1 or len(rutas) <= 1:
+        parseos = [parsear_archivo(ruta, tamano, lambda lote: escribir(*lote)) for ruta in rutas]
+    else:
+        procesos = procesos or min(len(rutas), os.cpu_count() or 1)
+        with Manager() as manager, ProcessPoolExecutor(max_workers=procesos) as pool:
+            # Cola acotada: si el escritor se atrasa, los procesos esperan en lugar de acumular lotes
+            cola = manager.Queue(maxsize=procesos * 4)
+            futuros = [pool.submit(parsear_archivo, ruta, tamano, cola.put) for ruta in rutas]
+            while True:
+                try:
+                    escribir(*cola.get(timeout=0.2))
+                except queue.Empty:
+                    if all(futuro.done() for futuro in futuros):
+                        break
+            parseos = [futuro.result() for futuro in futuros]
+
+    archivos = []
+    for parseo in parseos:
+        datos = dict(parseo, **escritura[parseo['archivo']])
+        datos['filas_por_s'] = round(datos['filas'] / datos['parseo_s'], 1) if datos['parseo_s'] else None
+        datos['parseo_s'] = round(datos['parseo_s'], 3)
+        datos['escritura_s'] = round(datos['escritura_s'], 3)
+        archivos.append(datos)
+    duracion = time.perf_counter() - inicio
+    total_filas = sum(a['filas'] for a in archivos)
+    return {
+        'archivos': archivos,
+        'created': escritor.created,
+        'updated': escritor.updated,
+        'archivadas': escritor.archivadas,
+        'duracion_s': round(duracion, 3),
+        'filas_por_s': round(total_filas / duracion, 1) if duracion else None,
+    }
+
+
+def imprimir_reporte(reporte):
+    print(f"{'archivo':40} {'filas':>8} {'nuevas':>8} {'act.':>8} {'filas/s':>10} {'escr. s':>8}")
+    for a in reporte['archivos']:
+        print(f"{os.path.basename(a['archivo'])[:40]:40} {a['filas']:>8} {a['creadas']:>8} "
+              f"{a['actualizadas']:>8} {a['filas_por_s'] or 0:>10} {a['escritura_s']:>8}")
+    print(f"✅ {reporte['created']} ventas nuevas, {reporte['updated']} actualizadas "
+          f"en {reporte['duracion_s']}s ({reporte['filas_por_s']} filas/s)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Ingesta paralela de planillas de ventas de POCOPAN')
+    parser.add_argument('rutas', nargs='+', help='Archivos, directorios o globs (.xlsx, .xlsm, .csv)')
+    parser.add_argument('--procesos', type=int, help='Procesos de parseo (por defecto uno por CPU)')
+    parser.add_argument('--lote', type=int, default=readers.TAMANO_LOTE, help='Filas por lote')
+    parser.add_argument('--json', dest='salida_json', help='Guardar el reporte en este archivo')
+    args = parser.parse_args(argv)
+
+    rutas = expandir_rutas(args.rutas)
+    if not rutas:
+        print('⚠️  No se encontraron planillas para ingerir')
+        return 1
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import reports
+    from app import app, dashboard_cache, refresh_contadores
+
+    with app.app_context():
+        db.create_all()
+        reporte = ingerir(rutas, procesos=args.procesos, tamano=args.lote)
+        refresh_contadores()
+        reports.invalidar_cache()
+        dashboard_cache.bump_version()
+    imprimir_reporte(reporte)
+    if args.salida_json:
+        with open(args.salida_json, 'w', encoding='utf-8') as f:
+            json.dump(reporte, f, indent=2, ensure_ascii=False)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
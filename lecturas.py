@@ -0,0 +1,62 @@
+"""Modelos de lectura para listados de productos.
+
+Las pantallas del POS y del editor sólo leen unas pocas columnas de cada
+producto, así que en lugar de hidratar instancias ORM (identity map,
+instrumentación de atributos) se seleccionan sólo esas columnas y se
+devuelven como `NamedTuple`: inmutables, con acceso por atributo para Jinja
+y `_asdict()` para JSON.
+"""
+from typing import NamedTuple, Optional
+
+from models import db, Producto
+
+
+class ProductoPOS(NamedTuple):
+    id: int
+    nombre: str
+    categoria: Optional[str]
+    subcategoria: Optional[str]
+    precio_venta: float
+
+
+class ProductoEditor(NamedTuple):
+    id: int
+    nombre: str
+    categoria: Optional[str]
+    subcategoria: Optional[str]
+    precio_venta: float
+    proveedor: Optional[str]
+    estado: Optional[str]
+    stock: Optional[int]
+
+
+def _filas(tipo, *filtros):
+    columnas = [getattr(Producto, campo) for campo in tipo._fields]
+    stmt = db.select(*columnas).where(*filtros).order_by(Producto.id)
+    return [tipo._make(fila) for fila in db.session.execute(stmt)]
+
+
+def productos_pos():
+    """Productos disponibles para vender."""
+    return _filas(ProductoPOS, Producto.estado == 'Disponible')
+
+
+def productos_editor():
+    return _filas(ProductoEditor)
+
+
+def nombres_disponibles(texto, limite=10):
+    stmt = db.select(Producto.nombre).where(
+        Producto.estado == 'Disponible',
+        Producto.nombre.ilike(f'%{texto}%')
+    ).order_by(Producto.nombre).limit(limite)
+    return db.session.execute(stmt).scalars().all()
+
+
+def categorias(filas):
+    """Categorías no vacías en orden de aparición."""
+    return list(dict.fromkeys(fila.categoria for fila in filas if fila.categoria))
+
+
+def como_dicts(filas):
+    return [fila._asdict() for fila in filas]
@@ -0,0 +1,403 @@
+"""Generador de carga para POCOPAN: simula N terminales POS concurrentes.
+
+Levanta la app en un servidor WSGI local (con hilos o con procesos) sobre
+una base SQLite temporal o una PostgreSQL local, crea terminales sintéticas
+y recorre sesiones búsqueda → detalles → carrito → finalizar venta.
+
+Con `--gunicorn 1,2,4` corre una ronda por cantidad de workers usando
+gunicorn.conf.py (preload, init_db en el master, gthread) y resume cómo
+escala el throughput.
+
+Uso:
+    python loadtest.py --terminales 20 --sesiones 10
+    python loadtest.py --procesos 4 --database-url postgresql://localhost/pocopan_carga
+    python loadtest.py --gunicorn 1,2,4 --database-url postgresql://localhost/pocopan_carga
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import HTTPCookieProcessor, Request, build_opener
+
+CATEGORIAS_CARGA = ['Almacén', 'Bebidas', 'Panadería', 'Limpieza', 'Fiambrería']
+PASSWORD_CARGA = 'carga123'
+
+
+def _percentil(valores, pct):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = max(0, min(len(ordenados) - 1, int(round(pct / 100 * len(ordenados))) - 1))
+    return ordenados[indice]
+
+
+class Metricas:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencias = defaultdict(list)
+        self.errores = defaultdict(int)
+        self.tickets = []
+
+    def registrar(self, endpoint, segundos, ok):
+        with self._lock:
+            self.latencias[endpoint].append(segundos)
+            if not ok:
+                self.errores[endpoint] += 1
+
+    def registrar_ticket(self, terminal, id_venta, id_cliente):
+        with self._lock:
+            self.tickets.append((terminal, id_venta, id_cliente))
+
+    def tickets_duplicados(self):
+        vistos = set()
+        duplicados = []
+        for terminal, id_venta, _ in self.tickets:
+            clave = (terminal, id_venta)
+            if clave in vistos:
+                duplicados.append(clave)
+            vistos.add(clave)
+        return duplicados
+
+
+class TerminalSintetica:
+    """Cliente HTTP con su propia sesión (cookies) que actúa como una caja."""
+
+    def __init__(self, base_url, usuario, password, terminal, metricas, nombres, rng):
+        self.base_url = base_url
+        self.usuario = usuario
+        self.password = password
+        self.terminal = terminal
+        self.metricas = metricas
+        self.nombres = list(nombres)
+        self.ids = nombres
+        self.rng = rng
+        self.opener = build_opener(HTTPCookieProcessor(CookieJar()))
+
+    def _request(self, endpoint, path, data=None, method=None, json_body=None):
+        headers = {}
+        body = None
+        if json_body is not None:
+            body = json.dumps(json_body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        elif data is not None:
+            body = urlencode(data).encode('utf-8')
+        req = Request(self.base_url + path, data=body, headers=headers, method=method)
+        inicio = time.perf_counter()
+        status = None
+        contenido = b''
+        try:
+            with self.opener.open(req, timeout=30) as resp:
+                status = resp.status
+                contenido = resp.read()
+        except HTTPError as exc:
+            status = exc.code
+            contenido = exc.read()
+        except (URLError, OSError):
+            status = None
+        self.metricas.registrar(endpoint, time.perf_counter() - inicio, status is not None and status < 400)
+        if status is None or status >= 400:
+            return None
+        try:
+            return json.loads(contenido) if contenido[:1] in (b'{', b'[') else contenido
+        except ValueError:
+            return None
+
+    def login(self):
+        return self._request('login', '/login', data={'usuario': self.usuario, 'password': self.password})
+
+    def sesion_de_venta(self):
+        nombre = self.rng.choice(self.nombres)
+        inicio = self.rng.randrange(0, max(1, len(nombre) - 3))
+        termino = nombre[inicio:inicio + 3]
+        resultados = self._request('buscar', '/buscar-productos?' + urlencode({'q': termino})) or []
+        elegidos = list(resultados) if isinstance(resultados, list) else []
+        if not elegidos:
+            elegidos = [nombre]
+        for _ in range(self.rng.randint(1, 4)):
+            producto_id = self.ids.get(self.rng.choice(elegidos))
+            if producto_id is None:
+                continue
+            self._request('detalles', f'/productos/{producto_id}')
+            self._request('agregar_carrito', '/agregar-carrito', json_body={
+                'producto_id': producto_id,
+                'cantidad': self.rng.randint(1, 5),
+            })
+        respuesta = self._request('finalizar_venta', '/finalizar-venta', method='POST')
+        if isinstance(respuesta, dict) and respuesta.get('success'):
+            resumen = respuesta.get('resumen', {})
+            self.metricas.registrar_ticket(self.terminal, resumen.get('id_venta'), resumen.get('id_cliente'))
+
+    def ejecutar(self, sesiones, barrera):
+        self.login()
+        barrera.wait()
+        for _ in range(sesiones):
+            self.sesion_de_venta()
+
+
+def preparar_datos(app, terminales, productos):
+    """Crea productos y usuarios/terminales sintéticos; devuelve (usuarios, {nombre: id})."""
+    import app as pocopan_app
+    from models import db, Producto, Contador
+
+    with app.app_context():
+        db.create_all()
+        existentes = Producto.query.count()
+        for i in range(existentes, productos):
+            db.session.add(Producto(
+                nombre=f'Producto Carga {i + 1:05d}',
+                categoria=CATEGORIAS_CARGA[i % len(CATEGORIAS_CARGA)],
+                subcategoria='Sintético',
+                precio_venta=round(50 + (i * 37) % 950 + 0.5, 2),
+                proveedor='Carga',
+                estado='Disponible'
+            ))
+        usuarios = []
+        for i in range(1, terminales + 1):
+            usuario = f'carga{i:03d}'
+            terminal = f'CARGA{i:03d}'
+            pocopan_app.CONFIG['usuarios'][usuario] = {
+                'password': PASSWORD_CARGA, 'rol': 'pos', 'terminal': terminal
+            }
+            if not Contador.query.filter_by(terminal=terminal).first():
+                db.session.add(Contador(terminal=terminal))
+            usuarios.append((usuario, terminal))
+        db.session.commit()
+        nombres = {
+            nombre: producto_id for producto_id, nombre in
+            db.session.query(Producto.id, Producto.nombre).filter_by(estado='Disponible').all()
+        }
+        db.engine.dispose()
+    return usuarios, nombres
+
+
+def detectar_duplicados_bd(app, terminales):
+    """Tickets (terminal, id_venta) que quedaron asignados a más de un cliente."""
+    from models import db, Venta
+
+    with app.app_context():
+        filas = db.session.query(
+            Venta.id_terminal, Venta.id_venta
+        ).filter(
+            Venta.id_terminal.in_(terminales)
+        ).group_by(
+            Venta.id_terminal, Venta.id_venta
+        ).having(
+            db.func.count(db.distinct(Venta.id_cliente)) > 1
+        ).all()
+    return [(t, v) for t, v in filas]
+
+
+def ejecutar_carga(app, usuarios, nombres, sesiones, procesos=1, semilla=None):
+    from werkzeug.serving import make_server
+
+    servidor = make_server(
+        '127.0.0.1', 0, app,
+        threaded=procesos <= 1,
+        processes=max(1, procesos)
+    )
+    hilo_servidor = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo_servidor.start()
+    try:
+        return _recorrer_terminales(
+            f'http://127.0.0.1:{servidor.server_port}', usuarios, nombres, sesiones, semilla
+        )
+    finally:
+        servidor.shutdown()
+
+
+def _servir_gunicorn(app, puerto, workers):
+    """Corre gunicorn con gunicorn.conf.py en este proceso (hijo forkeado, hereda los usuarios de carga)."""
+    import runpy
+    from gunicorn.app.base import BaseApplication
+
+    class Servidor(BaseApplication):
+        def load_config(self):
+            config = runpy.run_path(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gunicorn.conf.py'))
+            for clave, valor in config.items():
+                if clave in self.cfg.settings and valor is not None:
+                    self.cfg.set(clave, valor)
+            self.cfg.set('bind', f'127.0.0.1:{puerto}')
+            self.cfg.set('workers', workers)
+            self.cfg.set('loglevel', 'warning')
+
+        def load(self):
+            return app
+
+    Servidor().run()
+
+
+def ejecutar_carga_gunicorn(app, usuarios, nombres, sesiones, workers, semilla=None):
+    import multiprocessing
+    import socket
+
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        puerto = s.getsockname()[1]
+    servidor = multiprocessing.get_context('fork').Process(
+        target=_servir_gunicorn, args=(app, puerto, workers), daemon=False
+    )
+    servidor.start()
+    try:
+        limite = time.monotonic() + 60
+        while True:
+            try:
+                socket.create_connection(('127.0.0.1', puerto), timeout=1).close()
+                break
+            except OSError:
+                if time.monotonic() > limite or not servidor.is_alive():
+                    raise RuntimeError('gunicorn no arrancó')
+                time.sleep(0.2)
+        return _recorrer_terminales(f'http://127.0.0.1:{puerto}', usuarios, nombres, sesiones, semilla)
+    finally:
+        servidor.terminate()
+        servidor.join(30)
+
+
+def _recorrer_terminales(base_url, usuarios, nombres, sesiones, semilla):
+    metricas = Metricas()
+    rng_base = random.Random(semilla)
+    barrera = threading.Barrier(len(usuarios) + 1)
+    terminales = [
+        TerminalSintetica(
+            base_url, usuario, PASSWORD_CARGA, terminal, metricas, nombres,
+            random.Random(rng_base.random())
+        )
+        for usuario, terminal in usuarios
+    ]
+    hilos = [
+        threading.Thread(target=t.ejecutar, args=(sesiones, barrera), daemon=True)
+        for t in terminales
+    ]
+    for hilo in hilos:
+        hilo.start()
+    barrera.wait()
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.join()
+    return metricas, time.perf_counter() - inicio
+
+
+def construir_reporte(metricas, duracion, duplicados_bd):
+    por_endpoint = {}
+    total = 0
+    total_errores = 0
+    for endpoint, latencias in sorted(metricas.latencias.items()):
+        errores = metricas.errores.get(endpoint, 0)
+        total += len(latencias)
+        total_errores += errores
+        por_endpoint[endpoint] = {
+            'requests': len(latencias),
+            'errores': errores,
+            'tasa_error': round(errores / len(latencias), 4) if latencias else 0.0,
+            'p50_ms': round(_percentil(latencias, 50) * 1000, 2),
+            'p90_ms': round(_percentil(latencias, 90) * 1000, 2),
+            'p99_ms': round(_percentil(latencias, 99) * 1000, 2),
+            'max_ms': round(max(latencias) * 1000, 2) if latencias else 0.0,
+        }
+    return {
+        'duracion_s': round(duracion, 3),
+        'requests': total,
+        'requests_por_segundo': round(total / duracion, 2) if duracion else 0.0,
+        'errores': total_errores,
+        'tasa_error': round(total_errores / total, 4) if total else 0.0,
+        'ventas_finalizadas': len(metricas.tickets),
+        'tickets_duplicados_cliente': metricas.tickets_duplicados(),
+        'tickets_duplicados_bd': duplicados_bd,
+        'endpoints': por_endpoint,
+    }
+
+
+def imprimir_reporte(reporte):
+    print(f"⏱️  Duración: {reporte['duracion_s']}s - {reporte['requests']} requests "
+          f"({reporte['requests_por_segundo']} req/s)")
+    print(f"❌ Errores: {reporte['errores']} ({reporte['tasa_error']:.2%})")
+    print(f"🧾 Ventas finalizadas: {reporte['ventas_finalizadas']}")
+    print(f"{'endpoint':<18}{'req':>7}{'err':>6}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for endpoint, datos in reporte['endpoints'].items():
+        print(f"{endpoint:<18}{datos['requests']:>7}{datos['errores']:>6}"
+              f"{datos['p50_ms']:>10}{datos['p90_ms']:>10}{datos['p99_ms']:>10}{datos['max_ms']:>10}")
+    duplicados = reporte['tickets_duplicados_cliente'] + reporte['tickets_duplicados_bd']
+    if duplicados:
+        print(f"⚠️  IDs de venta duplicados: {duplicados}")
+    else:
+        print("✅ Sin IDs de venta duplicados")
+
+
+def imprimir_escalado(rondas):
+    base = rondas[0][1]['requests_por_segundo'] or 1
+    print(f"{'workers':>8}{'req/s':>10}{'escala':>9}{'p90 ms':>10}{'errores':>9}")
+    for workers, reporte in rondas:
+        p90 = max((d['p90_ms'] for d in reporte['endpoints'].values()), default=0.0)
+        print(f"{workers:>8}{reporte['requests_por_segundo']:>10}"
+              f"{reporte['requests_por_segundo'] / base:>8.2f}x{p90:>10}{reporte['errores']:>9}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Prueba de carga de terminales POS de POCOPAN')
+    parser.add_argument('--terminales', type=int, default=10, help='Cantidad de terminales sintéticas')
+    parser.add_argument('--sesiones', type=int, default=20, help='Ventas por terminal')
+    parser.add_argument('--productos', type=int, default=500, help='Productos mínimos en catálogo')
+    parser.add_argument('--procesos', type=int, default=1,
+                        help='Procesos del servidor WSGI (1 = un proceso con hilos)')
+    parser.add_argument('--gunicorn', help='Workers de gunicorn por ronda, separados por coma (ej. 1,2,4)')
+    parser.add_argument('--database-url', help='BD a usar (por defecto SQLite temporal)')
+    parser.add_argument('--semilla', type=int, help='Semilla aleatoria para reproducir la corrida')
+    parser.add_argument('--json', dest='salida_json', help='Guardar el reporte en este archivo')
+    args = parser.parse_args(argv)
+
+    temp_dir = None
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+    else:
+        temp_dir = tempfile.TemporaryDirectory()
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(temp_dir.name, 'carga.db')}"
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    logging_level = os.getenv('LOADTEST_LOG_LEVEL', 'WARNING')
+    from app import app
+    logging.getLogger().setLevel(logging_level)
+    logging.getLogger('werkzeug').setLevel(logging_level)
+
+    try:
+        usuarios, nombres = preparar_datos(app, args.terminales, args.productos)
+        if args.gunicorn:
+            rondas = []
+            for workers in [int(w) for w in args.gunicorn.split(',') if w.strip()]:
+                metricas, duracion = ejecutar_carga_gunicorn(
+                    app, usuarios, nombres, args.sesiones, workers, semilla=args.semilla
+                )
+                reporte = construir_reporte(metricas, duracion, detectar_duplicados_bd(app, [t for _, t in usuarios]))
+                print(f"\n🚀 gunicorn con {workers} workers")
+                imprimir_reporte(reporte)
+                rondas.append((workers, reporte))
+            print(f"\n📈 Escalado ({os.cpu_count()} CPUs)")
+            imprimir_escalado(rondas)
+            reporte = {'cpus': os.cpu_count(), 'rondas': [dict(r, workers=w) for w, r in rondas]}
+            duplicados = any(r['tickets_duplicados_bd'] or r['tickets_duplicados_cliente'] for _, r in rondas)
+        else:
+            metricas, duracion = ejecutar_carga(
+                app, usuarios, nombres, args.sesiones, procesos=args.procesos, semilla=args.semilla
+            )
+            reporte = construir_reporte(metricas, duracion, detectar_duplicados_bd(app, [t for _, t in usuarios]))
+            imprimir_reporte(reporte)
+            duplicados = reporte['tickets_duplicados_bd'] or reporte['tickets_duplicados_cliente']
+        if args.salida_json:
+            with open(args.salida_json, 'w', encoding='utf-8') as f:
+                json.dump(reporte, f, indent=2, ensure_ascii=False)
+        return 1 if duplicados else 0
+    finally:
+        if temp_dir is not None:
+            temp_dir.cleanup()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,167 @@
+"""Logging no bloqueante, en texto o JSON estructurado.
+
+Los handlers de la app sólo encolan el `LogRecord` (`ColaHandler`); el
+formateo y la escritura a stderr ocurren en el hilo de un `QueueListener`.
+El mensaje se arma recién ahí, así que las llamadas con argumentos
+(`logger.debug("datos: %s", data)`) no pagan el costo del formateo en la
+request, y las líneas DEBUG se pueden muestrear.
+
+Cada registro lleva, si hay request activa, `request_id`, `ruta`, `terminal`
+y `duracion_ms` (tiempo transcurrido desde el inicio de la request).
+
+El hilo del listener no sobrevive a un `fork` (workers de gunicorn con
+`preload_app`, procesos de `ingest`): en el hijo `reiniciar_listener` arma
+una cola nueva y arranca su propio listener.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import time
+import uuid
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+
+from flask import g, has_request_context, request, session
+
+FORMATO_TEXTO = '%(levelname)s:%(name)s:%(message)s'
+CAMPOS_CONTEXTO = ('request_id', 'ruta', 'terminal', 'duracion_ms')
+_ATRIBUTOS_RECORD = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+_listener = None
+
+
+class ContextoFilter(logging.Filter):
+    """Copia al registro los datos de la request en curso (en el hilo que loguea)."""
+
+    def filter(self, record):
+        if has_request_context():
+            record.request_id = g.get('request_id')
+            record.ruta = request.endpoint or request.path
+            record.terminal = session.get('terminal')
+            inicio = g.get('inicio_request')
+            if inicio is not None:
+                record.duracion_ms = round((time.perf_counter() - inicio) * 1000, 1)
+        return True
+
+
+class MuestreoFilter(logging.Filter):
+    """Deja pasar sólo una fracción `tasa` de los registros DEBUG."""
+
+    def __init__(self, tasa=1.0):
+        super().__init__()
+        self.tasa = tasa
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG or self.tasa >= 1.0:
+            return True
+        return random.random() < self.tasa
+
+
+class ColaHandler(QueueHandler):
+    """QueueHandler que no formatea en el hilo de la request.
+
+    El `QueueHandler` estándar llama a `format()` en `prepare()` para poder
+    serializar el registro; acá la cola es del mismo proceso, así que se
+    encola el registro tal cual y el listener lo formatea.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        datos = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'nivel': record.levelname,
+            'logger': record.name,
+            'mensaje': record.getMessage(),
+        }
+        for campo in CAMPOS_CONTEXTO:
+            valor = getattr(record, campo, None)
+            if valor is not None:
+                datos[campo] = valor
+        for campo, valor in vars(record).items():
+            if campo not in _ATRIBUTOS_RECORD and campo not in datos:
+                datos[campo] = valor
+        if record.exc_info:
+            datos['excepcion'] = self.formatException(record.exc_info)
+        return json.dumps(datos, ensure_ascii=False, default=str)
+
+
+def configurar_logging(formato='texto', nivel='INFO', muestreo_debug=1.0, stream=None):
+    """Reemplaza los handlers del logger raíz por una cola atendida en segundo plano."""
+    global _listener
+    detener_logging()
+
+    salida = logging.StreamHandler(stream or sys.stderr)
+    salida.setFormatter(JsonFormatter() if formato == 'json' else logging.Formatter(FORMATO_TEXTO))
+
+    cola = queue.SimpleQueue()
+    handler = ColaHandler(cola)
+    handler.addFilter(MuestreoFilter(muestreo_debug))
+    handler.addFilter(ContextoFilter())
+
+    raiz = logging.getLogger()
+    for anterior in list(raiz.handlers):
+        raiz.removeHandler(anterior)
+    raiz.addHandler(handler)
+    raiz.setLevel(nivel)
+
+    _listener = QueueListener(cola, salida)
+    _listener.start()
+    return _listener
+
+
+def reiniciar_listener():
+    """En el hijo de un fork: cola y listener propios (los registros pendientes del padre no se repiten)."""
+    global _listener
+    if _listener is None:
+        return None
+    cola = queue.SimpleQueue()
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, ColaHandler):
+            handler.queue = cola
+    _listener = QueueListener(cola, *_listener.handlers)
+    _listener.start()
+    return _listener
+
+
+def detener_logging():
+    """Vacía la cola y detiene el hilo del listener (también al salir)."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def registrar_requests(app, lento_ms=500):
+    """Asigna un request id a cada request y loguea su duración."""
+    acceso = logging.getLogger('pocopan.acceso')
+
+    @app.before_request
+    def _iniciar_request():
+        g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex[:16]
+        g.inicio_request = time.perf_counter()
+
+    @app.after_request
+    def _finalizar_request(response):
+        inicio = g.get('inicio_request')
+        if inicio is None:
+            return response
+        response.headers.setdefault('X-Request-ID', g.request_id)
+        duracion_ms = (time.perf_counter() - inicio) * 1000
+        if duracion_ms >= lento_ms:
+            acceso.warning("🐢 %s %s %s (%.0f ms)", request.method, request.path,
+                           response.status_code, duracion_ms)
+        else:
+            acceso.debug("%s %s %s", request.method, request.path, response.status_code)
+        return response
+
+
+atexit.register(detener_logging)
+os.register_at_fork(after_in_child=reiniciar_listener)
@@ -1,18 +1,24 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime, date
+import json
+
+from dinero import Centavos
+from normalize import secuencia_cliente
 
 db = SQLAlchemy()
 
 class Producto(db.Model):
     __tablename__ = 'productos'
+    __table_args__ = (db.Index('ix_productos_estado_nombre', 'estado', 'nombre'),)
     
     id = db.Column(db.Integer, primary_key=True)
     nombre = db.Column(db.String(255), unique=True, nullable=False)
     categoria = db.Column(db.String(100), default='Sin Categoría')
     subcategoria = db.Column(db.String(100))
-    precio_venta = db.Column(db.Float, nullable=False)
+    precio_venta = db.Column(Centavos, nullable=False)
     proveedor = db.Column(db.String(100), default='Sin Proveedor')
     estado = db.Column(db.String(50), default='Disponible')
+    stock = db.Column(db.Integer)
     fecha_creacion = db.Column(db.DateTime, default=datetime.utcnow)
     
     def to_dict(self):
@@ -24,21 +30,36 @@ class Producto(db.Model):
             'precio_venta': self.precio_venta,
             'proveedor': self.proveedor,
             'estado': self.estado,
+            'stock': self.stock,
             'fecha_creacion': self.fecha_creacion.isoformat() if self.fecha_creacion else None
         }
 
+def _secuencia_cliente_fila(context):
+    return secuencia_cliente(context.get_current_parameters().get('id_cliente'))
+
+
 class Venta(db.Model):
     __tablename__ = 'ventas'
+    __table_args__ = (
+        db.Index('ix_ventas_terminal_venta', 'id_terminal', 'id_venta'),
+        db.Index('ix_ventas_cliente', 'id_cliente'),
+        db.Index('ix_ventas_terminal_cliente_seq', 'id_terminal', 'cliente_seq'),
+        # Totales del día por terminal en cada evento de venta
+        db.Index('ix_ventas_fecha_terminal', 'fecha', 'id_terminal'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     id_venta = db.Column(db.Integer, nullable=False)
     fecha = db.Column(db.Date, default=date.today)
     hora = db.Column(db.Time)
     id_cliente = db.Column(db.String(50))
+    # Número final de `id_cliente` ('CLIENTE-POS1-0042' -> 42), para MAX() por índice
+    cliente_seq = db.Column(db.Integer, default=_secuencia_cliente_fila)
+    producto_id = db.Column(db.Integer, index=True)
     producto_nombre = db.Column(db.String(255))
     cantidad = db.Column(db.Integer)
-    precio_unitario = db.Column(db.Float)
-    total_venta = db.Column(db.Float)
+    precio_unitario = db.Column(Centavos)
+    total_venta = db.Column(Centavos)
     vendedor = db.Column(db.String(100))
     id_terminal = db.Column(db.String(50))
     
@@ -48,6 +69,7 @@ class Venta(db.Model):
             'fecha': str(self.fecha) if self.fecha else None,
             'hora': str(self.hora) if self.hora else None,
             'id_cliente': self.id_cliente,
+            'producto_id': self.producto_id,
             'producto_nombre': self.producto_nombre,
             'cantidad': self.cantidad,
             'precio_unitario': self.precio_unitario,
@@ -74,3 +96,118 @@ class Contador(db.Model):
             'total_ventas': self.total_ventas,
             'fecha_creacion': self.fecha_creacion.isoformat() if self.fecha_creacion else None
         }
+
+class MovimientoStock(db.Model):
+    __tablename__ = 'stock_movimientos'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    producto_id = db.Column(db.Integer, nullable=False, index=True)
+    cantidad = db.Column(db.Integer, nullable=False)
+    stock_resultante = db.Column(db.Integer)
+    motivo = db.Column(db.String(20), nullable=False)
+    referencia = db.Column(db.String(100))
+    fecha = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'producto_id': self.producto_id,
+            'cantidad': self.cantidad,
+            'stock_resultante': self.stock_resultante,
+            'motivo': self.motivo,
+            'referencia': self.referencia,
+            'fecha': self.fecha.isoformat() if self.fecha else None
+        }
+
+class CatalogoCambio(db.Model):
+    __tablename__ = 'catalogo_cambios'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    producto_id = db.Column(db.Integer, nullable=False)
+    accion = db.Column(db.String(20), nullable=False)
+    datos = db.Column(db.Text)
+    fecha = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'tipo': 'catalogo',
+            'version': self.id,
+            'accion': self.accion,
+            'producto_id': self.producto_id,
+            'producto': json.loads(self.datos) if self.datos else None,
+            'fecha': self.fecha.isoformat() if self.fecha else None
+        }
+
+class ResumenVentas(db.Model):
+    __tablename__ = 'ventas_resumen'
+    __table_args__ = (db.UniqueConstraint('fecha', 'id_terminal', name='uq_ventas_resumen_fecha_terminal'),)
+    
+    id = db.Column(db.Integer, primary_key=True)
+    fecha = db.Column(db.Date, nullable=False, index=True)
+    id_terminal = db.Column(db.String(50), nullable=False)
+    tickets = db.Column(db.Integer, default=0)
+    lineas = db.Column(db.Integer, default=0)
+    unidades = db.Column(db.Integer, default=0)
+    ingresos = db.Column(Centavos, default=0)
+    ultima_venta = db.Column(db.Integer, default=0)
+    ultimo_cliente = db.Column(db.Integer, default=0)
+    
+    def to_dict(self):
+        return {
+            'fecha': str(self.fecha) if self.fecha else None,
+            'id_terminal': self.id_terminal,
+            'tickets': self.tickets,
+            'lineas': self.lineas,
+            'unidades': self.unidades,
+            'ingresos': self.ingresos,
+            'ultima_venta': self.ultima_venta,
+            'ultimo_cliente': self.ultimo_cliente
+        }
+
+class Trabajo(db.Model):
+    __tablename__ = 'trabajos'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    tipo = db.Column(db.String(50), nullable=False)
+    estado = db.Column(db.String(20), default='pendiente', index=True)
+    progreso = db.Column(db.Float, default=0)
+    mensaje = db.Column(db.String(255))
+    parametros = db.Column(db.Text)
+    resultado = db.Column(db.Text)
+    error = db.Column(db.Text)
+    usuario = db.Column(db.String(50))
+    creado = db.Column(db.DateTime, default=datetime.utcnow)
+    iniciado = db.Column(db.DateTime)
+    terminado = db.Column(db.DateTime)
+    actualizado = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'tipo': self.tipo,
+            'estado': self.estado,
+            'progreso': self.progreso,
+            'mensaje': self.mensaje,
+            'parametros': json.loads(self.parametros) if self.parametros else {},
+            'resultado': json.loads(self.resultado) if self.resultado else None,
+            'error': self.error,
+            'usuario': self.usuario,
+            'creado': self.creado.isoformat() if self.creado else None,
+            'iniciado': self.iniciado.isoformat() if self.iniciado else None,
+            'terminado': self.terminado.isoformat() if self.terminado else None,
+            'actualizado': self.actualizado.isoformat() if self.actualizado else None
+        }
+
+class Migracion(db.Model):
+    """Migraciones de datos de una sola vez ya aplicadas a esta base."""
+    __tablename__ = 'migraciones'
+    
+    nombre = db.Column(db.String(100), primary_key=True)
+    aplicada = db.Column(db.DateTime, default=datetime.utcnow)
+
+class VersionDatos(db.Model):
+    """Contadores de versión compartidos por todos los procesos (invalidación de caches)."""
+    __tablename__ = 'versiones_datos'
+    
+    nombre = db.Column(db.String(50), primary_key=True)
+    valor = db.Column(db.Integer, nullable=False, default=0)
@@ -0,0 +1,117 @@
+"""Normalización de valores leídos de planillas (Excel/CSV) para los importadores.
+
+No depende de Flask ni de la BD, así que se puede usar desde procesos de un
+pool (ver `ingest.py`).
+"""
+import math
+import re
+from datetime import date, datetime, time
+
+import dinero
+
+
+def clean_string(value, default=''):
+    if value is None:
+        return default
+    if isinstance(value, str):
+        cleaned = re.sub(r'\s+', ' ', value).strip()
+        return cleaned if cleaned else default
+    if isinstance(value, (int, float)):
+        if isinstance(value, float) and math.isnan(value):
+            return default
+        return str(value).strip()
+    return default
+
+
+def safe_float(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        cleaned = value.replace('$', '').replace(',', '.').strip()
+        cleaned = cleaned.replace(' ', '')
+        if not cleaned:
+            return None
+        value = cleaned
+    try:
+        result = float(value)
+        if math.isnan(result):
+            return None
+        return result
+    except (TypeError, ValueError):
+        return None
+
+
+def safe_int(value):
+    if value is None:
+        return None
+    try:
+        if isinstance(value, str):
+            value = value.strip()
+            if not value:
+                return None
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, str):
+        value = value.strip()
+        if not value:
+            return None
+        for fmt in ('%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y', '%Y-%m-%d %H:%M:%S'):
+            try:
+                return datetime.strptime(value, fmt).date()
+            except ValueError:
+                continue
+    return None
+
+
+def parse_time(value):
+    if isinstance(value, time):
+        return value
+    if isinstance(value, datetime):
+        return value.time()
+    if isinstance(value, str):
+        value = value.strip()
+        if not value:
+            return None
+        for fmt in ('%H:%M:%S', '%H:%M'):
+            try:
+                return datetime.strptime(value, fmt).time()
+            except ValueError:
+                continue
+    return None
+
+
+def secuencia_cliente(value):
+    """Número final de un ID de cliente ('CLIENTE-POS1-0042' -> 42); 0 si no tiene."""
+    if not value:
+        return 0
+    match = re.search(r'(\d+)$', value)
+    return int(match.group(1)) if match else 0
+
+
+def normalizar_venta(row):
+    """Convierte una fila de ventas.xlsx en un dict listo para `Venta`, o None si no es válida."""
+    producto_nombre = clean_string(row.get('Producto'))
+    cantidad = safe_int(row.get('Cantidad')) or 0
+    if not producto_nombre or not cantidad:
+        return None
+    precio_unitario = safe_float(row.get('Precio_Unitario')) or 0
+    return {
+        'id_venta': safe_int(row.get('ID_Venta')),
+        'fecha': parse_date(row.get('Fecha')) or date.today(),
+        'hora': parse_time(row.get('Hora')),
+        'id_cliente': clean_string(row.get('ID_Cliente')),
+        'producto_nombre': producto_nombre,
+        'cantidad': cantidad,
+        'precio_unitario': precio_unitario,
+        'total_venta': safe_float(row.get('Total_Venta')) or dinero.a_pesos(cantidad * dinero.a_centavos(precio_unitario)),
+        'vendedor': clean_string(row.get('Vendedor'), 'POS'),
+        'id_terminal': clean_string(row.get('ID_Terminal'), 'TODAS') or 'TODAS',
+    }
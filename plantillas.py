@@ -0,0 +1,37 @@
+"""Plantillas Jinja precompiladas para producción.
+
+Con `TEMPLATES_AUTO_RELOAD` apagado Jinja no vuelve a leer los archivos en
+cada render, y con un `FileSystemBytecodeCache` el código compilado queda en
+disco, así que un worker nuevo carga el bytecode en lugar de volver a
+parsear y compilar cada plantilla. `precompilar` recorre todas las
+plantillas al arrancar para que el primer request no pague la compilación.
+"""
+import logging
+import os
+
+from jinja2 import FileSystemBytecodeCache
+
+logger = logging.getLogger(__name__)
+
+
+def configurar_cache(app, directorio):
+    """Activa el bytecode cache en `directorio`; llamar antes del primer render."""
+    if not directorio:
+        return None
+    try:
+        os.makedirs(directorio, exist_ok=True)
+    except OSError as e:
+        logger.warning("⚠️ Cache de plantillas deshabilitado (%s): %s", directorio, e)
+        return None
+    bytecode_cache = FileSystemBytecodeCache(directorio, pattern='pocopan_%s.cache')
+    app.jinja_options = dict(app.jinja_options, bytecode_cache=bytecode_cache)
+    return bytecode_cache
+
+
+def precompilar(app):
+    """Compila (o carga del bytecode cache) todas las plantillas .html; devuelve cuántas."""
+    env = app.jinja_env
+    nombres = [nombre for nombre in env.list_templates() if nombre.endswith('.html')]
+    for nombre in nombres:
+        env.get_template(nombre)
+    return len(nombres)
@@ -0,0 +1,81 @@
+"""Lectura por lotes de planillas grandes (xlsx o csv) para los importadores.
+
+En lugar de cargar el archivo entero con `pd.read_excel`, `iter_lotes`
+recorre las filas en streaming y las entrega en listas de a `tamano`
+diccionarios {encabezado: valor}, así que la memoria usada depende del
+tamaño del lote y no del archivo.
+
+    - .xlsx/.xlsm: openpyxl en modo `read_only` (lee la hoja como XML en
+      streaming) con `data_only` para obtener valores y no fórmulas.
+    - .csv: `csv.DictReader`, detectando `,` o `;` como separador.
+"""
+import csv
+import os
+
+TAMANO_LOTE = 1000
+EXTENSIONES = ('.xlsx', '.xlsm', '.csv')
+
+
+class FormatoNoSoportado(ValueError):
+    pass
+
+
+def ruta_existente(ruta):
+    """Devuelve `ruta` o, si no existe, la misma con extensión .csv; None si no hay ninguna."""
+    if os.path.exists(ruta):
+        return ruta
+    alternativa = os.path.splitext(ruta)[0] + '.csv'
+    return alternativa if os.path.exists(alternativa) else None
+
+
+def iter_filas(ruta, hoja=None):
+    extension = os.path.splitext(ruta)[1].lower()
+    if extension == '.csv':
+        return _iter_csv(ruta)
+    if extension in ('.xlsx', '.xlsm'):
+        return _iter_xlsx(ruta, hoja)
+    raise FormatoNoSoportado(f"Formato no soportado: {extension or ruta}, usar {', '.join(EXTENSIONES)}")
+
+
+def iter_lotes(ruta, tamano=TAMANO_LOTE, hoja=None):
+    lote = []
+    for fila in iter_filas(ruta, hoja):
+        lote.append(fila)
+        if len(lote) >= tamano:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def _encabezados(fila):
+    return [str(valor).strip() if valor is not None else '' for valor in fila]
+
+
+def _iter_xlsx(ruta, hoja):
+    from openpyxl import load_workbook
+
+    libro = load_workbook(ruta, read_only=True, data_only=True)
+    try:
+        hoja_activa = libro[hoja] if hoja else libro.worksheets[0]
+        filas = hoja_activa.iter_rows(values_only=True)
+        encabezados = _encabezados(next(filas, ()))
+        for valores in filas:
+            if valores is None or all(v is None or v == '' for v in valores):
+                continue
+            yield {clave: valor for clave, valor in zip(encabezados, valores) if clave}
+    finally:
+        libro.close()
+
+
+def _iter_csv(ruta):
+    with open(ruta, newline='', encoding='utf-8-sig') as archivo:
+        muestra = archivo.readline()
+        archivo.seek(0)
+        separador = ';' if muestra.count(';') > muestra.count(',') else ','
+        lector = csv.reader(archivo, delimiter=separador)
+        encabezados = _encabezados(next(lector, ()))
+        for valores in lector:
+            if not any(v.strip() for v in valores):
+                continue
+            yield {clave: valor for clave, valor in zip(encabezados, valores) if clave}
@@ -0,0 +1,179 @@
+"""Reportes de ventas agregados en SQL (GROUP BY) para rangos de fechas.
+
+Los resultados de períodos cerrados (`hasta` anterior a hoy) no cambian con
+las ventas nuevas, así que se guardan en un cache LRU en memoria que sólo se
+invalida cuando se reimportan o archivan ventas. La clave incluye la versión
+'reportes' de `versiones_datos`: `invalidar_cache` la sube en la BD, así que
+los demás workers y los CLI (`ingest`, `archive`) invalidan también el cache
+de cada proceso.
+
+Todas las consultas leen de `archive.ventas_rango`, que ya viene filtrada por
+rango y terminal e incluye la tabla de archivo sólo si el rango la alcanza.
+"""
+import threading
+from collections import OrderedDict
+from datetime import date
+
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+
+import archive
+from models import db, Producto, VersionDatos
+
+AGRUPACIONES = ('dia', 'semana', 'mes')
+ORDENES_TOP = ('ingresos', 'cantidad')
+MAX_CACHE = 256
+VERSION = 'reportes'
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_estadisticas = {'hits': 0, 'misses': 0}
+
+
+class ReporteInvalido(ValueError):
+    pass
+
+
+def version_datos():
+    return db.session.query(VersionDatos.valor).filter_by(nombre=VERSION).scalar() or 0
+
+
+def invalidar_cache():
+    """Sube la versión compartida (commit propio) y vacía el cache de este proceso."""
+    for _ in range(2):
+        subida = db.session.execute(
+            update(VersionDatos).where(VersionDatos.nombre == VERSION).values(valor=VersionDatos.valor + 1)
+        ).rowcount
+        if not subida:
+            db.session.add(VersionDatos(nombre=VERSION, valor=1))
+        try:
+            db.session.commit()
+            break
+        except IntegrityError:
+            # Otro proceso creó la fila primero: reintentar con UPDATE
+            db.session.rollback()
+    with _cache_lock:
+        _cache.clear()
+
+
+def estadisticas_cache():
+    with _cache_lock:
+        return dict(_estadisticas, entradas=len(_cache))
+
+
+def _cacheable(fn):
+    def wrapper(desde=None, hasta=None, **kwargs):
+        if hasta is None or hasta >= date.today():
+            return fn(desde=desde, hasta=hasta, **kwargs)
+        clave = (version_datos(), fn.__name__, desde, hasta, tuple(sorted(kwargs.items())))
+        with _cache_lock:
+            if clave in _cache:
+                _cache.move_to_end(clave)
+                _estadisticas['hits'] += 1
+                return _cache[clave]
+            _estadisticas['misses'] += 1
+        resultado = fn(desde=desde, hasta=hasta, **kwargs)
+        with _cache_lock:
+            _cache[clave] = resultado
+            while len(_cache) > MAX_CACHE:
+                _cache.popitem(last=False)
+        return resultado
+    wrapper.__name__ = fn.__name__
+    wrapper.__doc__ = fn.__doc__
+    return wrapper
+
+
+def _tickets_expr(v):
+    clave = v.c.id_terminal + '-' + db.cast(v.c.id_venta, db.String)
+    return db.func.count(db.distinct(clave))
+
+
+def _periodo_expr(v, agrupacion):
+    if agrupacion not in AGRUPACIONES:
+        raise ReporteInvalido(f'Agrupación inválida: {agrupacion}')
+    if db.engine.dialect.name == 'postgresql':
+        unidad = {'dia': 'day', 'semana': 'week', 'mes': 'month'}[agrupacion]
+        return db.func.to_char(db.func.date_trunc(unidad, v.c.fecha), 'YYYY-MM-DD')
+    if agrupacion == 'dia':
+        return db.func.date(v.c.fecha)
+    if agrupacion == 'semana':
+        return db.func.date(v.c.fecha, '-6 days', 'weekday 1')
+    return db.func.strftime('%Y-%m-01', v.c.fecha)
+
+
+def _monto(valor):
+    return round(float(valor or 0), 2)
+
+
+@_cacheable
+def ingresos_por_periodo(desde=None, hasta=None, terminal=None, agrupacion='dia'):
+    """Ingresos, tickets y unidades por día, semana (lunes) o mes."""
+    v = archive.ventas_rango(desde, hasta, terminal)
+    periodo = _periodo_expr(v, agrupacion).label('periodo')
+    stmt = db.select(
+        periodo,
+        db.func.sum(v.c.total_venta),
+        _tickets_expr(v),
+        db.func.sum(v.c.cantidad),
+    ).group_by(periodo).order_by(periodo)
+    return [
+        {'periodo': p, 'ingresos': _monto(ingresos), 'tickets': tickets, 'unidades': int(unidades or 0)}
+        for p, ingresos, tickets, unidades in db.session.execute(stmt)
+    ]
+
+
+@_cacheable
+def ingresos_por_terminal(desde=None, hasta=None):
+    v = archive.ventas_rango(desde, hasta)
+    stmt = db.select(
+        v.c.id_terminal,
+        db.func.sum(v.c.total_venta),
+        _tickets_expr(v),
+        db.func.sum(v.c.cantidad),
+    ).group_by(v.c.id_terminal).order_by(v.c.id_terminal)
+    return [
+        {'terminal': t, 'ingresos': _monto(ingresos), 'tickets': tickets, 'unidades': int(unidades or 0)}
+        for t, ingresos, tickets, unidades in db.session.execute(stmt)
+    ]
+
+
+@_cacheable
+def ingresos_por_categoria(desde=None, hasta=None, terminal=None):
+    v = archive.ventas_rango(desde, hasta, terminal)
+    categoria = db.func.coalesce(Producto.categoria, 'Sin Categoría').label('categoria')
+    ingresos = db.func.sum(v.c.total_venta).label('ingresos')
+    stmt = db.select(
+        categoria,
+        ingresos,
+        db.func.sum(v.c.cantidad),
+    ).select_from(v).outerjoin(Producto, Producto.nombre == v.c.producto_nombre)
+    stmt = stmt.group_by(categoria).order_by(ingresos.desc())
+    return [
+        {'categoria': c, 'ingresos': _monto(total), 'unidades': int(unidades or 0)}
+        for c, total, unidades in db.session.execute(stmt)
+    ]
+
+
+@_cacheable
+def top_productos(desde=None, hasta=None, terminal=None, orden='ingresos', limite=10, pagina=1):
+    """Ranking paginado de productos por ingresos o por unidades vendidas."""
+    if orden not in ORDENES_TOP:
+        raise ReporteInvalido(f'Orden inválido: {orden}')
+    v = archive.ventas_rango(desde, hasta, terminal)
+    ingresos = db.func.sum(v.c.total_venta).label('ingresos')
+    unidades = db.func.sum(v.c.cantidad).label('unidades')
+    clave_orden = ingresos if orden == 'ingresos' else unidades
+    stmt = db.select(v.c.producto_nombre, ingresos, unidades).group_by(v.c.producto_nombre)
+    total = db.session.execute(db.select(db.func.count(db.distinct(v.c.producto_nombre)))).scalar() or 0
+    stmt = stmt.order_by(clave_orden.desc(), v.c.producto_nombre).limit(limite).offset((pagina - 1) * limite)
+    items = [
+        {'producto': nombre, 'ingresos': _monto(total_producto), 'unidades': int(cant or 0)}
+        for nombre, total_producto, cant in db.session.execute(stmt)
+    ]
+    return {
+        'items': items,
+        'pagina': pagina,
+        'limite': limite,
+        'total': total,
+        'paginas': (total + limite - 1) // limite if limite else 0,
+    }
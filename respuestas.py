@@ -0,0 +1,135 @@
+"""Compresión de respuestas y cache HTTP de archivos estáticos.
+
+    - `registrar_compresion`: comprime con brotli (si el módulo `brotli` está
+      instalado) o gzip las respuestas de texto/JSON que superan `minimo`
+      bytes, según el `Accept-Encoding` del cliente. No toca las respuestas
+      en streaming (SSE, exportaciones). Los ETag de las respuestas
+      comprimidas pasan a ser débiles, que es lo que corresponde para una
+      representación codificada y sigue validando `If-None-Match`.
+    - `registrar_estaticos`: `url_for('static', ...)` agrega `?v=<hash del
+      contenido>` y esas URLs se sirven con `Cache-Control: immutable` por
+      un año; al cambiar el archivo cambia la URL. Los estáticos comprimidos
+      se guardan en memoria por hash.
+"""
+import gzip
+import hashlib
+import os
+import threading
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depende del entorno
+    brotli = None
+
+COMPRIMIBLES = {
+    'text/html', 'text/css', 'text/plain', 'text/csv', 'text/javascript',
+    'application/javascript', 'application/json', 'application/x-ndjson', 'image/svg+xml',
+}
+MAX_AGE_INMUTABLE = 365 * 24 * 3600
+
+
+def _codificacion(accept_encodings):
+    if brotli is not None and accept_encodings['br']:
+        return 'br'
+    if accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+
+def _comprimir(datos, codificacion, nivel):
+    if codificacion == 'br':
+        return brotli.compress(datos, quality=min(nivel, 11))
+    return gzip.compress(datos, compresslevel=nivel, mtime=0)
+
+
+def registrar_compresion(app, minimo=1024, nivel=6):
+    cache_estaticos = {}
+    lock = threading.Lock()
+
+    @app.after_request
+    def comprimir_respuesta(response):
+        if (request.method == 'HEAD'
+                or response.status_code != 200
+                or response.is_streamed and not response.direct_passthrough
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRIMIBLES):
+            return response
+        response.vary.add('Accept-Encoding')
+        codificacion = _codificacion(request.accept_encodings)
+        if codificacion is None:
+            return response
+
+        if response.direct_passthrough:
+            # Sólo los estáticos con huella: su contenido no cambia para la misma URL
+            version = request.args.get('v')
+            if request.endpoint != 'static' or not version:
+                return response
+            clave = (request.view_args.get('filename'), version, codificacion)
+            with lock:
+                comprimido = cache_estaticos.get(clave)
+            response.direct_passthrough = False
+            if comprimido is None:
+                datos = response.get_data()
+                if len(datos) < minimo:
+                    return response
+                comprimido = _comprimir(datos, codificacion, nivel)
+                with lock:
+                    cache_estaticos[clave] = comprimido
+            if hasattr(response.response, 'close'):
+                response.response.close()
+        else:
+            datos = response.get_data()
+            if len(datos) < minimo:
+                return response
+            comprimido = _comprimir(datos, codificacion, nivel)
+
+        response.set_data(comprimido)
+        response.headers['Content-Encoding'] = codificacion
+        etag, debil = response.get_etag()
+        if etag and not debil:
+            response.set_etag(etag, weak=True)
+        return response
+
+
+def registrar_estaticos(app, max_age=MAX_AGE_INMUTABLE):
+    huellas = {}
+    lock = threading.Lock()
+
+    def huella(filename):
+        ruta = os.path.join(app.static_folder, filename)
+        try:
+            mtime = os.path.getmtime(ruta)
+        except OSError:
+            return None
+        with lock:
+            guardada = huellas.get(filename)
+        if guardada and guardada[0] == mtime:
+            return guardada[1]
+        with open(ruta, 'rb') as f:
+            valor = hashlib.sha256(f.read()).hexdigest()[:12]
+        with lock:
+            huellas[filename] = (mtime, valor)
+        return valor
+
+    @app.url_defaults
+    def versionar_estatico(endpoint, values):
+        if endpoint == 'static' and 'filename' in values and 'v' not in values:
+            valor = huella(values['filename'])
+            if valor:
+                values['v'] = valor
+
+    @app.after_request
+    def cache_estatico(response):
+        if request.endpoint != 'static' or response.status_code not in (200, 304):
+            return response
+        version = request.args.get('v')
+        if version and version == huella(request.view_args.get('filename', '')):
+            response.cache_control.public = True
+            response.cache_control.no_cache = None
+            response.cache_control.max_age = max_age
+            response.cache_control.immutable = True
+        return response
+
+    return huella
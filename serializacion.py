@@ -0,0 +1,111 @@
+"""Serialización JSON para respuestas, eventos y exportaciones.
+
+`ProveedorJSON` reemplaza al proveedor por defecto de Flask (`app.json`) y
+usa orjson si está instalado: serializa en C y convierte `date`, `time` y
+`datetime` a ISO 8601 sin pasar por `default`. Sin orjson cae en el
+encoder de la stdlib con el mismo formato ISO para fechas, así que la salida
+no depende de qué backend esté activo.
+
+Los serializadores por lote (`productos`, `ventas`) leen los atributos con un
+único `attrgetter` y dejan las fechas como objetos nativos, en lugar de
+llamar a `to_dict()` con sus `isoformat()`/`str()` por fila.
+"""
+import dataclasses
+import decimal
+import json
+from datetime import date, datetime, time
+from operator import attrgetter
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None
+
+CAMPOS_PRODUCTO = (
+    'id', 'nombre', 'categoria', 'subcategoria', 'precio_venta',
+    'proveedor', 'estado', 'stock', 'fecha_creacion'
+)
+CAMPOS_VENTA = (
+    'id_venta', 'fecha', 'hora', 'id_cliente', 'producto_id', 'producto_nombre',
+    'cantidad', 'precio_unitario', 'total_venta', 'vendedor', 'id_terminal'
+)
+
+
+def _default(obj):
+    if isinstance(obj, (date, datetime, time)):
+        return obj.isoformat()
+    if isinstance(obj, decimal.Decimal):
+        return str(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if hasattr(obj, '__html__'):
+        return str(obj.__html__())
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+def _opciones(ordenar=False, indentar=False):
+    opciones = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    if ordenar:
+        opciones |= orjson.OPT_SORT_KEYS
+    if indentar:
+        opciones |= orjson.OPT_INDENT_2
+    return opciones
+
+
+def dumps_bytes(obj):
+    """JSON compacto en bytes UTF-8."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=_opciones())
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def dumps(obj):
+    return dumps_bytes(obj).decode('utf-8')
+
+
+def loads(datos):
+    if orjson is not None:
+        return orjson.loads(datos)
+    return json.loads(datos)
+
+
+class ProveedorJSON(DefaultJSONProvider):
+    """`app.json` con orjson cuando está disponible."""
+
+    default = staticmethod(_default)
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=_default, option=_opciones(self.sort_keys)).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        indentar = self.compact is False or (self.compact is None and self._app.debug)
+        cuerpo = orjson.dumps(obj, default=_default, option=_opciones(self.sort_keys, indentar))
+        return self._app.response_class(cuerpo + b'\n', mimetype=self.mimetype)
+
+
+def serializador(campos):
+    """Devuelve `f(objetos) -> [dict]` que lee `campos` de cada objeto sin `to_dict()`."""
+    leer = attrgetter(*campos)
+    if len(campos) == 1:
+        return lambda objetos: [{campos[0]: leer(o)} for o in objetos]
+    return lambda objetos: [dict(zip(campos, leer(o))) for o in objetos]
+
+
+productos = serializador(CAMPOS_PRODUCTO)
+ventas = serializador(CAMPOS_VENTA)
@@ -0,0 +1,118 @@
+"""Stock de productos y su ledger de movimientos.
+
+`Producto.stock` en NULL significa que el producto no lleva control de stock
+(se vende sin límite, como antes). Para los que sí lo llevan:
+
+    - `descontar` baja el stock de todas las líneas de una venta con un único
+      UPDATE condicional (`stock >= pedido`); si alguna línea no alcanza, lanza
+      `StockInsuficiente` y la ruta revierte la venta completa.
+    - Al llegar a 0 el producto pasa a 'Agotado', que queda fuera de los
+      filtros por `estado = 'Disponible'` del POS y la búsqueda. Al reponer
+      (`ajustar`) vuelve a 'Disponible'.
+    - Cada cambio queda en `stock_movimientos` con el stock resultante.
+
+Ninguna función hace commit.
+"""
+from collections import Counter
+
+from sqlalchemy import case, update
+
+from models import db, MovimientoStock, Producto
+
+AGOTADO = 'Agotado'
+DISPONIBLE = 'Disponible'
+MOTIVOS = ('venta', 'ingreso', 'ajuste', 'inventario')
+
+
+class StockInsuficiente(Exception):
+    def __init__(self, faltantes):
+        self.faltantes = faltantes
+        detalle = ', '.join(f"{f['producto']} (pedido {f['pedido']}, stock {f['stock']})" for f in faltantes)
+        super().__init__(f'Stock insuficiente: {detalle}')
+
+
+class AjusteInvalido(ValueError):
+    pass
+
+
+def descontar(lineas, referencia=None):
+    """Descuenta [(producto_id, cantidad), ...]; devuelve los ids que quedaron agotados."""
+    pedido = Counter()
+    for producto_id, cantidad in lineas:
+        if producto_id is not None:
+            pedido[producto_id] += cantidad
+    if not pedido:
+        return []
+
+    cantidad_pedida = case(dict(pedido), value=Producto.id)
+    restante = Producto.stock - cantidad_pedida
+    actualizados = db.session.execute(
+        update(Producto)
+        .where(Producto.id.in_(pedido), Producto.stock.is_not(None), Producto.stock >= cantidad_pedida)
+        .values(stock=restante, estado=case((restante <= 0, AGOTADO), else_=Producto.estado))
+        .returning(Producto.id, Producto.stock, Producto.estado)
+        .execution_options(synchronize_session='fetch')
+    ).all()
+
+    pendientes = set(pedido) - {producto_id for producto_id, _, _ in actualizados}
+    if pendientes:
+        faltantes = [
+            {'producto_id': producto_id, 'producto': nombre, 'pedido': pedido[producto_id], 'stock': disponible}
+            for producto_id, nombre, disponible in db.session.query(
+                Producto.id, Producto.nombre, Producto.stock
+            ).filter(Producto.id.in_(pendientes), Producto.stock.is_not(None)).order_by(Producto.id)
+        ]
+        if faltantes:
+            raise StockInsuficiente(faltantes)
+
+    db.session.add_all(
+        MovimientoStock(
+            producto_id=producto_id, cantidad=-pedido[producto_id], stock_resultante=disponible,
+            motivo='venta', referencia=referencia
+        )
+        for producto_id, disponible, _ in actualizados
+    )
+    return [producto_id for producto_id, _, estado in actualizados if estado == AGOTADO]
+
+
+def ajustar(producto_id, cantidad=None, stock=None, motivo='ajuste', referencia=None):
+    """Suma `cantidad` (puede ser negativa) o fija `stock` por inventario; devuelve el movimiento."""
+    if motivo not in MOTIVOS:
+        raise AjusteInvalido(f"Motivo inválido, usar: {', '.join(MOTIVOS)}")
+    if (cantidad is None) == (stock is None):
+        raise AjusteInvalido('Indicar cantidad o stock')
+    previo = db.session.query(Producto.stock).filter(Producto.id == producto_id).with_for_update().first()
+    if previo is None:
+        raise AjusteInvalido('Producto no encontrado')
+    previo = previo[0]
+    if cantidad is not None:
+        if previo is None:
+            raise AjusteInvalido('El producto no lleva control de stock, fijar stock primero')
+        if not cantidad:
+            raise AjusteInvalido('La cantidad no puede ser 0')
+        nuevo = Producto.stock + cantidad
+    else:
+        if stock < 0:
+            raise AjusteInvalido('El stock no puede ser negativo')
+        nuevo = db.literal(stock)
+    resultante = db.session.execute(
+        update(Producto)
+        .where(Producto.id == producto_id, nuevo >= 0)
+        .values(
+            stock=nuevo,
+            estado=case((nuevo <= 0, AGOTADO), (Producto.estado == AGOTADO, DISPONIBLE), else_=Producto.estado)
+        )
+        .returning(Producto.stock)
+        .execution_options(synchronize_session='fetch')
+    ).scalar()
+    if resultante is None:
+        raise AjusteInvalido('El ajuste dejaría el stock negativo')
+    movimiento = MovimientoStock(
+        producto_id=producto_id,
+        cantidad=resultante - (previo or 0),
+        stock_resultante=resultante,
+        motivo=motivo,
+        referencia=referencia
+    )
+    db.session.add(movimiento)
+    return movimiento
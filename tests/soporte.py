@@ -0,0 +1,241 @@
+"""Soporte común para tests rápidos de base de datos.
+
+`PruebaBD` corre cada test sobre un SQLite en memoria (StaticPool, esquema
+creado una vez por proceso) dentro de una transacción externa que se revierte
+en `tearDown`. La sesión se une a esa transacción con SAVEPOINTs, así que los
+`commit()` del código bajo prueba liberan un SAVEPOINT y nada llega a
+persistirse: no hace falta `drop_all`/`create_all` ni borrar archivos.
+
+Los tests que necesitan commits reales vistos desde otra conexión (hilos de
+`trabajos`, `_migrar_esquema`/`init_db`, el pool de conexiones real) heredan
+de `PruebaArchivoBD`: un SQLite en un directorio temporal propio de cada
+test, que se borra al terminar. Ningún test escribe una base dentro del repo.
+
+Fábricas y fixtures:
+    - `crear_productos` / `crear_ventas`: inserts en bloque de datos
+      sintéticos deterministas (con `semilla`).
+    - `planilla_en_memoria`: sirve filas (dicts o DataFrame) a los seeders
+      como si fueran el contenido de una planilla, sin escribir ni releer
+      Excel.
+    - `csv_bytes`: las mismas filas como CSV en memoria, para uploads.
+"""
+import csv
+import io
+import os
+import random
+import tempfile
+import unittest
+from contextlib import contextmanager
+from datetime import date, time, timedelta
+from unittest import mock
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.pool import StaticPool
+from flask_sqlalchemy.session import Session
+
+# La app se importa con una base en memoria; cada TestCase le cambia el engine
+os.environ['DATABASE_URL'] = 'sqlite://'
+
+import readers
+from app import app, db, Producto, Venta
+
+CATEGORIAS = ('Panadería', 'Bebidas', 'Almacén', 'Lácteos', 'Fiambrería')
+TERMINALES = ('POS1', 'POS2', 'POS3')
+
+_motor = None
+
+
+def motor_en_memoria():
+    """Engine SQLite en memoria compartido por el proceso, con el esquema creado."""
+    global _motor
+    if _motor is None:
+        _motor = create_engine(
+            'sqlite://', poolclass=StaticPool, connect_args={'check_same_thread': False}
+        )
+
+        # pysqlite maneja BEGIN por su cuenta y rompe los SAVEPOINT; se lo
+        # delegamos a SQLAlchemy.
+        @event.listens_for(_motor, 'connect')
+        def _sin_autobegin(dbapi_connection, connection_record):
+            dbapi_connection.isolation_level = None
+
+        @event.listens_for(_motor, 'begin')
+        def _begin(conn):
+            conn.exec_driver_sql('BEGIN')
+
+        db.metadata.create_all(_motor)
+    return _motor
+
+
+class _SesionPrueba(Session):
+    """Sesión de Flask-SQLAlchemy que respeta el `bind` (la conexión del test)."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        return bind if bind is not None else self.bind
+
+
+class PruebaBD(unittest.TestCase):
+    """TestCase con contexto de app y base en memoria revertida en cada test."""
+
+    def setUp(self):
+        self.ctx = app.app_context()
+        self.ctx.push()
+        motores = db.engines
+        self._motor_original = motores[None]
+        motores[None] = motor_en_memoria()
+        self.conexion = motores[None].connect()
+        self.transaccion = self.conexion.begin()
+        self._sesion_original = db.session
+        db.session = db._make_scoped_session({
+            'class_': _SesionPrueba,
+            'bind': self.conexion,
+            'join_transaction_mode': 'create_savepoint',
+        })
+
+    def tearDown(self):
+        db.session.remove()
+        db.session = self._sesion_original
+        self.transaccion.rollback()
+        self.conexion.close()
+        db.engines[None] = self._motor_original
+        self.ctx.pop()
+
+    def cliente(self, usuario='admin', password=None):
+        client = app.test_client()
+        client.post('/login', data={'usuario': usuario, 'password': password or f'{usuario}123'})
+        return client
+
+
+class PruebaArchivoBD(unittest.TestCase):
+    """TestCase sobre un SQLite en archivo temporal, nuevo en cada test.
+
+    Con `crear_esquema = False` el test arranca con la base vacía (migraciones
+    desde esquemas viejos).
+    """
+
+    crear_esquema = True
+    cliente = PruebaBD.cliente
+
+    def setUp(self):
+        self.ctx = app.app_context()
+        self.ctx.push()
+        self._directorio = tempfile.TemporaryDirectory()
+        motores = db.engines
+        self._motor_original = motores[None]
+        motores[None] = create_engine(f"sqlite:///{os.path.join(self._directorio.name, 'pocopan.db')}")
+        if self.crear_esquema:
+            db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.engines[None].dispose()
+        db.engines[None] = self._motor_original
+        self.ctx.pop()
+        self._directorio.cleanup()
+
+
+def crear_productos(cantidad, semilla=0, **valores):
+    """Inserta `cantidad` productos sintéticos ('Producto 00000', ...); devuelve las filas."""
+    azar = random.Random(semilla)
+    filas = [
+        {
+            'nombre': f'Producto {i:05d}',
+            'categoria': CATEGORIAS[i % len(CATEGORIAS)],
+            'subcategoria': '',
+            'precio_venta': round(azar.uniform(50, 5000), 2),
+            'proveedor': 'Catálogo',
+            'estado': 'Disponible',
+            **valores,
+        }
+        for i in range(cantidad)
+    ]
+    if filas:
+        db.session.execute(insert(Producto), filas)
+        db.session.commit()
+    return filas
+
+
+def crear_ventas(tickets, productos=None, lineas=3, desde=date(2024, 1, 1), dias=30,
+                 terminales=TERMINALES, semilla=0):
+    """Inserta `tickets` tickets de hasta `lineas` renglones repartidos entre terminales y días.
+
+    `productos` es una lista de filas como las que devuelve `crear_productos`
+    (por defecto se crean 20). Devuelve las filas insertadas.
+    """
+    azar = random.Random(semilla)
+    productos = productos or crear_productos(20, semilla=semilla)
+    ids = {p.nombre: p.id for p in Producto.query.with_entities(Producto.nombre, Producto.id)}
+    secuencia = dict.fromkeys(terminales, 0)
+    filas = []
+    for n in range(tickets):
+        terminal = terminales[n % len(terminales)]
+        secuencia[terminal] += 1
+        fecha = desde + timedelta(days=azar.randrange(dias))
+        hora = time(azar.randrange(7, 21), azar.randrange(60))
+        cliente = f'CLIENTE-{terminal}-{secuencia[terminal]:04d}'
+        for producto in azar.sample(productos, min(azar.randint(1, lineas), len(productos))):
+            cantidad = azar.randint(1, 4)
+            filas.append({
+                'id_venta': secuencia[terminal],
+                'fecha': fecha,
+                'hora': hora,
+                'id_cliente': cliente,
+                'producto_id': ids.get(producto['nombre']),
+                'producto_nombre': producto['nombre'],
+                'cantidad': cantidad,
+                'precio_unitario': producto['precio_venta'],
+                'total_venta': round(cantidad * producto['precio_venta'], 2),
+                'vendedor': terminal.lower(),
+                'id_terminal': terminal,
+            })
+    if filas:
+        db.session.execute(insert(Venta), filas)
+        db.session.commit()
+    return filas
+
+
+def _registros(filas):
+    if hasattr(filas, 'to_dict'):
+        filas = filas.astype(object).where(filas.notna(), None).to_dict('records')
+    return [dict(fila) for fila in filas]
+
+
+@contextmanager
+def planilla_en_memoria(filas, ruta='memoria.csv'):
+    """Hace que los lectores de planillas devuelvan `filas` al leer `ruta`.
+
+    Acepta una lista de dicts o un DataFrame. Mientras dura el contexto, los
+    seeders llamados con `ruta=ruta` (o con la ruta por defecto apuntando a
+    `ruta`) leen las filas directamente, sin pasar por disco. Devuelve
+    `cargar(filas)` para reemplazar el contenido dentro del mismo test.
+    """
+    contenido = {ruta: _registros(filas)}
+
+    def cargar(nuevas):
+        contenido[ruta] = _registros(nuevas)
+
+    leer_original = readers.iter_filas
+    existente_original = readers.ruta_existente
+
+    def iter_filas(destino, hoja=None):
+        if destino in contenido:
+            return iter([dict(fila) for fila in contenido[destino]])
+        return leer_original(destino, hoja)
+
+    def ruta_existente(destino):
+        return destino if destino in contenido else existente_original(destino)
+
+    with mock.patch.object(readers, 'iter_filas', iter_filas), \
+            mock.patch.object(readers, 'ruta_existente', ruta_existente):
+        yield cargar
+
+
+def csv_bytes(filas):
+    """Las filas (dicts o DataFrame) como CSV UTF-8 en un `BytesIO`, listo para subir."""
+    registros = _registros(filas)
+    texto = io.StringIO()
+    if registros:
+        escritor = csv.DictWriter(texto, fieldnames=list(registros[0]))
+        escritor.writeheader()
+        escritor.writerows({k: '' if v is None else v for k, v in fila.items()} for fila in registros)
+    return io.BytesIO(texto.getvalue().encode('utf-8'))
@@ -0,0 +1,87 @@
+import unittest
+from datetime import date, time, timedelta
+from unittest import mock
+
+from soporte import PruebaBD
+
+import analytics
+from app import db, dashboard_cache, Venta
+
+
+def _linea(id_venta, terminal, producto, total, fecha=date(2024, 1, 1), hora=time(10, 15)):
+    return Venta(
+        id_venta=id_venta,
+        fecha=fecha,
+        hora=hora,
+        id_cliente=f'CLIENTE-{terminal}-{id_venta:04d}',
+        producto_nombre=producto,
+        cantidad=1,
+        precio_unitario=total,
+        total_venta=total,
+        vendedor=f'POS {terminal}',
+        id_terminal=terminal,
+    )
+
+
+class AnaliticaTests(PruebaBD):
+    def setUp(self):
+        super().setUp()
+        # 2024-01-01 es lunes, 2024-01-06 sábado
+        db.session.add_all([
+            _linea(1, 'POS1', 'Pan', 10),
+            _linea(1, 'POS1', 'Leche', 5),
+            _linea(2, 'POS1', 'Pan', 10, hora=time(18, 0)),
+            _linea(2, 'POS1', 'Leche', 5, hora=time(18, 0)),
+            _linea(2, 'POS1', 'Café', 20, hora=time(18, 0)),
+            _linea(1, 'POS2', 'Pan', 10, fecha=date(2024, 1, 6)),
+        ])
+        db.session.commit()
+
+    def test_tickets_se_identifican_por_terminal_y_venta(self):
+        columnas = analytics.cargar_columnas()
+        self.assertEqual(columnas.n_tickets, 3)
+
+        heatmap = analytics.heatmap_horario(columnas)
+        self.assertEqual(heatmap['tickets'][0][10], 1)
+        self.assertEqual(heatmap['tickets'][0][18], 1)
+        self.assertEqual(heatmap['tickets'][5][10], 1)
+        self.assertEqual(heatmap['ingresos'][0][18], 35.0)
+
+    def test_canastas_por_terminal(self):
+        canastas = analytics.canastas_por_terminal(analytics.cargar_columnas())
+        pos1 = next(c for c in canastas if c['terminal'] == 'POS1')
+        self.assertEqual(pos1['tickets'], 2)
+        self.assertEqual(pos1['valor_promedio'], 25.0)
+        self.assertEqual(pos1['lineas_promedio'], 2.5)
+
+    def test_co_ocurrencia_cuenta_pares_por_ticket(self):
+        pares = analytics.co_ocurrencia(analytics.cargar_columnas(), min_tickets=1)
+        self.assertEqual(pares[0]['producto_a'], 'Leche')
+        self.assertEqual(pares[0]['producto_b'], 'Pan')
+        self.assertEqual(pares[0]['tickets'], 2)
+        self.assertEqual(len(pares), 3)
+
+    def test_dashboard_admin_renderiza(self):
+        client = self.cliente()
+        self.assertEqual(client.get('/dashboard/TODAS').status_code, 200)
+        response = client.get('/analitica/heatmap?terminal=POS2&desde=2024-01-01')
+        self.assertEqual(response.get_json()['tickets'], 1)
+
+    def test_analitica_usa_rango_acotado_y_cache_versionado(self):
+        db.session.add(_linea(3, 'POS1', 'Pan', 10, fecha=date.today()))
+        db.session.commit()
+        client = self.cliente()
+        dashboard_cache.clear()
+        with mock.patch.object(analytics, 'cargar_columnas', wraps=analytics.cargar_columnas) as cargar:
+            data = client.get('/analitica/canastas').get_json()
+            self.assertEqual(data['tickets'], 1)
+            self.assertEqual(data['desde'], (date.today() - timedelta(days=89)).isoformat())
+            self.assertEqual(client.get('/analitica/canastas').get_json()['datos'], data['datos'])
+            self.assertEqual(cargar.call_count, 1)
+            dashboard_cache.bump_version()
+            client.get('/analitica/canastas')
+            self.assertEqual(cargar.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import unittest
+from datetime import date, time
+
+from soporte import PruebaBD, planilla_en_memoria
+
+import archive
+import exports
+import reports
+from app import db, _calcular_dashboard, refresh_contadores, seed_sales_from_excel, Contador, Producto, Venta
+from models import ResumenVentas
+
+
+class ArchivoTests(PruebaBD):
+    def setUp(self):
+        super().setUp()
+        reports.invalidar_cache()
+        db.session.add(Producto(nombre='Pan', categoria='Panadería', precio_venta=10))
+        db.session.add_all([
+            Venta(id_venta=1, fecha=date(2024, 1, 10), hora=time(9), id_cliente='CLIENTE-POS1-0001',
+                  producto_nombre='Pan', cantidad=2, precio_unitario=10, total_venta=20, id_terminal='POS1'),
+            Venta(id_venta=1, fecha=date(2024, 1, 10), hora=time(9), id_cliente='CLIENTE-POS1-0001',
+                  producto_nombre='Café', cantidad=1, precio_unitario=5, total_venta=5, id_terminal='POS1'),
+            Venta(id_venta=7, fecha=date(2024, 2, 3), hora=time(11), id_cliente='CLIENTE-POS2-0012',
+                  producto_nombre='Pan', cantidad=3, precio_unitario=10, total_venta=30, id_terminal='POS2'),
+            Venta(id_venta=8, fecha=date.today(), hora=time(10), id_cliente='CLIENTE-POS1-0002',
+                  producto_nombre='Pan', cantidad=1, precio_unitario=10, total_venta=10, id_terminal='POS1'),
+        ])
+        db.session.commit()
+
+    def test_corte_keeps_current_month_hot(self):
+        self.assertEqual(archive.corte(1, hoy=date(2024, 3, 15)), date(2024, 3, 1))
+        self.assertEqual(archive.corte(3, hoy=date(2024, 2, 15)), date(2023, 12, 1))
+        self.assertEqual(archive.corte(0, hoy=date(2024, 3, 15)), date(2024, 3, 1))
+
+    def test_dry_run_moves_nothing(self):
+        reporte = archive.archivar(date(2024, 3, 1), dry_run=True)
+        self.assertEqual(reporte['filas'], 3)
+        self.assertEqual([m['mes'] for m in reporte['meses']], ['2024-01', '2024-02'])
+        self.assertEqual(Venta.query.count(), 4)
+        self.assertIsNone(archive.frontera())
+
+    def test_archivar_folds_summaries_and_moves_rows(self):
+        antes = reports.ingresos_por_terminal()
+        reporte = archive.archivar(date(2024, 3, 1))
+        self.assertEqual(reporte['filas'], 3)
+        self.assertEqual(Venta.query.count(), 1)
+        self.assertEqual(db.session.execute(db.select(db.func.count()).select_from(archive.ventas_archivo)).scalar(), 3)
+        self.assertEqual(archive.frontera(), date(2024, 2, 3))
+
+        resumen = ResumenVentas.query.filter_by(fecha=date(2024, 1, 10), id_terminal='POS1').one()
+        self.assertEqual((resumen.tickets, resumen.lineas, resumen.unidades), (1, 2, 3))
+        self.assertEqual(resumen.ingresos, 25)
+        self.assertEqual(resumen.ultimo_cliente, 1)
+
+        reports.invalidar_cache()
+        self.assertEqual(reports.ingresos_por_terminal(), antes)
+        self.assertEqual(archive.archivar(date(2024, 3, 1))['filas'], 0)
+
+    def test_range_queries_union_archive_only_when_needed(self):
+        archive.archivar(date(2024, 3, 1))
+        self.assertFalse(archive.necesita_archivo(date(2024, 3, 1)))
+        self.assertTrue(archive.necesita_archivo(date(2024, 2, 1)))
+        self.assertTrue(archive.necesita_archivo(None))
+
+        enero = reports.ingresos_por_periodo(desde=date(2024, 1, 1), hasta=date(2024, 1, 31))
+        self.assertEqual(enero, [{'periodo': '2024-01-10', 'ingresos': 25.0, 'tickets': 1, 'unidades': 3}])
+        hoy = reports.ingresos_por_periodo(desde=date.today(), hasta=date.today())
+        self.assertEqual(hoy[0]['ingresos'], 10.0)
+
+        filas = [fila for bloque in exports.iter_filas(exports.ventas_select()) for fila in bloque]
+        self.assertEqual([f[0] for f in filas], [1, 1, 7, 8])
+
+    def test_counters_and_dashboard_include_archived_sales(self):
+        archive.archivar(date(2024, 3, 1))
+        refresh_contadores()
+        pos2 = Contador.query.filter_by(terminal='POS2').one()
+        self.assertEqual((pos2.ultima_venta, pos2.ultimo_cliente, pos2.total_ventas), (7, 12, 1))
+        todas = Contador.query.filter_by(terminal='TODAS').one()
+        self.assertEqual((todas.ultima_venta, todas.total_ventas), (8, 4))
+
+        stats = _calcular_dashboard('TODAS')
+        self.assertEqual(stats['stats']['ingresos_totales_valor'], 65)
+        self.assertEqual(stats['stats']['ventas_totales'], 3)
+        self.assertEqual(stats['stats_avanzadas']['monto_historico'], 65)
+
+    def test_reseeding_the_sales_sheet_skips_archived_days(self):
+        archive.archivar(date(2024, 3, 1))
+        reports.invalidar_cache()
+        antes = reports.ingresos_por_terminal()
+        planilla = [
+            {'ID_Venta': 1, 'Fecha': '2024-01-10', 'Hora': '09:00', 'ID_Cliente': 'CLIENTE-POS1-0001',
+             'Producto': 'Pan', 'Cantidad': 2, 'Precio_Unitario': 10, 'Total_Venta': 20, 'ID_Terminal': 'POS1'},
+            {'ID_Venta': 7, 'Fecha': '2024-02-03', 'Hora': '11:00', 'ID_Cliente': 'CLIENTE-POS2-0012',
+             'Producto': 'Pan', 'Cantidad': 3, 'Precio_Unitario': 10, 'Total_Venta': 30, 'ID_Terminal': 'POS2'},
+        ]
+        with planilla_en_memoria(planilla):
+            resultado = seed_sales_from_excel('memoria.csv')
+        self.assertEqual(resultado, {'created': 0, 'updated': 0})
+        self.assertEqual(Venta.query.count(), 1)
+        reports.invalidar_cache()
+        self.assertEqual(reports.ingresos_por_terminal(), antes)
+        self.assertEqual(_calcular_dashboard('TODAS')['stats']['ingresos_totales_valor'], 65)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from soporte import PruebaBD
+
+import app as pocopan_app
+import cache
+from app import app, db, Producto, Contador
+
+
+class BackendsTests(unittest.TestCase):
+    def test_memory_cache_expires_and_evicts(self):
+        backend = cache.MemoryCache(max_items=2)
+        backend.set('a', 1, ttl=60)
+        backend.set('b', 2, ttl=60)
+        backend.set('c', 3, ttl=60)
+        self.assertIsNone(backend.get('a'))
+        self.assertEqual(backend.get('c'), 3)
+        backend.set('d', 4, ttl=-1)
+        self.assertIsNone(backend.get('d'))
+        self.assertEqual((backend.hits, backend.misses), (1, 2))
+
+    def test_sqlite_cache_shares_values_and_version_between_instances(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'cache.sqlite')
+            worker_a = cache.crear_cache('sqlite', path=path)
+            worker_b = cache.crear_cache('sqlite', path=path)
+            worker_a.set('k', {'total': 1.5}, ttl=60)
+            self.assertEqual(worker_b.get('k'), {'total': 1.5})
+            worker_a.bump_version()
+            self.assertEqual(worker_b.version(), 1)
+
+
+class DashboardCacheTests(PruebaBD):
+    def setUp(self):
+        super().setUp()
+        db.session.add_all([
+            Producto(nombre='Pan', categoria='Panadería', precio_venta=10),
+            Contador(terminal='POS1'),
+        ])
+        db.session.commit()
+        pocopan_app.dashboard_cache.clear()
+        self.client = self.cliente('pos1')
+
+    def test_dashboard_is_cached_until_a_sale_bumps_the_version(self):
+        with mock.patch.object(
+            pocopan_app, '_calcular_dashboard', wraps=pocopan_app._calcular_dashboard
+        ) as calcular:
+            self.assertEqual(self.client.get('/dashboard').status_code, 200)
+            self.client.get('/dashboard')
+            self.assertEqual(calcular.call_count, 1)
+
+            self.client.post('/agregar-carrito', json={'producto': 'Pan', 'cantidad': 2})
+            self.assertTrue(self.client.post('/finalizar-venta').get_json()['success'])
+            response = self.client.get('/dashboard')
+            self.assertEqual(calcular.call_count, 2)
+            self.assertIn('$20.00', response.get_data(as_text=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
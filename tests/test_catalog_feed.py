@@ -0,0 +1,79 @@
+import unittest
+from unittest import mock
+
+from soporte import PruebaBD, PruebaArchivoBD
+
+import app as pocopan_app
+import events
+from app import app, db, Producto, Contador
+
+
+class CatalogoFeedTests(PruebaBD):
+    def setUp(self):
+        super().setUp()
+        db.session.add_all([
+            Producto(nombre='Pan', categoria='Panadería', precio_venta=10),
+            Contador(terminal='POS1'),
+        ])
+        db.session.commit()
+        self.admin = self.cliente()
+        self.pos = self.cliente('pos1')
+
+    def test_product_edits_are_versioned_and_published(self):
+        with mock.patch.object(events, 'bus', events.EventBus()):
+            cola = events.bus.subscribe('catalogo')
+            self.admin.post('/actualizar-producto', json={
+                'producto_original': 'Pan', 'nombre': 'Pan Francés', 'precio_venta': 12
+            })
+            self.admin.post('/agregar-producto', json={'nombre': 'Leche', 'precio_venta': 5})
+            self.admin.post('/eliminar-producto', json={'producto_nombre': 'Leche'})
+            publicados = [cola.get_nowait() for _ in range(3)]
+
+        self.assertEqual([e['accion'] for e in publicados], ['modificacion', 'alta', 'baja'])
+        self.assertEqual(publicados[0]['producto']['nombre'], 'Pan Francés')
+        self.assertEqual(publicados[0]['producto']['precio_venta'], 12)
+
+        data = self.pos.get('/catalogo/cambios?desde=1').get_json()
+        self.assertEqual(data['version'], 3)
+        self.assertEqual([c['accion'] for c in data['cambios']], ['alta', 'baja'])
+
+    def test_long_poll_returns_current_version_when_idle(self):
+        data = self.pos.get('/catalogo/cambios?desde=0').get_json()
+        self.assertEqual(data, {'success': True, 'version': 0, 'cambios': []})
+
+    def test_catch_up_beyond_limit_asks_for_full_reload(self):
+        for precio in (11, 12, 13):
+            self.admin.post('/actualizar-producto', json={
+                'producto_original': 'Pan', 'nombre': 'Pan', 'precio_venta': precio
+            })
+        self.assertEqual(len(pocopan_app._cambios_catalogo_desde(0, limite=3)), 3)
+        self.assertEqual(pocopan_app._cambios_catalogo_desde(0, limite=2), [
+            {'tipo': 'catalogo', 'accion': 'recargar', 'version': 3, 'producto_id': None}
+        ])
+
+    def test_pos_page_exposes_product_ids_and_catalog_version(self):
+        html = self.pos.get('/punto-venta').get_data(as_text=True)
+        self.assertIn('data-id="1"', html)
+        self.assertIn('let catalogoVersion = 0;', html)
+
+
+class CatalogoStreamTests(PruebaArchivoBD):
+    """El stream SSE se mide contra el pool real: usa la base en archivo."""
+
+    def test_sse_replays_changes_after_last_event_id(self):
+        db.session.add(Producto(nombre='Pan', categoria='Panadería', precio_venta=10))
+        db.session.commit()
+        self.cliente().post('/actualizar-producto', json={
+            'producto_original': 'Pan', 'nombre': 'Pan', 'precio_venta': 11
+        })
+        response = self.cliente('pos1').get('/eventos/catalogo', headers={'Last-Event-ID': '0'}, buffered=False)
+        chunks = iter(response.response)
+        self.assertEqual(next(chunks), b'retry: 5000\n\n')
+        mensaje = next(chunks).decode('utf-8')
+        self.assertTrue(mensaje.startswith('id: 1\nevent: catalogo\n'))
+        self.assertEqual(db.engine.pool.checkedout(), 0)
+        response.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
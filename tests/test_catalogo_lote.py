@@ -0,0 +1,91 @@
+import unittest
+from unittest import mock
+
+from soporte import PruebaBD
+
+import events
+from app import db, Producto, CatalogoCambio
+
+
+class CatalogoLoteTests(PruebaBD):
+    def setUp(self):
+        super().setUp()
+        db.session.add_all([
+            Producto(nombre='Pan', categoria='Panadería', precio_venta=10, proveedor='Molino'),
+            Producto(nombre='Medialuna', categoria='Panadería', precio_venta=4, proveedor='Molino'),
+            Producto(nombre='Leche', categoria='Lácteos', precio_venta=5, proveedor='Tambo'),
+        ])
+        db.session.commit()
+        self.ids = {p.nombre: p.id for p in Producto.query.all()}
+        self.client = self.cliente()
+
+    def precios(self):
+        db.session.expire_all()
+        return {p.nombre: p.precio_venta for p in Producto.query.all()}
+
+    def test_batch_applies_all_operations_in_one_transaction(self):
+        with mock.patch.object(events, 'bus', events.EventBus()):
+            cola = events.bus.subscribe('catalogo')
+            response = self.client.post('/catalogo/lote', json={'operaciones': [
+                {'accion': 'ajuste_precio', 'porcentaje': 10, 'categoria': 'Panadería'},
+                {'accion': 'modificacion', 'id': self.ids['Leche'], 'precio_venta': 6},
+                {'accion': 'alta', 'nombre': 'Manteca', 'precio_venta': 8, 'categoria': 'Lácteos'},
+                {'accion': 'baja', 'nombre': 'medialuna'},
+            ]})
+            publicados = cola.qsize()
+        data = response.get_json()
+        self.assertTrue(data['success'])
+        self.assertEqual(data['resultados'][0]['afectados'], 2)
+        self.assertIsNotNone(data['resultados'][2]['id'])
+        self.assertEqual(self.precios(), {'Pan': 11.0, 'Leche': 6.0, 'Manteca': 8.0})
+        self.assertEqual(CatalogoCambio.query.count(), 5)
+        self.assertEqual(publicados, 5)
+        self.assertEqual(data['version'], 5)
+
+    def test_batch_larger_than_subscriber_queue_publishes_a_single_reload(self):
+        with mock.patch.object(events, 'bus', events.EventBus()), mock.patch.object(events, 'MAX_COLA', 2):
+            cola = events.bus.subscribe('catalogo')
+            data = self.client.post('/catalogo/lote', json={'operaciones': [
+                {'accion': 'ajuste_precio', 'porcentaje': 10, 'ids': list(self.ids.values())},
+            ]}).get_json()
+            publicados = [cola.get_nowait() for _ in range(cola.qsize())]
+        self.assertEqual(data['resultados'][0]['afectados'], 3)
+        self.assertEqual(publicados, [
+            {'tipo': 'catalogo', 'accion': 'recargar', 'version': 3, 'producto_id': None}
+        ])
+
+    def test_price_cut_never_reaches_zero(self):
+        db.session.add(Producto(nombre='Caramelo', categoria='Kiosco', precio_venta=0.01))
+        db.session.commit()
+        data = self.client.post('/catalogo/lote', json={'operaciones': [
+            {'accion': 'ajuste_precio', 'porcentaje': -99.5, 'categoria': 'Kiosco'},
+        ]}).get_json()
+        self.assertTrue(data['success'])
+        self.assertEqual(self.precios()['Caramelo'], 0.01)
+
+    def test_invalid_operation_rolls_back_whole_batch(self):
+        response = self.client.post('/catalogo/lote', json={'operaciones': [
+            {'accion': 'ajuste_precio', 'porcentaje': -20, 'proveedor': 'Molino'},
+            {'accion': 'alta', 'nombre': 'pan', 'precio_venta': 3},
+            {'accion': 'modificacion', 'id': 999, 'precio_venta': 1},
+            {'accion': 'ajuste_precio', 'porcentaje': 5},
+        ]})
+        self.assertEqual(response.status_code, 400)
+        resultados = response.get_json()['resultados']
+        self.assertEqual([r['success'] for r in resultados], [True, False, False, False])
+        self.assertEqual(self.precios(), {'Pan': 10.0, 'Medialuna': 4.0, 'Leche': 5.0})
+        self.assertEqual(CatalogoCambio.query.count(), 0)
+
+    def test_batch_requires_admin_and_operations(self):
+        self.assertEqual(self.client.post('/catalogo/lote', json={}).status_code, 400)
+        pos = self.cliente('pos1')
+        self.assertEqual(pos.post('/catalogo/lote', json={'operaciones': []}).status_code, 403)
+
+    def test_editor_renders_price_adjustment_form(self):
+        html = self.client.get('/editor-catalogo').get_data(as_text=True)
+        self.assertIn('id="form-ajuste"', html)
+        self.assertIn('<option value="Lácteos">Lácteos</option>', html.split('id="ajuste-categoria"')[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+from datetime import date, time
+from unittest import mock
+
+from sqlalchemy import Column, Float, Integer, MetaData, String, Table, text
+
+from soporte import PruebaBD, PruebaArchivoBD, crear_productos
+
+import app as pocopan_app
+import dinero
+import reports
+from app import app, db, Producto, Venta, Contador, calculate_totals
+
+
+def venta(id_venta, total, terminal='POS1'):
+    return Venta(id_venta=id_venta, fecha=date(2024, 3, 1), hora=time(9), producto_nombre='Caramelo',
+                 cantidad=1, precio_unitario=total, total_venta=total, id_terminal=terminal)
+
+
+class DineroTests(PruebaBD):
+    def test_helpers_round_half_up_in_cents(self):
+        self.assertEqual(dinero.a_centavos(0.1 + 0.2), 30)
+        self.assertEqual(dinero.a_centavos('1.005'), 101)
+        self.assertEqual(dinero.a_pesos(1050), 10.5)
+        self.assertEqual(dinero.porcentaje(150, 21), 32)
+        self.assertEqual(dinero.sumar([0.1] * 10), 1.0)
+
+    def test_amounts_are_stored_as_integer_cents_and_summed_exactly(self):
+        db.session.add_all([venta(i, 0.1) for i in range(1, 11)])
+        db.session.add(Producto(nombre='Pan', precio_venta=10.5))
+        db.session.commit()
+        crudo = db.session.execute(text('SELECT precio_venta FROM productos')).scalar()
+        self.assertEqual((crudo, type(crudo)), (1050, int))
+        self.assertEqual(Producto.query.one().precio_venta, 10.5)
+
+        reports.invalidar_cache()
+        self.assertEqual(reports.ingresos_por_terminal()[0]['ingresos'], 1.0)
+        self.assertEqual(db.session.query(db.func.sum(Venta.total_venta)).scalar(), 1.0)
+        self.assertEqual(pocopan_app._calcular_dashboard('TODAS')['stats']['ingresos_totales_valor'], 1.0)
+
+    def test_cart_and_checkout_use_configured_vat_in_cents(self):
+        carrito = [{'precio': 0.1, 'cantidad': 3, 'subtotal': 0.3}, {'precio': 1.2, 'cantidad': 1, 'subtotal': 1.2}]
+        self.assertEqual(calculate_totals(carrito), {
+            'subtotal': 1.5, 'iva': 0.32, 'total': 1.82, 'porcentaje_iva': 21.0
+        })
+
+        db.session.add_all([Producto(nombre='Caramelo', precio_venta=0.1), Contador(terminal='POS1')])
+        db.session.commit()
+        client = self.cliente('pos1')
+        client.post('/agregar-carrito', json={'producto_id': Producto.query.one().id, 'cantidad': 3})
+        with mock.patch.dict(pocopan_app.CONFIG, {'iva': 10.5}):
+            resumen = client.post('/finalizar-venta').get_json()['resumen']
+        self.assertEqual(resumen['totales'], {'subtotal': 0.3, 'iva': 0.03, 'total': 0.33})
+        self.assertEqual(Venta.query.one().total_venta, 0.3)
+
+    def test_sale_event_amount_is_summed_in_cents(self):
+        evento = pocopan_app._evento_venta('POS1', 1, 'CLIENTE-POS1-0001', None, [('Caramelo', 1, 0.1)] * 3 + [('Pan', 1, 1.005)])
+        self.assertEqual(evento['monto'], 1.31)
+
+    def test_price_adjustment_scales_cents(self):
+        crear_productos(1, precio_venta=9.99)
+        respuesta = self.cliente().post('/catalogo/lote', json={'operaciones': [
+            {'accion': 'ajuste_precio', 'porcentaje': 10, 'categoria': 'Panadería'}
+        ]})
+        self.assertTrue(respuesta.get_json()['success'])
+        db.session.expire_all()
+        self.assertEqual(Producto.query.one().precio_venta, 10.99)
+
+
+class MigracionCentavosTests(PruebaArchivoBD):
+    """La migración inspecciona el esquema con conexiones propias: usa la base en archivo."""
+
+    crear_esquema = False
+
+    def test_legacy_float_columns_are_converted_once(self):
+        legado = MetaData()
+        Table('productos', legado, Column('id', Integer, primary_key=True),
+              Column('nombre', String(255)), Column('precio_venta', Float))
+        legado.create_all(db.engine)
+        with db.engine.begin() as conn:
+            conn.execute(text("INSERT INTO productos (nombre, precio_venta) VALUES ('Pan', 10.5)"))
+        db.create_all()
+        pocopan_app._migrar_esquema()
+
+        self.assertEqual(pocopan_app._migrar_centavos(), ['productos.precio_venta'])
+        self.assertEqual(pocopan_app._migrar_centavos(), [])
+        self.assertEqual(db.session.execute(text('SELECT precio_venta FROM productos')).scalar(), 1050)
+        self.assertEqual(Producto.query.one().precio_venta, 10.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
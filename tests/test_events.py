@@ -0,0 +1,141 @@
+import json
+import unittest
+from datetime import date
+from unittest import mock
+
+from sqlalchemy import text
+
+from soporte import PruebaBD
+
+import app as pocopan_app
+import events
+import serializacion
+from app import app, db, Producto, Contador
+
+
+class EventBusTests(unittest.TestCase):
+    def test_publish_skips_recent_duplicate_keys(self):
+        bus = events.EventBus()
+        cola = bus.subscribe('ventas')
+        self.assertTrue(bus.publish('ventas', {'tipo': 'venta', 'id_venta': 1}, 'venta:POS1:1'))
+        self.assertFalse(bus.publish('ventas', {'tipo': 'venta', 'id_venta': 1}, 'venta:POS1:1'))
+        self.assertEqual(cola.qsize(), 1)
+        bus.unsubscribe('ventas', cola)
+        self.assertEqual(bus.subscriber_count('ventas'), 0)
+
+    def test_sse_stream_filters_and_formats_events(self):
+        bus = events.EventBus()
+        stream = events.sse_stream(bus, 'ventas', lambda e: e['terminal'] == 'POS2', keepalive=0.01)
+        self.assertEqual(next(stream), 'retry: 5000\n\n')
+        bus.publish('ventas', {'tipo': 'venta', 'terminal': 'POS1'})
+        bus.publish('ventas', {'tipo': 'venta', 'terminal': 'POS2'})
+        mensaje = next(stream)
+        self.assertTrue(mensaje.startswith('event: venta\ndata: '))
+        self.assertEqual(json.loads(mensaje.split('data: ', 1)[1])['terminal'], 'POS2')
+        self.assertEqual(next(stream), ': keepalive\n\n')
+        stream.close()
+        self.assertEqual(bus.subscriber_count(), 0)
+
+    def test_streams_over_the_cap_only_catch_up_and_close(self):
+        bus = events.EventBus()
+        bus.max_streams = 1
+        en_vivo = events.sse_stream(bus, 'catalogo', keepalive=0.01)
+        self.assertEqual(next(en_vivo), 'retry: 5000\n\n')
+        extra = events.sse_stream(bus, 'catalogo', previos=lambda: [{'tipo': 'catalogo', 'version': 3}])
+        self.assertEqual(next(extra), 'retry: 5000\n\n')
+        self.assertTrue(next(extra).startswith('id: 3\n'))
+        self.assertEqual(list(extra), [])
+        self.assertEqual(next(en_vivo), ': keepalive\n\n')
+        self.assertEqual(bus.streams_abiertos(), 1)
+        en_vivo.close()
+        self.assertEqual((bus.streams_abiertos(), bus.subscriber_count()), (0, 0))
+
+
+class VentaEventosTests(PruebaBD):
+    def setUp(self):
+        super().setUp()
+        db.session.add_all([
+            Producto(nombre='Pan', categoria='Panadería', precio_venta=10),
+            Contador(terminal='POS1'),
+        ])
+        db.session.commit()
+        self.client = self.cliente('pos1')
+
+    def test_finalizar_venta_publishes_ticket_with_running_totals(self):
+        with mock.patch.object(events, 'bus', events.EventBus()):
+            cola = events.bus.subscribe('ventas')
+            self.client.post('/agregar-carrito', json={'producto': 'Pan', 'cantidad': 3})
+            self.client.post('/finalizar-venta')
+            evento = cola.get_nowait()
+        self.assertEqual(evento['terminal'], 'POS1')
+        self.assertEqual(evento['monto'], 30.0)
+        self.assertEqual(evento['totales_hoy']['POS1'], {'tickets': 1, 'ingresos': 30.0})
+        self.assertEqual(evento['totales_hoy']['TODAS']['tickets'], 1)
+
+    def test_poll_ventas_reports_new_tickets_once(self):
+        estado, eventos = pocopan_app._poll_ventas(None)
+        self.assertEqual(eventos, [])
+        self.client.post('/agregar-carrito', json={'producto': 'Pan', 'cantidad': 1})
+        self.client.post('/agregar-carrito', json={'producto': 'Pan', 'cantidad': 2})
+        self.client.post('/finalizar-venta')
+        estado, eventos = pocopan_app._poll_ventas(estado)
+        self.assertEqual(len(eventos), 1)
+        self.assertEqual(eventos[0][1], 'venta:POS1:1')
+        self.assertEqual(len(eventos[0][0]['productos']), 2)
+        self.assertEqual(pocopan_app._poll_ventas(estado)[1], [])
+
+    def test_poll_batch_computes_day_totals_once_by_index(self):
+        estado = pocopan_app._poll_ventas(None)[0]
+        for _ in range(3):
+            self.client.post('/agregar-carrito', json={'producto': 'Pan', 'cantidad': 1})
+            self.client.post('/finalizar-venta')
+        with mock.patch.object(pocopan_app, '_totales_hoy', wraps=pocopan_app._totales_hoy) as totales:
+            eventos = pocopan_app._poll_ventas(estado)[1]
+        self.assertEqual(totales.call_count, 1)
+        self.assertEqual(eventos[-1][0]['totales_hoy']['POS1'], {'tickets': 3, 'ingresos': 30.0})
+        plan = ' '.join(str(fila[-1]) for fila in db.session.execute(
+            text('EXPLAIN QUERY PLAN SELECT id_terminal, SUM(total_venta) FROM ventas WHERE fecha = :hoy GROUP BY id_terminal'),
+            {'hoy': date.today()}
+        ))
+        self.assertIn('ix_ventas_fecha_terminal', plan)
+
+    def test_large_ticket_is_notified_by_key_and_rebuilt_by_listener(self):
+        avisos = []
+
+        def pg_notify(canal, payload):
+            # Mismo límite que PostgreSQL
+            if len(payload.encode('utf-8')) >= 8000:
+                raise ValueError('payload string too long')
+            avisos.append(payload)
+            return None
+
+        sqlite = self.conexion.connection.driver_connection
+        sqlite.create_function('pg_notify', 2, pg_notify)
+        self.addCleanup(sqlite.create_function, 'pg_notify', 2, None)
+        db.session.add_all([Producto(nombre=f'Producto con un nombre bastante largo {i:03d}', precio_venta=1)
+                            for i in range(150)])
+        db.session.commit()
+        with self.client.session_transaction() as sesion:
+            sesion['carrito_pos1'] = [
+                {'producto_id': p.id, 'producto': p.nombre, 'precio': 1.0, 'cantidad': 1, 'subtotal': 1.0}
+                for p in Producto.query.filter(Producto.nombre != 'Pan')
+            ]
+
+        bus = events.EventBus()
+        bus.configure(app, backend='postgres')
+        bus.add_loader('ventas', pocopan_app._cargar_evento_venta)
+        with mock.patch.object(events, 'bus', bus):
+            self.assertTrue(self.client.post('/finalizar-venta').get_json()['success'])
+        self.assertEqual(serializacion.loads(avisos[-1]), {'canal': 'ventas', 'clave': 'venta:POS1:1'})
+
+        receptor = events.EventBus()
+        receptor.configure(app)
+        receptor.add_loader('ventas', pocopan_app._cargar_evento_venta)
+        cola = receptor.subscribe('ventas')
+        self.assertTrue(receptor._recibir(avisos[-1]))
+        evento = cola.get_nowait()
+        self.assertEqual((evento['id_venta'], evento['monto'], len(evento['productos'])), (1, 150.0, 150))
+
+
+if __name__ == '__main__':
+    unittest.main()
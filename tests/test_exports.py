@@ -0,0 +1,63 @@
+import csv
+import io
+import unittest
+from datetime import date, time
+
+from soporte import PruebaBD
+
+from app import db, Venta
+
+
+def _venta(id_venta, fecha, terminal, total):
+    return Venta(
+        id_venta=id_venta,
+        fecha=fecha,
+        hora=time(10, 0),
+        id_cliente=f'CLIENTE-{terminal}-{id_venta:04d}',
+        producto_nombre='Prod A',
+        cantidad=1,
+        precio_unitario=total,
+        total_venta=total,
+        vendedor=f'POS {terminal}',
+        id_terminal=terminal,
+    )
+
+
+class ExportVentasTests(PruebaBD):
+    def setUp(self):
+        super().setUp()
+        db.session.add_all([
+            _venta(1, date(2024, 1, 1), 'POS1', 10),
+            _venta(2, date(2024, 1, 15), 'POS1', 20),
+            _venta(1, date(2024, 1, 15), 'POS2', 30),
+            _venta(3, date(2024, 2, 1), 'POS1', 40),
+        ])
+        db.session.commit()
+        self.client = self.cliente()
+
+    def test_csv_export_filters_by_range_and_terminal(self):
+        response = self.client.get('/exportar-ventas?desde=2024-01-01&hasta=2024-01-31&terminal=POS1')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_streamed)
+        rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+        self.assertEqual([r['ID_Venta'] for r in rows], ['1', '2'])
+        self.assertEqual({r['ID_Terminal'] for r in rows}, {'POS1'})
+
+    def test_xlsx_export_uses_sales_headers(self):
+        from openpyxl import load_workbook
+
+        response = self.client.get('/exportar-ventas?formato=xlsx')
+        self.assertEqual(response.status_code, 200)
+        sheet = load_workbook(io.BytesIO(response.get_data())).active
+        rows = list(sheet.iter_rows(values_only=True))
+        self.assertEqual(rows[0][0], 'ID_Venta')
+        self.assertEqual(len(rows), 5)
+
+    def test_export_rejects_unknown_format_and_non_admin(self):
+        self.assertEqual(self.client.get('/exportar-ventas?formato=pdf').status_code, 400)
+        other = self.cliente('pos1')
+        self.assertEqual(other.get('/exportar-ventas').status_code, 302)
+
+
+if __name__ == '__main__':
+    unittest.main()
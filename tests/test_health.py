@@ -0,0 +1,67 @@
+import unittest
+from unittest import mock
+
+from soporte import PruebaBD, PruebaArchivoBD
+
+import app as pocopan_app
+import health
+from app import app, db, Producto, Venta, Contador
+
+
+class DiagnosticoTests(PruebaBD):
+    def setUp(self):
+        super().setUp()
+        db.session.add_all([
+            Producto(nombre='Pan', categoria='Panadería', precio_venta=10),
+            Producto(nombre='Leche', categoria='Lácteos', precio_venta=5),
+            Contador(terminal='POS1', total_ventas=4),
+            Contador(terminal='TODAS', total_ventas=4),
+        ])
+        db.session.commit()
+        pocopan_app.diagnostico_cache.clear()
+        self.client = app.test_client()
+
+    def test_liveness_uses_estimates_instead_of_counting_tables(self):
+        with mock.patch.object(Venta, 'query') as query:
+            data = self.client.get('/diagnostico').get_json()
+            query.count.assert_not_called()
+        self.assertEqual(data['status'], 'OK')
+        self.assertEqual(data['productos'], 2)
+        self.assertEqual(data['ventas_registradas'], 0)
+        self.assertEqual(data['tickets'], 4)
+
+    def test_liveness_counters_are_cached(self):
+        self.client.get('/diagnostico')
+        db.session.add(Producto(nombre='Café', precio_venta=7))
+        db.session.commit()
+        self.assertEqual(self.client.get('/diagnostico').get_json()['productos'], 2)
+
+
+class DiagnosticoDetalleTests(PruebaArchivoBD):
+    """El detalle inspecciona el esquema y el pool reales: usa la base en archivo."""
+
+    def setUp(self):
+        super().setUp()
+        pocopan_app.diagnostico_cache.clear()
+
+    def test_detailed_report_requires_admin_and_is_cached(self):
+        self.assertEqual(app.test_client().get('/diagnostico/detalle').status_code, 302)
+        admin = self.cliente()
+        health.registrar_importacion('catalogo', 0.25, {'created': 2, 'updated': 0})
+        with mock.patch.object(
+            pocopan_app, '_diagnostico_detallado', wraps=pocopan_app._diagnostico_detallado
+        ) as detallar:
+            response = admin.get('/diagnostico/detalle')
+            admin.get('/diagnostico/detalle')
+            self.assertEqual(detallar.call_count, 1)
+        data = response.get_json()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(data['esquema']['ok'])
+        self.assertIn('estado', data['pool'])
+        self.assertEqual(data['importaciones']['catalogo']['duracion_ms'], 250.0)
+        self.assertIn('hits', data['cache']['dashboard'])
+        self.assertIn('arranque_ms', data)
+
+
+if __name__ == '__main__':
+    unittest.main()
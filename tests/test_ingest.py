@@ -0,0 +1,96 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from soporte import PruebaBD
+
+import ingest
+from app import db, Producto, Venta
+
+
+def fila(id_venta, terminal, producto='Pan', cantidad=1, cliente=''):
+    return {
+        'ID_Venta': id_venta, 'Fecha': '2024-02-01', 'Hora': '09:30', 'ID_Cliente': cliente,
+        'Producto': producto, 'Cantidad': cantidad, 'Precio_Unitario': 10, 'ID_Terminal': terminal,
+    }
+
+
+class IngestaTests(PruebaBD):
+    def setUp(self):
+        super().setUp()
+        db.session.add(Producto(nombre='Pan', precio_venta=10))
+        db.session.commit()
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+        super().tearDown()
+
+    def escribir(self, nombre, filas):
+        ruta = os.path.join(self.temp_dir.name, nombre)
+        df = pd.DataFrame(filas)
+        if nombre.endswith('.csv'):
+            df.to_csv(ruta, index=False)
+        else:
+            df.to_excel(ruta, index=False)
+        return ruta
+
+    def test_expandir_rutas_accepts_directories_and_globs(self):
+        self.escribir('POS1_2024-01.xlsx', [fila(1, 'POS1')])
+        self.escribir('POS2_2024-01.csv', [fila(1, 'POS2')])
+        open(os.path.join(self.temp_dir.name, 'notas.txt'), 'w').close()
+        self.assertEqual(len(ingest.expandir_rutas([self.temp_dir.name])), 2)
+        self.assertEqual(len(ingest.expandir_rutas([os.path.join(self.temp_dir.name, 'POS1_*')])), 1)
+
+    def test_parallel_ingestion_keeps_ticket_dedupe_semantics(self):
+        db.session.add(Venta(id_venta=5, id_terminal='POS1', producto_nombre='Pan', cantidad=1, id_cliente='CLIENTE-POS1-0009'))
+        db.session.commit()
+        rutas = [
+            self.escribir('POS1_2024-02.xlsx', [fila(5, 'POS1', cantidad=4), fila(6, 'POS1'), fila(6, 'POS1', cantidad=2)]),
+            self.escribir('POS2_2024-02.csv', [fila(None, 'POS2'), fila(None, 'POS2'), fila(1, 'POS2', producto='')]),
+            self.escribir('POS3_2024-02.xlsx', [fila(1, 'POS3', cliente='CLIENTE-POS3-0001')]),
+        ]
+        reporte = ingest.ingerir(rutas, procesos=2, tamano=2)
+
+        self.assertEqual((reporte['created'], reporte['updated']), (4, 2))
+        por_archivo = {os.path.basename(a['archivo']): a for a in reporte['archivos']}
+        self.assertEqual(por_archivo['POS2_2024-02.csv']['filas'], 3)
+        self.assertEqual(por_archivo['POS2_2024-02.csv']['validas'], 2)
+        self.assertIsNotNone(por_archivo['POS1_2024-02.xlsx']['filas_por_s'])
+
+        self.assertEqual(Venta.query.count(), 5)
+        existente = Venta.query.filter_by(id_venta=5, id_terminal='POS1').one()
+        self.assertEqual((existente.cantidad, existente.id_cliente), (4, 'CLIENTE-POS1-0009'))
+        self.assertEqual(Venta.query.filter_by(id_venta=6, id_terminal='POS1').one().cantidad, 2)
+        pos2 = sorted(v.id_venta for v in Venta.query.filter_by(id_terminal='POS2'))
+        self.assertEqual(len(set(pos2)), 2)
+        self.assertTrue(all(i > 5 for i in pos2))
+        self.assertEqual({v.producto_id for v in Venta.query.filter(Venta.id_venta != 5)}, {1})
+
+    def test_serial_ingestion_writes_each_batch_before_reading_the_next(self):
+        ruta = self.escribir('POS1_2024-03.csv', [fila(i, 'POS1') for i in range(1, 7)])
+        lotes_pendientes = []
+        lotes_originales = ingest.readers.iter_lotes
+        escribir_original = ingest.EscritorVentas.escribir
+
+        def iter_lotes(ruta, tamano):
+            for lote in lotes_originales(ruta, tamano):
+                lotes_pendientes.append(lote)
+                yield lote
+
+        def escribir(escritor, filas):
+            lotes_pendientes.pop()
+            self.assertEqual(lotes_pendientes, [])
+            return escribir_original(escritor, filas)
+
+        with mock.patch.object(ingest.readers, 'iter_lotes', iter_lotes), \
+                mock.patch.object(ingest.EscritorVentas, 'escribir', escribir):
+            reporte = ingest.ingerir([ruta], tamano=2)
+        self.assertEqual(reporte['created'], 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,56 +1,36 @@
 import os
 import unittest
 import tempfile
+from contextlib import ExitStack
 from datetime import date, time
+from unittest import mock
 
-import pandas as pd
+from jinja2 import FileSystemBytecodeCache
 
-test_db_path = os.path.abspath(os.path.join(os.path.dirname(__file__), 'test_unit.db'))
-os.environ['DATABASE_URL'] = f'sqlite:///{test_db_path}'
+from soporte import PruebaBD, PruebaArchivoBD, planilla_en_memoria, csv_bytes
 
 import app as pocopan_app
+import health
 from app import (
     app,
     db,
     Producto,
     Venta,
     Contador,
+    CatalogoCambio,
     seed_catalog_from_excel,
     seed_sales_from_excel,
     refresh_contadores,
 )
 
 
-class InitDbTests(unittest.TestCase):
+class SeedTests(PruebaBD):
     def setUp(self):
-        self.ctx = app.app_context()
-        self.ctx.push()
-        db.drop_all()
-        db.create_all()
-        self.temp_dir = tempfile.TemporaryDirectory()
-        self.catalog_path = os.path.join(self.temp_dir.name, 'catalogo.xlsx')
-        self.sales_path = os.path.join(self.temp_dir.name, 'ventas.xlsx')
-        self.prev_catalog = pocopan_app.CATALOGO_XLSX
-        self.prev_sales = pocopan_app.VENTAS_XLSX
-        pocopan_app.CATALOGO_XLSX = self.catalog_path
-        pocopan_app.VENTAS_XLSX = self.sales_path
-
-    def tearDown(self):
-        db.session.remove()
-        db.drop_all()
-        db.engine.dispose()
-        self.ctx.pop()
-        pocopan_app.CATALOGO_XLSX = self.prev_catalog
-        pocopan_app.VENTAS_XLSX = self.prev_sales
-        self.temp_dir.cleanup()
-        if os.path.exists(test_db_path):
-            os.remove(test_db_path)
-
-    def write_catalog(self, rows):
-        pd.DataFrame(rows).to_excel(self.catalog_path, index=False)
-
-    def write_sales(self, rows):
-        pd.DataFrame(rows).to_excel(self.sales_path, index=False)
+        super().setUp()
+        planillas = ExitStack()
+        self.addCleanup(planillas.close)
+        self.write_catalog = planillas.enter_context(planilla_en_memoria([], pocopan_app.CATALOGO_XLSX))
+        self.write_sales = planillas.enter_context(planilla_en_memoria([], pocopan_app.VENTAS_XLSX))
 
     def test_seed_catalog_creates_and_updates_products(self):
         self.write_catalog([
@@ -77,6 +57,91 @@ class InitDbTests(unittest.TestCase):
         self.assertEqual(prod_a.precio_venta, 120)
         self.assertEqual(prod_b.precio_venta, 250)
 
+    def test_seed_catalog_only_touches_changed_rows(self):
+        self.write_catalog([
+            {'Nombre': 'Prod A', 'Categoria': 'Cat 1', 'SubCAT': 'Sub', 'Precio Venta': 100},
+            {'Nombre': 'Prod B', 'Categoria': 'Cat 2', 'SubCAT': 'Otro', 'Precio Venta': 200},
+        ])
+        seed_catalog_from_excel()
+        version = CatalogoCambio.query.count()
+
+        self.write_catalog([
+            {'Nombre': 'Prod A', 'Categoria': 'Cat 1', 'SubCAT': 'Sub', 'Precio Venta': 100},
+            {'Nombre': 'Prod B', 'Categoria': 'Cat 2', 'SubCAT': 'Otro', 'Precio Venta': 210},
+        ])
+        result = seed_catalog_from_excel()
+        self.assertEqual((result['updated'], result['unchanged']), (1, 1))
+        self.assertEqual(result['detalle']['modificados'], [
+            {'nombre': 'Prod B', 'cambios': {'precio_venta': [200.0, 210.0]}}
+        ])
+        self.assertEqual(CatalogoCambio.query.count(), version + 1)
+
+        result = seed_catalog_from_excel()
+        self.assertEqual((result['updated'], result['unchanged']), (0, 2))
+        self.assertEqual(CatalogoCambio.query.count(), version + 1)
+
+    def test_seed_catalog_half_cent_price_is_unchanged_on_reimport(self):
+        self.write_catalog([{'Nombre': 'Chicle', 'Categoria': 'Kiosco', 'SubCAT': '', 'Precio Venta': 1.005}])
+        seed_catalog_from_excel()
+        self.assertEqual(Producto.query.one().precio_venta, 1.01)
+        version = CatalogoCambio.query.count()
+
+        result = seed_catalog_from_excel()
+        self.assertEqual((result['updated'], result['unchanged']), (0, 1))
+        self.assertEqual(result['detalle']['modificados'], [])
+        self.assertEqual(CatalogoCambio.query.count(), version)
+
+    def test_seed_catalog_dry_run_and_retire_missing(self):
+        self.write_catalog([
+            {'Nombre': 'Prod A', 'Categoria': 'Cat 1', 'SubCAT': 'Sub', 'Precio Venta': 100},
+            {'Nombre': 'Prod B', 'Categoria': 'Cat 2', 'SubCAT': 'Otro', 'Precio Venta': 200},
+        ])
+        seed_catalog_from_excel()
+        db.session.add(Producto(nombre='Manual', precio_venta=5, proveedor='Kiosco'))
+        db.session.commit()
+
+        self.write_catalog([
+            {'Nombre': 'Prod A', 'Categoria': 'Cat 1', 'SubCAT': 'Sub', 'Precio Venta': 150},
+            {'Nombre': 'Prod C', 'Categoria': 'Cat 3', 'SubCAT': '', 'Precio Venta': 300},
+        ])
+        preview = seed_catalog_from_excel(retirar_faltantes=True, dry_run=True)
+        self.assertEqual(preview['detalle']['altas'], ['Prod C'])
+        self.assertEqual(preview['detalle']['retirados'], ['Prod B'])
+        self.assertEqual(Producto.query.filter_by(nombre='Prod A').first().precio_venta, 100)
+        self.assertIsNone(Producto.query.filter_by(nombre='Prod C').first())
+
+        result = seed_catalog_from_excel(retirar_faltantes=True)
+        self.assertEqual(
+            (result['created'], result['updated'], result['retired']), (1, 1, 1)
+        )
+        self.assertEqual(Producto.query.filter_by(nombre='Prod B').first().estado, 'No Disponible')
+        self.assertEqual(Producto.query.filter_by(nombre='Manual').first().estado, 'Disponible')
+
+    def test_retire_missing_does_not_reactivate_sold_out_products(self):
+        db.session.add_all([
+            Producto(nombre='Agotado', precio_venta=10, proveedor='Catálogo', estado='Agotado', stock=0),
+            Producto(nombre='Sin stock', precio_venta=10, proveedor='Catálogo', estado='No Disponible', stock=0),
+            Producto(nombre='Retirado', precio_venta=10, proveedor='Catálogo', estado='No Disponible', stock=4),
+        ])
+        db.session.commit()
+        self.write_catalog([{'Nombre': nombre, 'Precio Venta': 10} for nombre in ('Agotado', 'Sin stock', 'Retirado')])
+
+        result = seed_catalog_from_excel(retirar_faltantes=True)
+        self.assertEqual((result['updated'], result['unchanged']), (1, 2))
+        estados = {p.nombre: p.estado for p in Producto.query}
+        self.assertEqual(estados, {'Agotado': 'Agotado', 'Sin stock': 'No Disponible', 'Retirado': 'Disponible'})
+
+    def test_importar_catalogo_endpoint_previews_upload(self):
+        client = self.cliente()
+        archivo = csv_bytes([
+            {'Nombre': 'Prod A', 'Categoria': 'Cat 1', 'SubCAT': 'Sub', 'Precio Venta': 100},
+        ])
+        response = client.post('/importar-catalogo', data={'dry_run': 'true', 'archivo': (archivo, 'c.csv')})
+        data = response.get_json()
+        self.assertTrue(data['success'])
+        self.assertEqual(data['resultado']['created'], 1)
+        self.assertEqual(Producto.query.count(), 0)
+
     def test_seed_sales_creates_and_updates_records(self):
         self.write_catalog([
             {'Nombre': 'Prod A', 'Categoria': 'Cat 1', 'SubCAT': 'Sub', 'Precio Venta': 100},
@@ -204,5 +269,26 @@ class InitDbTests(unittest.TestCase):
         self.assertEqual(all_terminals.ultimo_cliente, 10)
 
 
+class InitDbTests(PruebaArchivoBD):
+    """`init_db` crea y migra el esquema con conexiones propias: usa la base en archivo."""
+
+    def test_init_db_precompiles_templates_and_reports_startup_timing(self):
+        with tempfile.TemporaryDirectory() as cache_dir, \
+                planilla_en_memoria([{'Producto': 'Prod A', 'Categoria': 'Cat', 'Precio_Venta': 10}],
+                                    pocopan_app.CATALOGO_XLSX), \
+                planilla_en_memoria([], pocopan_app.VENTAS_XLSX):
+            bytecode_cache = FileSystemBytecodeCache(cache_dir, pattern='pocopan_%s.cache')
+            with mock.patch.dict(app.config, {'PLANTILLAS_PRECOMPILAR': True}), \
+                    mock.patch.object(app.jinja_env, 'bytecode_cache', bytecode_cache), \
+                    mock.patch.object(app.jinja_env, 'cache', {}):
+                pocopan_app.init_db()
+                self.assertTrue(os.listdir(cache_dir))
+        arranque = health.arranque()
+        self.assertEqual(
+            set(arranque), {'esquema', 'catalogo', 'ventas', 'contadores', 'plantillas', 'total'}
+        )
+        self.assertFalse(app.jinja_env.auto_reload)
+
+
 if __name__ == '__main__':
     unittest.main()
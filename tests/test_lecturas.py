@@ -0,0 +1,55 @@
+import unittest
+
+from soporte import PruebaBD
+
+import lecturas
+from app import db, Producto, Contador
+
+
+class LecturasTests(PruebaBD):
+    def setUp(self):
+        super().setUp()
+        db.session.add_all([
+            Producto(nombre='Pan', categoria='Panadería', precio_venta=10, stock=4),
+            Producto(nombre='Café', categoria='Bebidas', precio_venta=6),
+            Producto(nombre='Factura', categoria='Panadería', precio_venta=3),
+            Producto(nombre='Torta', categoria='Pastelería', precio_venta=50, estado='No Disponible'),
+            Contador(terminal='POS1'),
+        ])
+        db.session.commit()
+        self.client = self.cliente('pos1')
+
+    def test_read_models_select_only_listed_fields(self):
+        filas = lecturas.productos_pos()
+        self.assertEqual([f.nombre for f in filas], ['Pan', 'Café', 'Factura'])
+        self.assertIsInstance(filas[0], lecturas.ProductoPOS)
+        self.assertEqual(lecturas.categorias(filas), ['Panadería', 'Bebidas'])
+        editor = lecturas.productos_editor()
+        self.assertEqual(len(editor), 4)
+        self.assertEqual(editor[0]._asdict()['stock'], 4)
+        self.assertEqual(lecturas.nombres_disponibles('a', limite=2), ['Café', 'Factura'])
+
+    def test_listing_endpoint_shares_the_read_model(self):
+        data = self.client.get('/productos').get_json()
+        self.assertEqual(set(data['productos'][0]), set(lecturas.ProductoPOS._fields))
+        self.assertEqual(len(data['productos']), 3)
+        self.assertEqual(self.client.get('/productos?vista=editor').status_code, 403)
+
+        admin = self.cliente('admin')
+        editor = admin.get('/productos?vista=editor').get_json()['productos']
+        self.assertEqual(len(editor), 4)
+
+    def test_pages_render_from_rows(self):
+        html = self.client.get('/punto-venta').get_data(as_text=True)
+        self.assertIn('data-producto="Factura"', html)
+        self.assertNotIn('Torta', html)
+        self.assertEqual(html.count('<option value="Panadería">'), 1)
+
+        admin = self.cliente('admin')
+        html = admin.get('/editor-catalogo').get_data(as_text=True)
+        self.assertIn('Torta', html)
+        self.assertIn('<option value="Pastelería">', html)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import io
+import json
+import logging
+import os
+import unittest
+
+from soporte import PruebaBD
+
+import events
+import logs
+import trabajos
+from app import db, Producto, Contador
+
+
+class StructuredLoggingTests(PruebaBD):
+    def setUp(self):
+        super().setUp()
+        db.session.add_all([
+            Producto(nombre='Pan', categoria='Panadería', precio_venta=10),
+            Contador(terminal='POS1'),
+        ])
+        db.session.commit()
+        self.salida = io.StringIO()
+        logs.configurar_logging(formato='json', nivel='DEBUG', muestreo_debug=0.0, stream=self.salida)
+        self.client = self.cliente('pos1')
+
+    def tearDown(self):
+        logs.configurar_logging()
+        super().tearDown()
+
+    def _lineas(self):
+        logs.detener_logging()
+        return [json.loads(linea) for linea in self.salida.getvalue().splitlines()]
+
+    def test_json_lines_carry_request_context(self):
+        response = self.client.get('/obtener-producto/Inexistente', headers={'X-Request-ID': 'abc123'})
+        self.assertEqual(response.headers['X-Request-ID'], 'abc123')
+        lineas = [l for l in self._lineas() if l['logger'] == 'app']
+        self.assertEqual(len(lineas), 1)
+        self.assertEqual(lineas[0]['mensaje'], '❌ Producto no encontrado: Inexistente')
+        self.assertEqual(lineas[0]['request_id'], 'abc123')
+        self.assertEqual(lineas[0]['ruta'], 'obtener_producto')
+        self.assertEqual(lineas[0]['terminal'], 'POS1')
+        self.assertIn('duracion_ms', lineas[0])
+
+    def test_debug_lines_are_sampled_and_formatted_lazily(self):
+        class Caro:
+            formateado = False
+
+            def __str__(self):
+                Caro.formateado = True
+                return 'caro'
+
+        logging.getLogger('app').debug("valor %s", Caro())
+        self.client.get('/obtener-producto/Pan')
+        self.assertEqual([l for l in self._lineas() if l['nivel'] == 'DEBUG'], [])
+        self.assertFalse(Caro.formateado)
+
+
+
+class ForkTests(unittest.TestCase):
+    def tearDown(self):
+        logs.configurar_logging()
+
+    def test_forked_child_gets_its_own_listener_and_pools(self):
+        ruta = os.path.join(os.path.dirname(__file__), 'fork.log')
+        self.addCleanup(lambda: os.path.exists(ruta) and os.remove(ruta))
+        with open(ruta, 'w') as salida:
+            logs.configurar_logging(stream=salida)
+            logging.getLogger('padre').warning('antes del fork')
+            trabajos.runner._pool()
+            pid = os.fork()
+            if pid == 0:
+                codigo = 1
+                try:
+                    logging.getLogger('hijo').warning('desde el worker')
+                    logs.detener_logging()
+                    if trabajos.runner._executor is None and events.bus._listener is None:
+                        codigo = 0
+                finally:
+                    os._exit(codigo)
+            _, estado = os.waitpid(pid, 0)
+            logs.detener_logging()
+        with open(ruta) as salida:
+            lineas = salida.read().splitlines()
+        self.assertEqual(os.waitstatus_to_exitcode(estado), 0)
+        self.assertEqual(lineas.count('WARNING:hijo:desde el worker'), 1)
+        self.assertEqual(lineas.count('WARNING:padre:antes del fork'), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
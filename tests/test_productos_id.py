@@ -0,0 +1,67 @@
+import unittest
+
+from soporte import PruebaBD, PruebaArchivoBD
+
+import app as pocopan_app
+from sqlalchemy import text
+from app import app, db, Producto, Venta, Contador
+
+
+class ProductoIdTests(PruebaBD):
+    def setUp(self):
+        super().setUp()
+        db.session.add_all([
+            Producto(nombre='Pan Casero', categoria='Panadería', precio_venta=10),
+            Contador(terminal='POS1'),
+        ])
+        db.session.commit()
+        self.producto_id = Producto.query.one().id
+        self.client = self.cliente('pos1')
+
+    def test_product_lookup_by_id_supports_conditional_requests(self):
+        response = self.client.get(f'/productos/{self.producto_id}')
+        self.assertEqual(response.get_json()['producto']['nombre'], 'Pan Casero')
+        etag = response.headers['ETag']
+        again = self.client.get(f'/productos/{self.producto_id}', headers={'If-None-Match': etag})
+        self.assertEqual(again.status_code, 304)
+
+        admin = self.cliente()
+        admin.post('/actualizar-producto', json={
+            'producto_original': 'Pan Casero', 'nombre': 'Pan', 'precio_venta': 12
+        })
+        renamed = self.client.get(f'/productos/{self.producto_id}', headers={'If-None-Match': etag})
+        self.assertEqual(renamed.status_code, 200)
+        self.assertEqual(renamed.get_json()['producto']['nombre'], 'Pan')
+        self.assertEqual(self.client.get('/productos/999').status_code, 404)
+
+    def test_cart_and_sales_keep_product_id(self):
+        self.client.post('/agregar-carrito', json={'producto_id': self.producto_id, 'cantidad': 2})
+        data = self.client.post('/agregar-carrito', json={'producto': 'pan casero', 'cantidad': 1}).get_json()
+        self.assertEqual([i['producto_id'] for i in data['carrito']], [self.producto_id] * 2)
+        self.assertTrue(self.client.post('/finalizar-venta').get_json()['success'])
+        self.assertEqual({v.producto_id for v in Venta.query.all()}, {self.producto_id})
+
+    def test_name_endpoints_remain_as_shims(self):
+        data = self.client.get('/detalles-producto/Pan%20Casero').get_json()
+        self.assertEqual(data['producto']['id'], self.producto_id)
+        self.assertEqual(self.client.get('/obtener-producto/pan casero').get_json()['id'], self.producto_id)
+
+
+class MigracionProductoIdTests(PruebaArchivoBD):
+    """La migración inspecciona el esquema con conexiones propias: usa la base en archivo."""
+
+    def test_schema_migration_adds_and_backfills_product_id(self):
+        producto = Producto(nombre='Pan Casero', categoria='Panadería', precio_venta=10)
+        db.session.add_all([producto, Venta(id_venta=1, producto_nombre='PAN CASERO', cantidad=1, id_terminal='POS1')])
+        db.session.commit()
+        with db.engine.begin() as conn:
+            conn.execute(text('DROP INDEX ix_ventas_producto_id'))
+            conn.execute(text('ALTER TABLE ventas DROP COLUMN producto_id'))
+        self.assertEqual(pocopan_app._migrar_esquema(), ['ventas.producto_id'])
+        pocopan_app._completar_producto_id_ventas()
+        self.assertEqual(Venta.query.one().producto_id, producto.id)
+        self.assertEqual(pocopan_app._migrar_esquema(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
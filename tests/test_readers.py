@@ -0,0 +1,82 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from soporte import PruebaBD
+
+import app as pocopan_app
+import readers
+from app import app, db, Producto, Venta
+
+
+class ReadersTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def ruta(self, nombre):
+        return os.path.join(self.temp_dir.name, nombre)
+
+    def test_xlsx_rows_are_streamed_in_fixed_size_chunks(self):
+        pd.DataFrame({'Nombre': [f'P{i}' for i in range(5)], 'Precio Venta': range(5)}).to_excel(
+            self.ruta('c.xlsx'), index=False
+        )
+        lotes = list(readers.iter_lotes(self.ruta('c.xlsx'), tamano=2))
+        self.assertEqual([len(l) for l in lotes], [2, 2, 1])
+        self.assertEqual(lotes[2][0], {'Nombre': 'P4', 'Precio Venta': 4})
+
+    def test_csv_detects_semicolon_and_skips_blank_lines(self):
+        with open(self.ruta('c.csv'), 'w', encoding='utf-8-sig') as archivo:
+            archivo.write('Nombre;Precio Venta\nPan;10,5\n;\nLeche;5\n')
+        filas = list(readers.iter_filas(self.ruta('c.csv')))
+        self.assertEqual(filas, [{'Nombre': 'Pan', 'Precio Venta': '10,5'}, {'Nombre': 'Leche', 'Precio Venta': '5'}])
+
+    def test_missing_xlsx_falls_back_to_csv_and_rejects_other_formats(self):
+        open(self.ruta('ventas.csv'), 'w').close()
+        self.assertEqual(readers.ruta_existente(self.ruta('ventas.xlsx')), self.ruta('ventas.csv'))
+        self.assertIsNone(readers.ruta_existente(self.ruta('otro.xlsx')))
+        with self.assertRaises(readers.FormatoNoSoportado):
+            readers.iter_filas(self.ruta('ventas.xls'))
+
+
+class ImportacionPorLotesTests(PruebaBD):
+    def setUp(self):
+        super().setUp()
+        db.session.add(Producto(nombre='Pan', precio_venta=10, proveedor='Catálogo'))
+        db.session.commit()
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+        super().tearDown()
+
+    def test_sales_csv_import_matches_tickets_across_chunks(self):
+        ruta = os.path.join(self.temp_dir.name, 'ventas.csv')
+        with open(ruta, 'w', encoding='utf-8') as archivo:
+            archivo.write('ID_Venta,Fecha,Hora,Producto,Cantidad,Precio_Unitario,ID_Terminal\n')
+            archivo.write('7,2024-01-01 00:00:00,10:00,Pan,1,10,POS1\n')
+            archivo.write(',2024-01-02,11:00,Pan,2,10,POS2\n')
+            archivo.write('7,2024-01-03,12:00,pan,3,10,POS1\n')
+        with mock.patch.dict(app.config, {'IMPORTACION_LOTE': 1}):
+            result = pocopan_app.seed_sales_from_excel(ruta=ruta)
+        self.assertEqual((result['created'], result['updated']), (2, 1))
+        venta = Venta.query.filter_by(id_venta=7, id_terminal='POS1').one()
+        self.assertEqual((venta.cantidad, str(venta.fecha)), (3, '2024-01-03'))
+        self.assertEqual({v.producto_id for v in Venta.query.all()}, {1})
+
+    def test_empty_catalog_sheet_does_not_retire_products(self):
+        ruta = os.path.join(self.temp_dir.name, 'catalogo.csv')
+        with open(ruta, 'w', encoding='utf-8') as archivo:
+            archivo.write('Nombre,Precio Venta\n')
+        result = pocopan_app.seed_catalog_from_excel(retirar_faltantes=True, ruta=ruta)
+        self.assertEqual(result['retired'], 0)
+        self.assertEqual(Producto.query.one().estado, 'Disponible')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+from datetime import date, time
+
+from soporte import PruebaBD
+
+import reports
+from app import db, Producto, Venta
+from models import VersionDatos
+
+
+def _linea(id_venta, fecha, terminal, producto, cantidad, precio):
+    return Venta(
+        id_venta=id_venta,
+        fecha=fecha,
+        hora=time(12, 0),
+        id_cliente=f'CLIENTE-{terminal}-{id_venta:04d}',
+        producto_nombre=producto,
+        cantidad=cantidad,
+        precio_unitario=precio,
+        total_venta=cantidad * precio,
+        vendedor=f'POS {terminal}',
+        id_terminal=terminal,
+    )
+
+
+class ReportesTests(PruebaBD):
+    def setUp(self):
+        super().setUp()
+        reports.invalidar_cache()
+        db.session.add_all([
+            Producto(nombre='Pan', categoria='Panadería', precio_venta=10),
+            Producto(nombre='Leche', categoria='Lácteos', precio_venta=5),
+            _linea(1, date(2024, 1, 1), 'POS1', 'Pan', 2, 10),
+            _linea(1, date(2024, 1, 1), 'POS1', 'Leche', 1, 5),
+            _linea(1, date(2024, 1, 3), 'POS2', 'Pan', 1, 10),
+            _linea(2, date(2024, 2, 10), 'POS1', 'Leche', 4, 5),
+        ])
+        db.session.commit()
+        self.client = self.cliente()
+
+    def test_ingresos_por_mes_y_semana(self):
+        meses = reports.ingresos_por_periodo(agrupacion='mes')
+        self.assertEqual(meses, [
+            {'periodo': '2024-01-01', 'ingresos': 35.0, 'tickets': 2, 'unidades': 4},
+            {'periodo': '2024-02-01', 'ingresos': 20.0, 'tickets': 1, 'unidades': 4},
+        ])
+        semanas = reports.ingresos_por_periodo(terminal='POS1', agrupacion='semana')
+        self.assertEqual([s['periodo'] for s in semanas], ['2024-01-01', '2024-02-05'])
+
+    def test_categorias_y_top_productos_paginado(self):
+        categorias = reports.ingresos_por_categoria(desde=date(2024, 1, 1), hasta=date(2024, 1, 31))
+        self.assertEqual(categorias[0], {'categoria': 'Panadería', 'ingresos': 30.0, 'unidades': 3})
+
+        pagina = reports.top_productos(orden='cantidad', limite=1, pagina=2)
+        self.assertEqual(pagina['total'], 2)
+        self.assertEqual(pagina['paginas'], 2)
+        self.assertEqual(pagina['items'], [{'producto': 'Pan', 'ingresos': 30.0, 'unidades': 3}])
+
+    def test_periodos_cerrados_se_cachean_hasta_reimportar(self):
+        rango = '/reportes/terminales?desde=2024-01-01&hasta=2024-01-31'
+        primero = self.client.get(rango).get_json()
+        self.assertEqual([d['terminal'] for d in primero['datos']], ['POS1', 'POS2'])
+
+        db.session.add(_linea(9, date(2024, 1, 5), 'POS3', 'Pan', 1, 10))
+        db.session.commit()
+        self.assertEqual(self.client.get(rango).get_json()['datos'], primero['datos'])
+
+        reports.invalidar_cache()
+        terminales = [d['terminal'] for d in self.client.get(rango).get_json()['datos']]
+        self.assertEqual(terminales, ['POS1', 'POS2', 'POS3'])
+
+    def test_invalidacion_de_otro_proceso_se_ve_por_la_version_en_bd(self):
+        rango = '/reportes/terminales?desde=2024-01-01&hasta=2024-01-31'
+        self.client.get(rango)
+        db.session.add(_linea(9, date(2024, 1, 5), 'POS3', 'Pan', 1, 10))
+        db.session.commit()
+        # Otro worker o un CLI invalidó: sube la versión sin tocar el cache de este proceso
+        db.session.execute(db.update(VersionDatos).values(valor=VersionDatos.valor + 1))
+        db.session.commit()
+        self.assertEqual(reports.estadisticas_cache()['entradas'], 1)
+        terminales = [d['terminal'] for d in self.client.get(rango).get_json()['datos']]
+        self.assertEqual(terminales, ['POS1', 'POS2', 'POS3'])
+
+    def test_parametros_invalidos(self):
+        self.assertEqual(self.client.get('/reportes/ingresos?agrupacion=anio').status_code, 400)
+        self.assertEqual(self.client.get('/reportes/ingresos?desde=2024-02-01&hasta=2024-01-01').status_code, 400)
+        self.assertEqual(self.client.get('/reportes/otro').status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import gzip
+import os
+import unittest
+
+from soporte import PruebaBD
+
+from app import app, db, Producto, Contador
+
+
+class RespuestasTests(PruebaBD):
+    def setUp(self):
+        super().setUp()
+        db.session.add_all([Producto(nombre=f'Producto {i}', categoria='Panadería', precio_venta=10 + i)
+                            for i in range(60)])
+        db.session.add(Contador(terminal='POS1'))
+        db.session.commit()
+        self.client = self.cliente('pos1')
+        self.admin = self.cliente()
+
+    def test_large_html_and_json_are_gzipped_when_accepted(self):
+        html = self.client.get('/punto-venta', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(html.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', html.headers['Vary'])
+        self.assertIn(b'Producto 59', gzip.decompress(html.get_data()))
+
+        plano = self.client.get('/punto-venta')
+        self.assertNotIn('Content-Encoding', plano.headers)
+        pequeno = self.client.get('/buscar-productos?q=xyz', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', pequeno.headers)
+
+    def test_static_urls_are_fingerprinted_and_immutable(self):
+        with app.test_request_context():
+            from flask import url_for
+            url = url_for('static', filename='css/styles.css')
+        self.assertRegex(url, r'/static/css/styles\.css\?v=[0-9a-f]{12}$')
+        self.assertIn(url, self.client.get('/punto-venta').get_data(as_text=True))
+
+        response = self.client.get(url, headers={'Accept-Encoding': 'gzip'})
+        self.assertTrue(response.cache_control.immutable)
+        self.assertEqual(response.cache_control.max_age, 365 * 24 * 3600)
+        with open(os.path.join(app.static_folder, 'css', 'styles.css'), 'rb') as f:
+            self.assertEqual(gzip.decompress(response.get_data()), f.read())
+        response.close()
+
+        sin_huella = self.client.get('/static/css/styles.css')
+        self.assertFalse(sin_huella.cache_control.immutable)
+        sin_huella.close()
+
+    def test_catalog_listing_supports_etag_and_last_modified(self):
+        primera = self.client.get('/productos', headers={'Accept-Encoding': 'gzip'})
+        self.assertIsNone(primera.headers.get('Last-Modified'))
+        etag = primera.headers['ETag']
+        self.assertTrue(etag.startswith('W/'))
+        self.assertEqual(self.client.get('/productos', headers={'If-None-Match': etag}).status_code, 304)
+
+        self.admin.post('/catalogo/lote', json={'operaciones': [
+            {'accion': 'alta', 'nombre': 'Torta', 'precio_venta': 50}
+        ]})
+        cambiada = self.client.get('/productos', headers={'If-None-Match': etag})
+        self.assertEqual(cambiada.status_code, 200)
+        self.assertEqual(len(cambiada.get_json()['productos']), 61)
+        modificado = cambiada.headers['Last-Modified']
+        self.assertEqual(
+            self.client.get('/productos', headers={'If-Modified-Since': modificado}).status_code, 304
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
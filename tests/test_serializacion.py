@@ -0,0 +1,54 @@
+import unittest
+from datetime import date, datetime, time
+from decimal import Decimal
+from unittest import mock
+
+from soporte import PruebaBD
+
+import serializacion
+from app import app, db, Producto, Venta
+from flask import jsonify
+
+
+class SerializacionTests(PruebaBD):
+    def setUp(self):
+        super().setUp()
+
+    def test_provider_output_matches_with_and_without_orjson(self):
+        datos = {'b': date(2024, 3, 1), 'a': [time(9, 30), datetime(2024, 3, 1, 9, 30)], 'monto': Decimal('1.50')}
+        esperado = {'a': ['09:30:00', '2024-03-01T09:30:00'], 'b': '2024-03-01', 'monto': '1.50'}
+        with app.test_request_context():
+            rapido = jsonify(datos)
+            with mock.patch.object(serializacion, 'orjson', None):
+                lento = jsonify(datos)
+        self.assertEqual(rapido.get_json(), esperado)
+        self.assertEqual(lento.get_json(), esperado)
+        self.assertEqual(app.json.loads(app.json.dumps(datos)), esperado)
+
+    def test_batch_serializers_match_to_dict(self):
+        db.session.add(Producto(nombre='Pan', precio_venta=10, stock=3))
+        db.session.add(Venta(id_venta=1, fecha=date(2024, 3, 1), hora=time(9), producto_nombre='Pan',
+                             cantidad=1, precio_unitario=10, total_venta=10, id_terminal='POS1'))
+        db.session.commit()
+        producto = Producto.query.one()
+        fila = serializacion.loads(serializacion.dumps(serializacion.productos([producto])))[0]
+        self.assertEqual(fila, producto.to_dict())
+        venta = serializacion.ventas(Venta.query.all())[0]
+        self.assertEqual(venta['fecha'], date(2024, 3, 1))
+        self.assertEqual(set(venta), set(Venta.query.one().to_dict()))
+
+    def test_ndjson_export(self):
+        db.session.add(Venta(id_venta=7, fecha=date(2024, 3, 1), hora=time(9), producto_nombre='Café',
+                             cantidad=2, precio_unitario=5, total_venta=10, id_terminal='POS2'))
+        db.session.commit()
+        client = self.cliente()
+        response = client.get('/exportar-ventas?formato=ndjson')
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        lineas = response.get_data().splitlines()
+        self.assertEqual(len(lineas), 1)
+        self.assertEqual(serializacion.loads(lineas[0])['Producto'], 'Café')
+        self.assertEqual(serializacion.loads(lineas[0])['Fecha'], '2024-03-01')
+
+
+if __name__ == '__main__':
+    unittest.main()
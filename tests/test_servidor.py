@@ -0,0 +1,53 @@
+import os
+import runpy
+import unittest
+from unittest import mock
+
+from soporte import PruebaBD, crear_productos
+
+import app as pocopan_app
+
+CONFIG_GUNICORN = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'gunicorn.conf.py')
+
+
+class CalentarCachesTests(PruebaBD):
+    def test_warms_catalog_and_static_fingerprints(self):
+        crear_productos(5)
+        with mock.patch('builtins.open', wraps=open) as abrir:
+            resultado = pocopan_app.calentar_caches()
+            self.assertEqual(resultado['productos'], 5)
+            self.assertGreater(resultado['estaticos'], 0)
+            abrir.reset_mock()
+            for carpeta, _, archivos in os.walk(pocopan_app.app.static_folder):
+                for archivo in archivos:
+                    relativo = os.path.relpath(os.path.join(carpeta, archivo), pocopan_app.app.static_folder)
+                    self.assertIsNotNone(pocopan_app.huella_estatico(relativo.replace(os.sep, '/')))
+            abrir.assert_not_called()
+
+
+class ConfigGunicornTests(unittest.TestCase):
+    def test_workers_default_to_cpu_count(self):
+        with mock.patch.dict(os.environ, {}, clear=False), mock.patch('multiprocessing.cpu_count', return_value=4):
+            os.environ.pop('GUNICORN_WORKERS', None)
+            config = runpy.run_path(CONFIG_GUNICORN)
+        self.assertEqual(config['workers'], 9)
+        self.assertTrue(config['preload_app'])
+        self.assertEqual(config['worker_class'], 'gthread')
+
+    def test_environment_overrides(self):
+        with mock.patch.dict(os.environ, {'GUNICORN_WORKERS': '2', 'GUNICORN_THREADS': '8', 'PORT': '8080'}):
+            config = runpy.run_path(CONFIG_GUNICORN)
+        self.assertEqual((config['workers'], config['threads']), (2, 8))
+        self.assertTrue(config['bind'].endswith(':8080'))
+
+    def test_threads_cover_streams_and_cap_live_streams_per_worker(self):
+        with mock.patch.dict(os.environ, {'GUNICORN_STREAMS': '10'}):
+            os.environ.pop('GUNICORN_THREADS', None)
+            os.environ.pop('EVENTOS_MAX_STREAMS', None)
+            config = runpy.run_path(CONFIG_GUNICORN)
+            self.assertEqual(config['threads'], 14)
+            self.assertEqual(os.environ['EVENTOS_MAX_STREAMS'], '10')
+
+
+if __name__ == '__main__':
+    unittest.main()
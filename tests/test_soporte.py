@@ -0,0 +1,48 @@
+import unittest
+
+import pandas as pd
+
+from soporte import PruebaBD, crear_productos, crear_ventas, planilla_en_memoria
+
+import app as pocopan_app
+from app import db, Producto, Venta, Contador, seed_catalog_from_excel, refresh_contadores
+
+
+class SoporteTests(PruebaBD):
+    def test_a_commits_are_rolled_back_after_each_test(self):
+        db.session.add(Producto(nombre='Efímero', precio_venta=1))
+        db.session.commit()
+        self.assertEqual(Producto.query.filter_by(nombre='Efímero').count(), 1)
+
+    def test_b_previous_test_left_no_rows(self):
+        self.assertEqual(Producto.query.count(), 0)
+
+    def test_route_commits_stay_inside_the_test_transaction(self):
+        crear_productos(3)
+        respuesta = self.cliente().post('/catalogo/lote', json={'operaciones': [
+            {'accion': 'alta', 'nombre': 'Torta', 'precio_venta': 50}
+        ]})
+        self.assertTrue(respuesta.get_json()['success'])
+        self.assertEqual(Producto.query.count(), 4)
+
+    def test_factories_build_consistent_tickets(self):
+        productos = crear_productos(10, semilla=1)
+        filas = crear_ventas(30, productos, semilla=1)
+        self.assertEqual(Venta.query.count(), len(filas))
+        self.assertEqual(Venta.query.filter(Venta.producto_id.is_(None)).count(), 0)
+        refresh_contadores()
+        self.assertEqual(Contador.query.filter_by(terminal='POS1').one().ultima_venta, 10)
+        self.assertEqual(Contador.query.filter_by(terminal='POS1').one().ultimo_cliente, 10)
+        self.assertEqual(crear_ventas(30, productos, semilla=1)[0], filas[0])
+
+    def test_dataframe_fixture_feeds_seeders_without_files(self):
+        catalogo = pd.DataFrame({'Nombre': ['Pan', 'Café'], 'Categoria': ['Panadería', None],
+                                 'Precio Venta': [10, 6.5]})
+        with planilla_en_memoria(catalogo, pocopan_app.CATALOGO_XLSX):
+            resultado = seed_catalog_from_excel()
+        self.assertEqual(resultado['created'], 2)
+        self.assertEqual(Producto.query.filter_by(nombre='Café').one().categoria, 'Sin Categoría')
+
+
+if __name__ == '__main__':
+    unittest.main()
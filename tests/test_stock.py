@@ -0,0 +1,95 @@
+import unittest
+
+from soporte import PruebaBD
+
+import stock
+from app import db, Producto, Venta, Contador, CatalogoCambio, MovimientoStock
+
+
+class StockTests(PruebaBD):
+    def setUp(self):
+        super().setUp()
+        db.session.add_all([
+            Producto(nombre='Pan', precio_venta=10, stock=5),
+            Producto(nombre='Medialuna', precio_venta=4, stock=3),
+            Producto(nombre='Café', precio_venta=6),
+            Contador(terminal='POS1'),
+        ])
+        db.session.commit()
+        self.ids = {p.nombre: p.id for p in Producto.query.all()}
+        self.client = self.cliente('pos1')
+        self.admin = self.cliente()
+
+    def agregar(self, nombre, cantidad):
+        return self.client.post('/agregar-carrito', json={'producto_id': self.ids[nombre], 'cantidad': cantidad})
+
+    def test_checkout_decrements_stock_and_flips_sold_out_products(self):
+        self.agregar('Pan', 2)
+        self.agregar('Medialuna', 3)
+        self.agregar('Café', 10)
+        self.assertTrue(self.client.post('/finalizar-venta').get_json()['success'])
+
+        db.session.expire_all()
+        pan, medialuna, cafe = (db.session.get(Producto, self.ids[n]) for n in ('Pan', 'Medialuna', 'Café'))
+        self.assertEqual((pan.stock, pan.estado), (3, 'Disponible'))
+        self.assertEqual((medialuna.stock, medialuna.estado), (0, 'Agotado'))
+        self.assertIsNone(cafe.stock)
+        movimientos = {m.producto_id: m for m in MovimientoStock.query.all()}
+        self.assertEqual(set(movimientos), {pan.id, medialuna.id})
+        self.assertEqual((movimientos[pan.id].cantidad, movimientos[pan.id].stock_resultante), (-2, 3))
+        self.assertEqual(movimientos[pan.id].referencia, 'venta:POS1:1')
+        self.assertEqual(CatalogoCambio.query.one().producto_id, medialuna.id)
+        self.assertEqual(self.client.get('/buscar-productos?q=Media').get_json(), [])
+
+    def test_product_etag_changes_when_a_sale_lowers_stock(self):
+        primera = self.client.get(f"/productos/{self.ids['Pan']}")
+        etag, editor = primera.headers['ETag'], self.admin.get('/productos?vista=editor').headers['ETag']
+        self.agregar('Pan', 2)
+        self.assertTrue(self.client.post('/finalizar-venta').get_json()['success'])
+        self.assertEqual(CatalogoCambio.query.count(), 0)
+
+        despues = self.client.get(f"/productos/{self.ids['Pan']}", headers={'If-None-Match': etag})
+        self.assertEqual(despues.status_code, 200)
+        self.assertEqual(despues.get_json()['producto']['stock'], 3)
+        self.assertEqual(self.admin.get('/productos?vista=editor', headers={'If-None-Match': editor}).status_code, 200)
+        cafe = self.client.get(f"/productos/{self.ids['Café']}")
+        self.assertEqual(self.client.get(
+            f"/productos/{self.ids['Café']}", headers={'If-None-Match': cafe.headers['ETag']}
+        ).status_code, 304)
+
+    def test_checkout_fails_atomically_when_a_line_runs_short(self):
+        self.agregar('Pan', 2)
+        self.agregar('Medialuna', 2)
+        self.admin.post(f"/productos/{self.ids['Medialuna']}/stock", json={'stock': 1})
+
+        response = self.client.post('/finalizar-venta')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.get_json()['faltantes'][0]['producto'], 'Medialuna')
+        db.session.expire_all()
+        self.assertEqual(Venta.query.count(), 0)
+        self.assertEqual(db.session.get(Producto, self.ids['Pan']).stock, 5)
+        self.assertEqual(Contador.query.filter_by(terminal='POS1').one().ultima_venta, 0)
+
+    def test_add_to_cart_rejects_quantities_over_stock(self):
+        self.assertEqual(self.agregar('Pan', 4).status_code, 200)
+        response = self.agregar('Pan', 2)
+        self.assertEqual(response.status_code, 409)
+        self.assertIn('disponible: 1', response.get_json()['message'])
+
+    def test_restock_records_movement_and_makes_product_available(self):
+        url = f"/productos/{self.ids['Medialuna']}/stock"
+        self.admin.post(url, json={'stock': 0})
+        self.assertEqual(db.session.get(Producto, self.ids['Medialuna']).estado, 'Agotado')
+        data = self.admin.post(url, json={'cantidad': 12, 'motivo': 'ingreso'}).get_json()
+        self.assertEqual((data['stock'], data['estado']), (12, 'Disponible'))
+        self.assertEqual([m['cantidad'] for m in data['movimientos']], [12, -3])
+        self.assertEqual(self.admin.post(url, json={'cantidad': -20}).status_code, 400)
+        self.assertEqual(self.client.post(url, json={'cantidad': 1}).status_code, 403)
+
+    def test_descontar_ignores_products_without_stock_control(self):
+        self.assertEqual(stock.descontar([(self.ids['Café'], 50), (None, 1)]), [])
+        self.assertEqual(MovimientoStock.query.count(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
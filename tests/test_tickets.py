@@ -0,0 +1,107 @@
+import unittest
+from datetime import date, time
+
+from sqlalchemy import text
+
+from soporte import PruebaBD, PruebaArchivoBD, crear_ventas
+
+import app as pocopan_app
+import archive
+import ingest
+from app import app, db, Contador, Venta, refresh_contadores
+from models import Migracion
+
+
+def linea(id_venta, producto, total, terminal='POS1', cliente='CLIENTE-POS1-0042', fecha=date(2024, 1, 10)):
+    return Venta(id_venta=id_venta, fecha=fecha, hora=time(9), id_cliente=cliente, producto_nombre=producto,
+                 cantidad=1, precio_unitario=total, total_venta=total, id_terminal=terminal)
+
+
+class TicketsTests(PruebaBD):
+    def setUp(self):
+        super().setUp()
+        db.session.add_all([
+            linea(5, 'Pan', 10.5), linea(5, 'Café', 0.2),
+            linea(6, 'Pan', 10.5, cliente='CLIENTE-POS1-0043', fecha=date.today()),
+            linea(5, 'Torta', 30, terminal='POS2', cliente='CLIENTE-POS2-0001'),
+        ])
+        db.session.commit()
+
+    def test_ticket_returns_all_lines_and_total(self):
+        ticket = self.cliente('pos1').get('/tickets/POS1/5').get_json()['ticket']
+        self.assertEqual([l['producto_nombre'] for l in ticket['lineas']], ['Pan', 'Café'])
+        self.assertEqual((ticket['id_cliente'], ticket['total'], ticket['unidades']), ('CLIENTE-POS1-0042', 10.7, 2))
+
+    def test_ticket_lookup_is_scoped_and_reports_missing(self):
+        client = self.cliente('pos1')
+        self.assertEqual(client.get('/tickets/POS2/5').status_code, 403)
+        self.assertEqual(client.get('/tickets/POS1/99').status_code, 404)
+        self.assertEqual(self.cliente().get('/tickets/POS2/5').get_json()['ticket']['total'], 30)
+
+    def test_ticket_and_customer_queries_use_indexes(self):
+        for filtro in ('id_terminal = :a AND id_venta = :b', 'id_cliente = :a'):
+            plan = ' '.join(str(fila[-1]) for fila in db.session.execute(
+                text(f'EXPLAIN QUERY PLAN SELECT * FROM ventas WHERE {filtro}'), {'a': 'POS1', 'b': 5}
+            ))
+            self.assertIn('USING INDEX', plan)
+
+    def test_archived_tickets_are_still_found(self):
+        archive.archivar(date(2024, 3, 1))
+        self.assertEqual(Venta.query.count(), 1)
+        respuesta = self.cliente().get('/clientes/CLIENTE-POS1-0042/ventas').get_json()
+        self.assertEqual([t['id_venta'] for t in respuesta['tickets']], [5])
+        self.assertEqual(respuesta['total'], 10.7)
+        self.assertEqual(len(self.cliente().get('/tickets/POS1/5').get_json()['ticket']['lineas']), 2)
+
+    def test_customer_sales_for_pos_users_are_limited_to_their_terminal(self):
+        db.session.add(linea(9, 'Mate', 4, terminal='POS2'))
+        db.session.commit()
+        self.assertEqual(len(self.cliente().get('/clientes/CLIENTE-POS1-0042/ventas').get_json()['tickets']), 2)
+        tickets = self.cliente('pos1').get('/clientes/CLIENTE-POS1-0042/ventas').get_json()['tickets']
+        self.assertEqual([(t['id_terminal'], t['id_venta']) for t in tickets], [('POS1', 5)])
+
+
+class SecuenciaClienteTests(PruebaBD):
+    def test_sequence_is_stored_on_insert_and_drives_counters(self):
+        crear_ventas(9)
+        db.session.add(linea(50, 'Pan', 1, cliente='CLIENTE-POS1-0120'))
+        db.session.commit()
+        self.assertEqual(Venta.query.filter_by(id_venta=50).one().cliente_seq, 120)
+        refresh_contadores()
+        self.assertEqual(Contador.query.filter_by(terminal='POS1').one().ultimo_cliente, 120)
+        self.assertEqual(Contador.query.filter_by(terminal='POS2').one().ultimo_cliente, 3)
+
+    def test_ingest_updates_keep_sequence_in_sync(self):
+        escritor = ingest.EscritorVentas()
+        fila = {'id_venta': 7, 'fecha': date(2024, 1, 1), 'hora': None, 'id_cliente': '',
+                'producto_nombre': 'Pan', 'cantidad': 1, 'precio_unitario': 1, 'total_venta': 1,
+                'vendedor': 'POS', 'id_terminal': 'POS3'}
+        escritor.escribir([fila])
+        self.assertEqual(Venta.query.one().cliente_seq, 7)
+        escritor.escribir([dict(fila, id_cliente='CLIENTE-POS3-0031')])
+        self.assertEqual(Venta.query.one().cliente_seq, 31)
+
+class MigracionSecuenciaTests(PruebaArchivoBD):
+    """La migración inspecciona el esquema con conexiones propias: usa la base en archivo."""
+
+    def test_existing_rows_and_legacy_archive_are_backfilled_once(self):
+        db.session.add_all([linea(1, 'Pan', 1), linea(2, 'Pan', 1, cliente='CLIENTE-POS1-0007'),
+                            linea(3, 'Pan', 1, cliente=None)])
+        db.session.commit()
+        with db.engine.begin() as conn:
+            conn.execute(text('UPDATE ventas SET cliente_seq = NULL'))
+            legado = ', '.join(c for c in archive.COLUMNAS if c != 'cliente_seq')
+            conn.execute(text(f'CREATE TABLE ventas_archivo AS SELECT {legado} FROM ventas WHERE 0'))
+            conn.execute(text("INSERT INTO ventas_archivo (id, id_venta, id_cliente) VALUES (9, 4, 'CLIENTE-POS1-0003')"))
+
+        self.assertEqual(pocopan_app._migrar_secuencia_clientes(), 3)
+        self.assertEqual(sorted(v.cliente_seq or 0 for v in Venta.query), [0, 7, 42])
+        self.assertEqual(db.session.execute(text('SELECT cliente_seq FROM ventas_archivo')).scalar(), 3)
+        self.assertIn('ix_ventas_archivo_cliente',
+                      {i['name'] for i in db.inspect(db.engine).get_indexes('ventas_archivo')})
+        self.assertIsNotNone(db.session.get(Migracion, 'cliente_seq'))
+        self.assertEqual(pocopan_app._migrar_secuencia_clientes(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
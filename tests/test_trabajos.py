@@ -0,0 +1,103 @@
+import io
+import os
+import tempfile
+import unittest
+from datetime import date, datetime, time, timedelta
+
+import pandas as pd
+
+from soporte import PruebaArchivoBD
+
+import trabajos
+from app import app, db, Producto, Venta, Contador, Trabajo
+
+
+class TrabajosTests(PruebaArchivoBD):
+    def setUp(self):
+        super().setUp()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.prev_dir = app.config['TRABAJOS_DIR']
+        app.config['TRABAJOS_DIR'] = self.temp_dir.name
+        self.client = self.cliente()
+
+    def tearDown(self):
+        app.config['TRABAJOS_DIR'] = self.prev_dir
+        self.temp_dir.cleanup()
+        super().tearDown()
+
+    def encolar(self, **kwargs):
+        response = self.client.post('/trabajos', **kwargs)
+        self.assertEqual(response.status_code, 202)
+        trabajo_id = response.get_json()['trabajo']['id']
+        trabajos.runner.esperar(trabajo_id, timeout=30)
+        return self.client.get(f'/trabajos/{trabajo_id}').get_json()['trabajo']
+
+    def test_recalcular_contadores_runs_in_background(self):
+        db.session.add(Venta(id_venta=5, fecha=date(2024, 3, 1), hora=time(9), producto_nombre='Pan',
+                             cantidad=1, precio_unitario=10, total_venta=10, id_terminal='POS1'))
+        db.session.commit()
+        trabajo = self.encolar(json={'tipo': 'recalcular_contadores'})
+        self.assertEqual(trabajo['estado'], 'completado')
+        self.assertEqual(trabajo['progreso'], 1)
+        self.assertEqual(trabajo['resultado']['POS1'], 1)
+        self.assertEqual(trabajo['usuario'], 'admin')
+        db.session.expire_all()
+        self.assertEqual(Contador.query.filter_by(terminal='POS1').one().ultima_venta, 5)
+
+    def test_export_is_written_to_file_and_downloadable(self):
+        db.session.add(Venta(id_venta=7, fecha=date(2024, 3, 1), hora=time(9), producto_nombre='Café',
+                             cantidad=2, precio_unitario=5, total_venta=10, id_terminal='POS2'))
+        db.session.commit()
+        trabajo = self.encolar(json={'tipo': 'exportar_ventas', 'parametros': {'formato': 'csv'}})
+        self.assertEqual(trabajo['estado'], 'completado')
+        self.assertGreater(trabajo['resultado']['bytes'], 0)
+
+        descarga = self.client.get(f"/trabajos/{trabajo['id']}/archivo")
+        self.assertEqual(descarga.status_code, 200)
+        self.assertIn('attachment', descarga.headers['Content-Disposition'])
+        self.assertIn('Café', descarga.get_data().decode('utf-8-sig'))
+        descarga.close()
+
+    def test_importar_ventas_from_upload_and_failures_are_recorded(self):
+        db.session.add(Producto(nombre='Pan', precio_venta=10))
+        db.session.commit()
+        buffer = io.BytesIO()
+        pd.DataFrame([{
+            'ID_Venta': 3, 'Fecha': '2024-02-01', 'Hora': '09:30', 'ID_Cliente': '',
+            'Producto': 'Pan', 'Cantidad': 2, 'Precio_Unitario': 10, 'ID_Terminal': 'POS1',
+        }]).to_csv(buffer, index=False)
+        buffer.seek(0)
+        trabajo = self.encolar(data={'tipo': 'importar_ventas', 'archivo': (buffer, 'ventas.csv')})
+        self.assertEqual(trabajo['estado'], 'completado')
+        self.assertEqual(trabajo['resultado']['created'], 1)
+        self.assertEqual(Venta.query.count(), 1)
+        self.assertEqual(os.listdir(self.temp_dir.name), [])
+
+        fallido = self.encolar(json={'tipo': 'exportar_ventas', 'parametros': {'formato': 'pdf'}})
+        self.assertEqual(fallido['estado'], 'error')
+        self.assertTrue(fallido['error'])
+        self.assertEqual(self.client.get(f"/trabajos/{fallido['id']}/archivo").status_code, 404)
+
+    def test_unknown_type_and_permissions(self):
+        response = self.client.post('/trabajos', json={'tipo': 'borrar_todo'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('exportar_ventas', response.get_json()['message'])
+
+        pos = self.cliente('pos1')
+        self.assertEqual(pos.post('/trabajos', json={'tipo': 'recalcular_contadores'}).status_code, 403)
+
+    def test_stale_jobs_are_marked_interrupted(self):
+        viejo = datetime.utcnow() - timedelta(hours=2)
+        db.session.add_all([
+            Trabajo(tipo='exportar_ventas', estado='en_curso', actualizado=viejo),
+            Trabajo(tipo='exportar_ventas', estado='en_curso'),
+        ])
+        db.session.commit()
+        self.assertEqual(trabajos.marcar_interrumpidos(timedelta(hours=1)), 1)
+        db.session.expire_all()
+        estados = [t.estado for t in Trabajo.query.order_by(Trabajo.id)]
+        self.assertEqual(estados, ['error', 'en_curso'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+"""Trabajos en segundo plano para operaciones pesadas de administración.
+
+Las rutas de admin encolan el trabajo y devuelven su id de inmediato; un pool
+de hilos del proceso lo ejecuta con su propio contexto de app y sesión, y la
+tabla `trabajos` guarda estado, progreso y resultado para que la UI haga
+polling a `/trabajos/<id>`. Los trabajos son de E/S y BD (seeders,
+contadores, exportaciones), así que hilos alcanzan y comparten el engine.
+
+Las funciones de trabajo reciben `(parametros, progreso)` y devuelven un
+resultado serializable a JSON. `progreso(fraccion, mensaje)` escribe en una
+conexión aparte (no toca la transacción del trabajo) y se limita a una
+escritura cada `INTERVALO_PROGRESO` segundos. Es de mejor esfuerzo: en
+SQLite se omite mientras la sesión del trabajo tiene una transacción abierta
+(la otra conexión quedaría bloqueada) y un error al escribirlo no hace fallar
+el trabajo.
+
+Un trabajo que quedó pendiente o en curso porque su proceso se reinició no
+se retoma: `marcar_interrumpidos` deja en 'error' los que no se actualizan
+hace más de `vencimiento` (otros workers pueden tener trabajos vivos).
+
+El pool se crea con el primer trabajo de cada proceso; un hijo de `fork` no
+hereda el del padre (sus hilos no existen en el hijo).
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+import serializacion
+from models import db, Trabajo
+
+logger = logging.getLogger(__name__)
+
+PENDIENTE = 'pendiente'
+EN_CURSO = 'en_curso'
+COMPLETADO = 'completado'
+ERROR = 'error'
+INTERVALO_PROGRESO = 0.5
+
+
+class TipoDesconocido(ValueError):
+    pass
+
+
+def _actualizar(trabajo_id, **valores):
+    valores['actualizado'] = datetime.utcnow()
+    with db.engine.begin() as conn:
+        conn.execute(update(Trabajo).where(Trabajo.id == trabajo_id).values(**valores))
+
+
+class _Progreso:
+    def __init__(self, trabajo_id):
+        self.trabajo_id = trabajo_id
+        self._ultimo = 0.0
+
+    def __call__(self, fraccion=None, mensaje=None):
+        ahora = time.monotonic()
+        if ahora - self._ultimo < INTERVALO_PROGRESO and fraccion != 1:
+            return
+        self._ultimo = ahora
+        valores = {}
+        if fraccion is not None:
+            valores['progreso'] = round(min(max(float(fraccion), 0.0), 1.0), 3)
+        if mensaje is not None:
+            valores['mensaje'] = str(mensaje)[:255]
+        if not valores:
+            return
+        if db.engine.dialect.name == 'sqlite' and db.session().in_transaction():
+            return
+        try:
+            _actualizar(self.trabajo_id, **valores)
+        except Exception as e:
+            logger.warning("⚠️ No se pudo registrar el progreso del trabajo %s: %s", self.trabajo_id, e)
+
+
+class Runner:
+    def __init__(self):
+        self.app = None
+        self.workers = 2
+        self._tipos = {}
+        self._futuros = {}
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app, workers=2):
+        self.app = app
+        self.workers = workers
+
+    def reiniciar_tras_fork(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._futuros = {}
+
+    def registrar(self, tipo, fn):
+        self._tipos[tipo] = fn
+
+    def tipos(self):
+        return sorted(self._tipos)
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='trabajo')
+            return self._executor
+
+    def encolar(self, tipo, parametros=None, usuario=None):
+        """Crea el registro (commit) y lo envía al pool; devuelve el `Trabajo`."""
+        if tipo not in self._tipos:
+            raise TipoDesconocido(f"Tipo de trabajo inválido, usar: {', '.join(self.tipos())}")
+        trabajo = Trabajo(tipo=tipo, estado=PENDIENTE, progreso=0,
+                          parametros=serializacion.dumps(parametros or {}), usuario=usuario)
+        db.session.add(trabajo)
+        db.session.commit()
+        futuro = self._pool().submit(self._ejecutar, trabajo.id)
+        with self._lock:
+            self._futuros[trabajo.id] = futuro
+        futuro.add_done_callback(lambda _, trabajo_id=trabajo.id: self._olvidar(trabajo_id))
+        logger.info("🧵 Trabajo %s encolado: %s", trabajo.id, tipo)
+        return trabajo
+
+    def _olvidar(self, trabajo_id):
+        with self._lock:
+            self._futuros.pop(trabajo_id, None)
+
+    def esperar(self, trabajo_id, timeout=None):
+        """Bloquea hasta que el trabajo termine (útil para CLI y tests)."""
+        with self._lock:
+            futuro = self._futuros.get(trabajo_id)
+        if futuro is not None:
+            futuro.result(timeout=timeout)
+
+    def _ejecutar(self, trabajo_id):
+        with self.app.app_context():
+            try:
+                trabajo = db.session.get(Trabajo, trabajo_id)
+                tipo = trabajo.tipo
+                parametros = serializacion.loads(trabajo.parametros) if trabajo.parametros else {}
+                db.session.rollback()
+                _actualizar(trabajo_id, estado=EN_CURSO, iniciado=datetime.utcnow())
+                inicio = time.perf_counter()
+                resultado = self._tipos[tipo](parametros, _Progreso(trabajo_id))
+                _actualizar(
+                    trabajo_id, estado=COMPLETADO, progreso=1, terminado=datetime.utcnow(),
+                    resultado=serializacion.dumps(resultado), mensaje='Completado'
+                )
+                logger.info("✅ Trabajo %s (%s) completado en %.1fs", trabajo_id, tipo, time.perf_counter() - inicio)
+            except Exception as e:
+                db.session.rollback()
+                logger.exception("❌ Trabajo %s falló", trabajo_id)
+                _actualizar(trabajo_id, estado=ERROR, error=str(e), terminado=datetime.utcnow())
+            finally:
+                db.session.remove()
+
+
+def marcar_interrumpidos(vencimiento=timedelta(hours=1)):
+    """Marca como error los trabajos sin terminar que no se actualizan hace más de `vencimiento`."""
+    limite = datetime.utcnow() - vencimiento
+    with db.engine.begin() as conn:
+        return conn.execute(
+            update(Trabajo)
+            .where(Trabajo.estado.in_((PENDIENTE, EN_CURSO)), Trabajo.actualizado < limite)
+            .values(estado=ERROR, error='Interrumpido por reinicio', terminado=datetime.utcnow())
+        ).rowcount
+
+
+runner = Runner()
+os.register_at_fork(after_in_child=runner.reiniciar_tras_fork)